@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import MentorDailyRollup
+
+@admin.register(MentorDailyRollup)
+class MentorDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('mentor', 'date', 'sessions', 'completed_sessions', 'earnings', 'payments', 'reviews')
+    search_fields = ('mentor__user__username',)
+    list_filter = ('date',)
+    # Maintained by booking, payment and review signals; fix drift with backfill_rollups
+    readonly_fields = ('sessions', 'completed_sessions', 'minutes', 'earnings', 'payments', 'payment_amount', 'reviews', 'rating_total')
@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.rollups import history_range, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily mentor rollups from bookings, payments and reviews, a window of days at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to rebuild (default: the earliest activity)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day to rebuild (default: the latest activity)')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+        history = history_range()
+        if history is None and not (options['start'] and options['end']):
+            self.stdout.write("Nothing to backfill")
+            return
+        start = options['start'] or history[0]
+        end = options['end'] or history[1]
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        total = 0
+        for window_start, window_end, rows in rebuild_rollups(start, end, options['chunk_days']):
+            self.stdout.write(f"{window_start} to {window_end}: {rows} rows")
+            total += rows
+        self.stdout.write(f"{total} rollup rows written for {start} to {end}")
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('mentors', '0007_mentor_review_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('sessions', models.IntegerField(default=0)),
+                ('completed_sessions', models.IntegerField(default=0)),
+                ('minutes', models.IntegerField(default=0)),
+                ('earnings', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('payments', models.IntegerField(default=0)),
+                ('payment_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=12)),
+                ('reviews', models.IntegerField(default=0)),
+                ('rating_total', models.IntegerField(default=0)),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='mentors.mentorprofile')),
+            ],
+            options={
+                'verbose_name': 'Mentor daily rollup',
+                'verbose_name_plural': 'Mentor daily rollups',
+                'ordering': ['mentor', 'date'],
+                'indexes': [models.Index(fields=['date'], name='rollup_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mentordailyrollup',
+            constraint=models.UniqueConstraint(fields=('mentor', 'date'), name='rollup_mentor_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,114 @@
+from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from bookings.signals import booking_status_changed, bookings_created
+from mentors.models import MentorProfile
+from payments.signals import payment_completed
+
+class MentorDailyRollup(models.Model):
+    """One mentor's activity on one day, kept current by booking, payment and review signals (analytics/rollups.py)"""
+    mentor = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    # Bookings on their session date: sessions counts every one not cancelled,
+    # the rest only completed ones
+    sessions = models.IntegerField(default=0)
+    completed_sessions = models.IntegerField(default=0)
+    minutes = models.IntegerField(default=0)
+    earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    # Completed payments on the day they completed
+    payments = models.IntegerField(default=0)
+    payment_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    # Reviews on the day they were written
+    reviews = models.IntegerField(default=0)
+    rating_total = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.mentor} - {self.date}"
+
+    class Meta:
+        ordering = ['mentor', 'date']
+        verbose_name = "Mentor daily rollup"
+        verbose_name_plural = "Mentor daily rollups"
+        constraints = [
+            # Also the index for one mentor's date range
+            models.UniqueConstraint(fields=['mentor', 'date'], name='rollup_mentor_date_uniq'),
+        ]
+        indexes = [
+            # Platform-wide ranges
+            models.Index(fields=['date'], name='rollup_date_idx'),
+        ]
+
+@receiver(post_save, sender='bookings.Booking')
+def roll_up_saved_booking(sender, instance, created, raw, **kwargs):
+    from .rollups import booking_change, record_rollups
+    previous = getattr(instance, '_previous_row', None)
+    if raw or (not created and previous is None):
+        return
+    changes = [booking_change(instance.mentor_id, instance.session_date, instance.status, instance.total_amount, instance.duration_minutes)]
+    if previous:
+        changes.append(booking_change(
+            previous['mentor_id'], previous['session_date'], previous['status'], previous['total_amount'],
+            previous['duration_minutes'], sign=-1,
+        ))
+    record_rollups(changes)
+
+@receiver(post_delete, sender='bookings.Booking')
+def roll_up_deleted_booking(sender, instance, **kwargs):
+    from .rollups import booking_change, record_rollups
+    record_rollups([
+        booking_change(instance.mentor_id, instance.session_date, instance.status, instance.total_amount, instance.duration_minutes, sign=-1)
+    ])
+
+@receiver(booking_status_changed)
+def roll_up_status_change(sender, bookings, to_status, **kwargs):
+    from .rollups import booking_change, record_rollups
+    changes = []
+    for row in bookings:
+        changes.append(booking_change(row['mentor_id'], row['session_date'], to_status, row['total_amount'], row['duration_minutes']))
+        changes.append(booking_change(row['mentor_id'], row['session_date'], row['status'], row['total_amount'], row['duration_minutes'], sign=-1))
+    record_rollups(changes)
+
+@receiver(bookings_created)
+def roll_up_created_bookings(sender, bookings, **kwargs):
+    from .rollups import booking_change, record_rollups
+    record_rollups([
+        booking_change(booking.mentor_id, booking.session_date, booking.status, booking.total_amount, booking.duration_minutes)
+        for booking in bookings
+    ])
+
+@receiver(post_save, sender='payments.Payment')
+def roll_up_created_payment(sender, instance, created, raw, **kwargs):
+    # Payments only change status through payment_completed after they are created
+    from .rollups import payment_change, record_rollups
+    if created and not raw and instance.status == 'completed':
+        # Payments are created from their booking object, so this reads no row
+        record_rollups([payment_change(instance.booking.mentor_id, instance.amount, instance.updated_at)])
+
+@receiver(payment_completed)
+def roll_up_completed_payment(sender, payment, mentor_id, completed_at, **kwargs):
+    from .rollups import payment_change, record_rollups
+    record_rollups([payment_change(mentor_id, payment.amount, completed_at)])
+
+@receiver(pre_delete, sender='payments.Payment')
+def roll_up_deleted_payment(sender, instance, **kwargs):
+    from .rollups import payment_change, record_rollups
+    if instance.status == 'completed':
+        # pre_delete runs before a cascade deletes anything, so the booking can still be read
+        record_rollups([payment_change(instance.booking.mentor_id, instance.amount, instance.updated_at, sign=-1)])
+
+@receiver(post_save, sender='reviews.Review')
+def roll_up_saved_review(sender, instance, raw, **kwargs):
+    from .rollups import record_rollups, review_change
+    previous = getattr(instance, '_previous_rating', None)
+    current = (instance.mentor_id, int(instance.rating))
+    if raw or previous == current:
+        return
+    changes = [review_change(*current, instance.created_at)]
+    if previous:
+        changes.append(review_change(*previous, instance.created_at, sign=-1))
+    record_rollups(changes)
+
+@receiver(post_delete, sender='reviews.Review')
+def roll_up_deleted_review(sender, instance, **kwargs):
+    from .rollups import record_rollups, review_change
+    record_rollups([review_change(instance.mentor_id, int(instance.rating), instance.created_at, sign=-1)])
@@ -0,0 +1,204 @@
+"""
+Daily analytics rollups per mentor.
+
+Every booking, payment and review change is turned into a delta on one
+(mentor, day) row and applied with F() increments in the same transaction,
+like the mentor counters. Bookings count on their session date, payments on
+the day they completed and reviews on the day they were written, so a change
+only ever touches the day it belongs to. A range is then served from one row
+per mentor and day, however many bookings it covers. rebuild_rollups
+recomputes a date range from the source tables, a window at a time.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from bookings.counters import contribution
+from bookings.models import Booking
+from payments.models import Payment
+from reviews.models import Review
+
+from .models import MentorDailyRollup
+
+ROLLUP_FIELDS = ('sessions', 'completed_sessions', 'minutes', 'earnings', 'payments', 'payment_amount', 'reviews', 'rating_total')
+BOOKING_FIELDS = ROLLUP_FIELDS[:4]
+INTERVALS = ('day', 'week', 'month')
+REBUILD_BATCH_SIZE = 1000
+
+
+def booking_change(mentor_id, session_date, status, total_amount, duration_minutes, sign=1):
+    """The (mentor_id, day, deltas) a booking adds to the rollups, or takes away with sign=-1"""
+    day = Booking._meta.get_field('session_date').to_python(session_date)
+    values = contribution(status, total_amount, duration_minutes)
+    return mentor_id, day, {field: sign * value for field, value in zip(BOOKING_FIELDS, values)}
+
+
+def payment_change(mentor_id, amount, completed_at, sign=1):
+    return mentor_id, timezone.localdate(completed_at), {'payments': sign, 'payment_amount': sign * Decimal(amount)}
+
+
+def review_change(mentor_id, stars, created_at, sign=1):
+    return mentor_id, timezone.localdate(created_at), {'reviews': sign, 'rating_total': sign * stars}
+
+
+def record_rollups(changes):
+    """Apply [(mentor_id, day, deltas)] with one UPDATE per affected row, creating missing rows first"""
+    deltas = {}
+    for mentor_id, day, values in changes:
+        if mentor_id is None:
+            continue
+        delta = deltas.setdefault((mentor_id, day), {})
+        for field, value in values.items():
+            delta[field] = delta.get(field, 0) + value
+    deltas = {key: {field: value for field, value in delta.items() if value} for key, delta in deltas.items()}
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    # Inserts and updates both go in (mentor, day) order, so two changes that share
+    # rollup rows lock them in the same order
+    keys = sorted(deltas)
+    MentorDailyRollup.objects.bulk_create(
+        [MentorDailyRollup(mentor_id=mentor_id, date=day) for mentor_id, day in keys], ignore_conflicts=True
+    )
+    for mentor_id, day in keys:
+        increments = {field: F(field) + value for field, value in deltas[mentor_id, day].items()}
+        MentorDailyRollup.objects.filter(mentor_id=mentor_id, date=day).update(**increments)
+
+
+# -- Backfill --
+
+def _day_bounds(start, end):
+    """Aware datetimes for the local days start..end, as a half-open range index scans can use"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def history_range():
+    """(first day, last day) with any bookings, completed payments or reviews, or None when there are none"""
+    bookings = Booking.objects.aggregate(first=Min('session_date'), last=Max('session_date'))
+    payments = Payment.objects.filter(status='completed').aggregate(first=Min('updated_at'), last=Max('updated_at'))
+    reviews = Review.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+    days = [day for day in (bookings['first'], bookings['last']) if day]
+    days += [timezone.localdate(moment) for row in (payments, reviews) for moment in (row['first'], row['last']) if moment]
+    return (min(days), max(days)) if days else None
+
+
+def expected_rollups(start, end):
+    """{(mentor_id, day): values} for the days start..end, one GROUP BY per source table"""
+    rows = {}
+
+    def add(key, values):
+        row = rows.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+        row.update({field: value or 0 for field, value in values.items()})
+
+    completed = Q(status='completed')
+    bookings = Booking.objects.filter(session_date__range=(start, end)).order_by().values('mentor_id', 'session_date').annotate(
+        sessions=Count('id', filter=~Q(status='cancelled')),
+        completed_sessions=Count('id', filter=completed),
+        minutes=Sum('duration_minutes', filter=completed),
+        earnings=Sum('total_amount', filter=completed),
+    )
+    for values in bookings:
+        add((values.pop('mentor_id'), values.pop('session_date')), values)
+
+    since, until = _day_bounds(start, end)
+    payments = Payment.objects.filter(status='completed', updated_at__gte=since, updated_at__lt=until).order_by().values(
+        'booking__mentor_id', day=TruncDate('updated_at'),
+    ).annotate(payments=Count('id'), payment_amount=Sum('amount'))
+    for values in payments:
+        add((values.pop('booking__mentor_id'), values.pop('day')), values)
+
+    reviews = Review.objects.filter(created_at__gte=since, created_at__lt=until).order_by().values(
+        'mentor_id', day=TruncDate('created_at'),
+    ).annotate(reviews=Count('id'), rating_total=Sum('rating'))
+    for values in reviews:
+        add((values.pop('mentor_id'), values.pop('day')), values)
+
+    # Days where everything cancelled out carry no information
+    return {key: values for key, values in rows.items() if any(values.values())}
+
+
+def rebuild_rollups(start, end, chunk_days=31):
+    """
+    Replace the rollups for start..end with values recomputed from the source
+    tables, one window of chunk_days at a time so no single transaction holds
+    a long history. Yields (window_start, window_end, rows written).
+    """
+    window_start = start
+    while window_start <= end:
+        window_end = min(window_start + timedelta(days=chunk_days - 1), end)
+        with transaction.atomic():
+            # Deleting first locks the window, so live increments wait and land on the rebuilt rows
+            MentorDailyRollup.objects.filter(date__range=(window_start, window_end)).delete()
+            expected = expected_rollups(window_start, window_end)
+            rows = [MentorDailyRollup(mentor_id=mentor_id, date=day, **values) for (mentor_id, day), values in sorted(expected.items())]
+            MentorDailyRollup.objects.bulk_create(rows, batch_size=REBUILD_BATCH_SIZE)
+        yield window_start, window_end, len(rows)
+        window_start = window_end + timedelta(days=1)
+
+
+# -- Reading --
+
+def period_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(day, interval):
+    if interval == 'week':
+        return day + timedelta(days=7)
+    if interval == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def format_period(values):
+    return {
+        'sessions': values['sessions'],
+        'completed_sessions': values['completed_sessions'],
+        'hours': round(values['minutes'] / 60, 1),
+        'earnings': round(float(values['earnings']), 2),
+        'payments': values['payments'],
+        'payment_amount': round(float(values['payment_amount']), 2),
+        'reviews': values['reviews'],
+        'average_rating': round(values['rating_total'] / values['reviews'], 2) if values['reviews'] else None,
+    }
+
+
+def timeseries(rollups, start, end, interval='day'):
+    """
+    Sum `rollups` (a MentorDailyRollup queryset) per day, week or month over
+    start..end. Reads at most one row per mentor and day; every period in the
+    range is listed, with zeros where nothing happened.
+    """
+    daily = rollups.filter(date__range=(start, end)).order_by().values('date').annotate(
+        **{field: Sum(field) for field in ROLLUP_FIELDS}
+    )
+    periods = {}
+    day = period_start(start, interval)
+    while day <= end:
+        periods[day] = dict.fromkeys(ROLLUP_FIELDS, 0)
+        day = _next_period(day, interval)
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+    for values in daily:
+        period = periods[period_start(values.pop('date'), interval)]
+        for field, value in values.items():
+            period[field] += value or 0
+            totals[field] += value or 0
+    return {
+        'interval': interval,
+        'start': start,
+        'end': end,
+        'totals': format_period(totals),
+        'results': [{'period': day, **format_period(values)} for day, values in periods.items()],
+    }
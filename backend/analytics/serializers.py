@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from .rollups import INTERVALS
+
+
+class TimeseriesQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=INTERVALS, required=False, default='day')
+
+    def validate(self, data):
+        # The last 30 days by default
+        end = data.get('end') or timezone.localdate()
+        start = data.get('start') or end - timedelta(days=29)
+        if start > end:
+            raise serializers.ValidationError({'start': 'Must not be after end.'})
+        if (end - start).days >= settings.ANALYTICS_MAX_RANGE_DAYS:
+            raise serializers.ValidationError(
+                {'start': f'The range may cover at most {settings.ANALYTICS_MAX_RANGE_DAYS} days.'}
+            )
+        return {**data, 'start': start, 'end': end}
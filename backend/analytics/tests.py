@@ -0,0 +1,186 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.tests import create_booking
+from bookings.transitions import transition_booking
+from mentors.tests import create_mentor
+from payments.models import Payment
+from reviews.models import Review
+
+from .models import MentorDailyRollup
+from .rollups import ROLLUP_FIELDS, expected_rollups, timeseries
+
+
+class RollupMaintenanceTests(TestCase):
+    """After every kind of write the stored rollups equal a recount from the source tables"""
+
+    def setUp(self):
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.mentor = create_mentor('mentor')
+        self.other = create_mentor('other')
+        self.now = timezone.make_aware(datetime.combine(timezone.localdate(), time(12)))
+        self.client = APIClient()
+
+    def assertRollupsMatch(self):
+        start, end = timezone.localdate() - timedelta(days=30), timezone.localdate() + timedelta(days=30)
+        stored = {
+            (row.pop('mentor_id'), row.pop('date')): row
+            for row in MentorDailyRollup.objects.values('mentor_id', 'date', *ROLLUP_FIELDS)
+        }
+        stored = {key: values for key, values in stored.items() if any(values.values())}
+        self.assertEqual(stored, expected_rollups(start, end))
+        return stored
+
+    def test_created_booking(self):
+        create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+
+        stored = self.assertRollupsMatch()
+        self.assertEqual(stored[self.mentor.pk, timezone.localdate() + timedelta(days=1)]['sessions'], 1)
+
+    def test_status_change(self):
+        booking = create_booking(self.mentee, self.mentor, self.now - timedelta(days=1), status='confirmed', minutes=90)
+
+        transition_booking(booking.pk, 'complete', self.mentor.user)
+
+        stored = self.assertRollupsMatch()
+        self.assertEqual(stored[self.mentor.pk, timezone.localdate() - timedelta(days=1)]['minutes'], 90)
+
+    def test_moved_booking(self):
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+
+        booking.mentor = self.other
+        booking.session_date = timezone.localdate() + timedelta(days=2)
+        booking.save()
+
+        self.assertEqual(list(self.assertRollupsMatch()), [(self.other.pk, timezone.localdate() + timedelta(days=2))])
+
+    def test_deleted_booking(self):
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+        Payment.objects.create(booking=booking, user=self.mentee, amount=Decimal('50.00'), status='completed')
+
+        booking.delete()
+
+        self.assertEqual(self.assertRollupsMatch(), {})
+
+    def test_payment_completion(self):
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+        Payment.objects.create(
+            booking=booking, user=self.mentee, payment_intent_id='pi_test_1', amount=Decimal('50.00'), status='pending',
+        )
+        self.client.force_authenticate(self.mentee)
+
+        response = self.client.post('/api/payments/confirm-payment/', {'payment_intent_id': 'pi_test_1'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        stored = self.assertRollupsMatch()
+        self.assertEqual(stored[self.mentor.pk, timezone.localdate()]['payment_amount'], Decimal('50.00'))
+
+    def test_review_created_edited_and_deleted(self):
+        booking = create_booking(self.mentee, self.mentor, self.now - timedelta(days=1), status='completed')
+        review = Review.objects.create(mentee=self.mentee, mentor=self.mentor, booking=booking, rating=2, comment='Meh')
+        self.assertRollupsMatch()
+
+        review.rating = 5
+        review.save()
+        stored = self.assertRollupsMatch()
+        self.assertEqual(stored[self.mentor.pk, timezone.localdate()]['rating_total'], 5)
+
+        review.delete()
+        self.assertNotIn('rating_total', {
+            field for values in self.assertRollupsMatch().values() for field, value in values.items() if value
+        })
+
+
+class TimeseriesTests(TestCase):
+    def setUp(self):
+        self.mentor = create_mentor('mentor')
+
+    def roll_up(self, day, **values):
+        MentorDailyRollup.objects.create(mentor=self.mentor, date=day, **values)
+
+    def periods(self, start, end, interval):
+        series = timeseries(MentorDailyRollup.objects.all(), start, end, interval)
+        return {row['period']: row['sessions'] for row in series['results']}, series['totals']
+
+    def test_days_without_activity_are_listed(self):
+        self.roll_up(date(2024, 3, 2), sessions=2)
+
+        periods, totals = self.periods(date(2024, 3, 1), date(2024, 3, 3), 'day')
+
+        self.assertEqual(periods, {date(2024, 3, 1): 0, date(2024, 3, 2): 2, date(2024, 3, 3): 0})
+        self.assertEqual(totals['sessions'], 2)
+
+    def test_weeks_start_on_monday(self):
+        # 2024-03-03 is a Sunday, 2024-03-04 the Monday after it
+        self.roll_up(date(2024, 3, 3), sessions=1)
+        self.roll_up(date(2024, 3, 4), sessions=2)
+        self.roll_up(date(2024, 3, 10), sessions=4)
+
+        periods, _ = self.periods(date(2024, 3, 1), date(2024, 3, 10), 'week')
+
+        self.assertEqual(periods, {date(2024, 2, 26): 1, date(2024, 3, 4): 6})
+
+    def test_months_cover_whole_calendar_months(self):
+        self.roll_up(date(2024, 1, 31), sessions=1)
+        self.roll_up(date(2024, 2, 29), sessions=2, minutes=90, reviews=2, rating_total=9)
+        self.roll_up(date(2024, 3, 1), sessions=4)
+
+        periods, totals = self.periods(date(2024, 1, 15), date(2024, 3, 1), 'month')
+
+        self.assertEqual(periods, {date(2024, 1, 1): 1, date(2024, 2, 1): 2, date(2024, 3, 1): 4})
+        self.assertEqual((totals['hours'], totals['average_rating']), (1.5, 4.5))
+
+    def test_range_ends_are_inclusive(self):
+        self.roll_up(date(2024, 2, 29), sessions=1)
+        self.roll_up(date(2024, 3, 2), sessions=1)
+
+        _, totals = self.periods(date(2024, 3, 1), date(2024, 3, 2), 'month')
+
+        self.assertEqual(totals['sessions'], 1)
+
+
+class TimeseriesViewTests(TestCase):
+    def setUp(self):
+        self.mentor = create_mentor('mentor')
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor.user)
+
+    def get(self, mentor, **params):
+        return self.client.get(f'/api/analytics/mentors/{mentor.pk}/', params)
+
+    def test_mentor_sees_their_own_series(self):
+        MentorDailyRollup.objects.create(mentor=self.mentor, date=timezone.localdate(), sessions=3)
+
+        response = self.get(self.mentor)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['totals']['sessions'], 3)
+        self.assertEqual(len(response.json()['results']), 30)
+
+    def test_other_mentors_series_is_forbidden(self):
+        self.assertEqual(self.get(create_mentor('other')).status_code, 403)
+
+    def test_staff_may_read_any_mentor(self):
+        self.client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True))
+
+        self.assertEqual(self.get(self.mentor).status_code, 200)
+
+    @override_settings(ANALYTICS_MAX_RANGE_DAYS=7)
+    def test_range_is_capped(self):
+        too_long = self.get(self.mentor, start='2024-03-01', end='2024-03-08')
+        longest = self.get(self.mentor, start='2024-03-01', end='2024-03-07')
+
+        self.assertEqual(too_long.status_code, 400)
+        self.assertIn('start', too_long.json())
+        self.assertEqual(longest.status_code, 200)
+
+    def test_start_after_end_is_rejected(self):
+        self.assertEqual(self.get(self.mentor, start='2024-03-02', end='2024-03-01').status_code, 400)
+
+    def test_unknown_interval_is_rejected(self):
+        self.assertEqual(self.get(self.mentor, interval='year').status_code, 400)
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('mentor/', views.my_timeseries, name='my_timeseries'),
+    path('mentors/<int:mentor_id>/', views.mentor_timeseries, name='mentor_timeseries'),
+    path('platform/', views.platform_timeseries, name='platform_timeseries'),
+]
@@ -0,0 +1,48 @@
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from mentors.models import MentorProfile
+from users.authentication import request_role
+
+from .models import MentorDailyRollup
+from .rollups import timeseries
+from .serializers import TimeseriesQuerySerializer
+
+
+def _timeseries_response(request, rollups):
+    query = TimeseriesQuerySerializer(data=request.query_params)
+    query.is_valid(raise_exception=True)
+    return Response(timeseries(rollups, **query.validated_data))
+
+
+@api_view(['GET'])
+@authentication_classes([JWTStatelessUserAuthentication])
+@permission_classes([IsAuthenticated])
+def my_timeseries(request):
+    """Sessions, earnings, payments and ratings over time for the current mentor"""
+    # Needs nothing but the mentor id, so the token alone authenticates
+    _, mentor_id = request_role(request)
+    if mentor_id is None:
+        raise NotFound('You do not have a mentor profile.')
+    return _timeseries_response(request, MentorDailyRollup.objects.filter(mentor_id=mentor_id))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def mentor_timeseries(request, mentor_id):
+    """The same for any mentor; for admins and the mentor themselves"""
+    mentor = get_object_or_404(MentorProfile.objects.only('id', 'user_id'), pk=mentor_id)
+    if not request.user.is_staff and mentor.user_id != request.user.id:
+        raise PermissionDenied('You can only view your own analytics.')
+    return _timeseries_response(request, MentorDailyRollup.objects.filter(mentor=mentor))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def platform_timeseries(request):
+    """The same summed over every mentor"""
+    return _timeseries_response(request, MentorDailyRollup.objects.all())
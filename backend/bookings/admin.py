@@ -1,8 +1,23 @@
 from django.contrib import admin
-from .models import Booking
+from .models import Booking, BookingReservation, WorkerLease, OutboundEmail
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ('mentee', 'mentor', 'session_type', 'session_date', 'session_time', 'status', 'is_paid')
     search_fields = ('mentee__username', 'mentor__user__username', 'topic')
     list_filter = ('status', 'session_type', 'is_paid', 'session_date')
+
+@admin.register(WorkerLease)
+class WorkerLeaseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'owner', 'expires_at', 'updated_at')
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    search_fields = ('to_email', 'subject')
+    list_filter = ('status',)
+
+@admin.register(BookingReservation)
+class BookingReservationAdmin(admin.ModelAdmin):
+    list_display = ('payment_intent_id', 'mentee', 'mentor', 'session_date', 'session_time', 'expires_at')
+    search_fields = ('payment_intent_id', 'mentee__username', 'mentor__user__username')
@@ -0,0 +1,83 @@
+"""
+Per-mentor booking counters stored on MentorProfile.
+
+total_sessions counts every booking that is not cancelled; completed_sessions,
+total_minutes and total_earnings count completed bookings only. Every booking
+change is turned into a delta and applied as an F() increment in the same
+transaction, so concurrent changes never overwrite each other's counts.
+rebuild_counters recomputes them from the bookings table, a locked batch of
+mentors at a time (mentorship/rebuild.py).
+"""
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from mentors.cache import invalidate_mentors
+from mentors.models import MentorProfile
+from mentorship.rebuild import rebuild_rows
+
+from .models import Booking
+
+COUNTER_FIELDS = MentorProfile.COUNTER_FIELDS
+ZERO = (0, 0, 0, Decimal('0'))
+
+
+def contribution(status, total_amount, duration_minutes):
+    """What one booking adds to its mentor's counters, in COUNTER_FIELDS order"""
+    if status != 'completed':
+        return (int(status != 'cancelled'), 0, 0, Decimal('0'))
+    return (1, 1, int(duration_minutes or 0), Decimal(total_amount or 0))
+
+
+def record_changes(added=(), removed=()):
+    """Apply (mentor_id, contribution) pairs with one UPDATE per affected mentor"""
+    deltas = {}
+    for sign, rows in ((1, added), (-1, removed)):
+        for mentor_id, values in rows:
+            current = deltas.get(mentor_id, ZERO)
+            deltas[mentor_id] = tuple(total + sign * value for total, value in zip(current, values))
+
+    changed = []
+    # Booking writes have locked these mentors already (lock_mentors); ascending ids
+    # keep any that were not in the order lock_mentors and rebuild_counters use
+    for mentor_id in sorted(deltas):
+        increments = {field: F(field) + value for field, value in zip(COUNTER_FIELDS, deltas[mentor_id]) if value}
+        if increments:
+            MentorProfile.objects.filter(pk=mentor_id).update(updated_at=timezone.now(), **increments)
+            changed.append(mentor_id)
+    invalidate_mentors(changed, lists=False)
+
+
+def expected_counters(mentor_ids):
+    """{mentor_id: counters} for the given mentors straight from the bookings table, in one GROUP BY"""
+    completed = Q(status='completed')
+    rows = Booking.objects.filter(mentor_id__in=mentor_ids).order_by().values('mentor_id').annotate(
+        total_sessions=Count('id', filter=~Q(status='cancelled')),
+        completed_sessions=Count('id', filter=completed),
+        total_minutes=Sum('duration_minutes', filter=completed),
+        total_earnings=Sum('total_amount', filter=completed),
+    )
+    expected = dict.fromkeys(mentor_ids, ZERO)
+    for row in rows:
+        expected[row['mentor_id']] = (
+            row['total_sessions'],
+            row['completed_sessions'],
+            row['total_minutes'] or 0,
+            row['total_earnings'] or Decimal('0'),
+        )
+    return expected
+
+
+def _fix_counters(drifted):
+    now = timezone.now()
+    MentorProfile.objects.bulk_update(
+        [MentorProfile(pk=mentor_id, updated_at=now, **dict(zip(COUNTER_FIELDS, want))) for mentor_id, _, want in drifted],
+        [*COUNTER_FIELDS, 'updated_at'],
+    )
+    invalidate_mentors([mentor_id for mentor_id, _, _ in drifted])
+
+
+def rebuild_counters(dry_run=False):
+    """Compare stored counters with the bookings table and fix those that drifted; returns [(mentor_id, stored, expected)]"""
+    return rebuild_rows(MentorProfile.objects.all(), COUNTER_FIELDS, expected_counters, _fix_counters, dry_run=dry_run)
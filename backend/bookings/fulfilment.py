@@ -0,0 +1,130 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from payments import gateway
+from payments.models import Payment
+
+from .email_utils import send_booking_notification_to_mentor, send_booking_confirmation_to_mentee
+from .models import Booking, BookingReservation
+from .slots import SlotUnavailable, ensure_slot_free, lock_mentor_schedule
+
+
+class FulfilmentError(Exception):
+    """The PaymentIntent cannot be turned into a booking; retrying will not help"""
+
+    def __init__(self, detail, refunded=False):
+        super().__init__(str(detail))
+        self.detail = detail
+        # The mentee paid, so the money went back to them
+        self.refunded = refunded
+
+
+REFUNDED = 'This session could not be booked, so the payment has been refunded'
+
+
+def _fulfilled_payment(payment_intent_id):
+    # Locking read so a concurrent fulfilment that just committed is seen even
+    # under REPEATABLE READ
+    with transaction.atomic():
+        return Payment.objects.select_for_update().select_related('booking').filter(
+            payment_intent_id=payment_intent_id
+        ).first()
+
+
+def _fulfilled_booking(payment_intent_id):
+    """The booking already made for this intent, or None; raises if the intent was refunded instead"""
+    payment = _fulfilled_payment(payment_intent_id)
+    if payment is not None and payment.booking is None:
+        raise FulfilmentError(REFUNDED, refunded=True)
+    return payment.booking if payment else None
+
+
+def _refund_unbooked(payment_intent):
+    """Give back a payment for one of our reservations that can no longer be booked, and keep a record of it"""
+    gateway.refund_payment_intent(payment_intent['id'])
+    Payment.objects.get_or_create(
+        payment_intent_id=payment_intent['id'],
+        defaults={
+            'user_id': int(payment_intent['metadata']['mentee_id']),
+            'amount': payment_intent['amount'] / 100,
+            'currency': payment_intent['currency'],
+            'status': 'refunded',
+        },
+    )
+
+
+def fulfil_payment_intent(payment_intent):
+    """
+    Turn the reservation behind a succeeded PaymentIntent into a Booking and Payment.
+
+    The draft was validated and its slot held when the intent was created, so
+    nothing is read back from Stripe and nothing is validated again. Safe to
+    call any number of times for the same intent, from the webhook and the
+    client confirmation alike. Returns (booking, created).
+
+    A paid intent for one of our reservations that cannot be booked any more,
+    because the reservation was swept or its slot was taken, is refunded and
+    recorded as a refunded Payment without a booking before FulfilmentError is
+    raised. A gateway outage while refunding propagates, so the caller retries.
+    """
+    payment_intent_id = payment_intent['id']
+    booking = _fulfilled_booking(payment_intent_id)
+    if booking is not None:
+        return booking, False
+    if payment_intent['status'] != 'succeeded':
+        raise FulfilmentError('Payment not completed')
+
+    mentor_id = BookingReservation.objects.filter(
+        payment_intent_id=payment_intent_id
+    ).values_list('mentor_id', flat=True).first()
+    try:
+        with transaction.atomic():
+            if mentor_id is not None:
+                # Same lock order as booking creation: mentor first, then the reservation
+                lock_mentor_schedule(mentor_id)
+            reservation = BookingReservation.objects.select_for_update().filter(
+                payment_intent_id=payment_intent_id
+            ).first()
+            if reservation is None:
+                raise FulfilmentError('No booking reservation exists for this payment')
+            # Intents are created for the reservation's total in USD; anything else was not ours to fulfil
+            if payment_intent['amount'] != int(reservation.total_amount * 100) or payment_intent['currency'] != 'usd':
+                raise FulfilmentError('Payment amount does not match the booking')
+            if reservation.expires_at <= timezone.now():
+                # The hold lapsed before the payment arrived, so someone may have taken the slot
+                try:
+                    ensure_slot_free(
+                        reservation.mentor_id, reservation.session_start_at, reservation.session_end_at,
+                        exclude_reservation=reservation.pk,
+                    )
+                except SlotUnavailable as e:
+                    raise FulfilmentError({'session_time': [str(e)]})
+
+            booking = reservation.to_booking()
+            booking.save()
+            Payment.objects.create(
+                booking=booking,
+                user_id=reservation.mentee_id,
+                payment_intent_id=payment_intent_id,
+                amount=payment_intent['amount'] / 100,  # Convert from cents
+                currency=payment_intent['currency'],
+                status='completed'
+            )
+            reservation.delete()
+
+            # Queue confirmation emails
+            booking = Booking.objects.select_related('mentee', 'mentor__user__profile').get(pk=booking.pk)
+            send_booking_notification_to_mentor(booking)
+            send_booking_confirmation_to_mentee(booking)
+    except (IntegrityError, FulfilmentError) as e:
+        # Another caller fulfilled this intent first and consumed the reservation
+        booking = _fulfilled_booking(payment_intent_id)
+        if booking is not None:
+            return booking, False
+        # Intents we created name the reservation and mentee; anything else is not ours to refund
+        if isinstance(e, FulfilmentError) and {'reservation_id', 'mentee_id'} <= set(payment_intent.get('metadata') or {}):
+            BookingReservation.objects.filter(payment_intent_id=payment_intent_id).delete()
+            _refund_unbooked(payment_intent)
+            raise FulfilmentError(e.detail, refunded=True) from e
+        raise
+    return booking, True
@@ -0,0 +1,66 @@
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import WorkerLease
+
+
+def default_owner():
+    """Identify this worker process across the cluster"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(name, owner, ttl_seconds):
+    """Take or renew the named lease. Returns True if `owner` now holds it."""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    # A single conditional UPDATE decides the race between nodes: only a free,
+    # expired or self-owned lease row can be claimed.
+    claimed = WorkerLease.objects.filter(
+        Q(name=name) & (Q(owner=owner) | Q(owner='') | Q(expires_at__lte=now))
+    ).update(owner=owner, expires_at=expires_at, updated_at=now)
+    if claimed:
+        return True
+
+    if WorkerLease.objects.filter(name=name).exists():
+        return False
+
+    try:
+        with transaction.atomic():
+            WorkerLease.objects.create(name=name, owner=owner, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        # Another node created the row first
+        return False
+
+
+def lease_renewer(name, owner, ttl_seconds):
+    """
+    A callable for long jobs to call between steps. It extends the lease at most
+    every third of its TTL, so it stays held while steps are short, and returns
+    False once another node has taken the lease over.
+    """
+    renewed_at = time.monotonic()
+
+    def renew():
+        nonlocal renewed_at
+        if time.monotonic() - renewed_at < ttl_seconds / 3:
+            return True
+        if not acquire_lease(name, owner, ttl_seconds):
+            return False
+        renewed_at = time.monotonic()
+        return True
+
+    return renew
+
+
+def release_lease(name, owner):
+    """Give the lease up early so another node can take over immediately"""
+    WorkerLease.objects.filter(name=name, owner=owner).update(owner='', expires_at=timezone.now())
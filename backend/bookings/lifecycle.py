@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import COUNTED_ROW, Booking, BookingReservation
+from .signals import booking_status_changed
+from .slots import lock_mentors
+
+ACTIVE_STATUSES = ['pending', 'confirmed', 'in_progress']
+MOVE_BATCH_SIZE = 500
+
+
+def _move_bookings(to_status, now, renew=None, **conditions):
+    """Move matching bookings to `to_status` in locked batches, reporting each batch; returns how many moved"""
+    moved = 0
+    while True:
+        if renew is not None and not renew():
+            # Another node took the lease over and carries on from here
+            break
+        candidates = list(Booking.objects.filter(**conditions).order_by().values_list('pk', 'mentor_id')[:MOVE_BATCH_SIZE])
+        if not candidates:
+            break
+        with transaction.atomic():
+            # Mentors before bookings, as everywhere else that changes bookings
+            lock_mentors(mentor_id for _, mentor_id in candidates)
+            # With the rows locked no cancellation can slip in between the read and the UPDATE;
+            # rows that changed since the first read fail the conditions and are skipped
+            batch = list(
+                Booking.objects.select_for_update().filter(pk__in=[pk for pk, _ in candidates], **conditions)
+                .order_by().values('pk', *COUNTED_ROW, 'status')
+            )
+            if batch:
+                Booking.objects.filter(pk__in=[row['pk'] for row in batch]).update(status=to_status, updated_at=now)
+                booking_status_changed.send(sender=Booking, bookings=batch, to_status=to_status)
+        moved += len(batch)
+        if len(candidates) < MOVE_BATCH_SIZE:
+            break
+    return moved
+
+
+def advance_booking_statuses(now=None, renew=None):
+    """Move active bookings to in_progress/completed based on the session window.
+
+    `renew` (see lease_renewer) is called between batches; once it returns
+    False no further batch is started. Returns a dict with the number of
+    bookings started and completed.
+    """
+    now = now or timezone.now()
+    # Both reads are range scans on (status, session_end_at)
+    completed = _move_bookings('completed', now, renew, status__in=ACTIVE_STATUSES, session_end_at__lte=now)
+    started = _move_bookings(
+        'in_progress', now, renew, status__in=['pending', 'confirmed'], session_start_at__lte=now, session_end_at__gt=now
+    )
+    return {'started': started, 'completed': completed}
+
+
+def expire_booking_reservations(now=None):
+    """Delete lapsed booking reservations in one statement; returns how many went.
+
+    Overlap checks already ignore a reservation once it expires, so its slot is
+    free from then on. The row itself is kept for one more TTL so a payment that
+    lands just late can still be fulfilled if nobody has taken the slot.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=settings.BOOKING_RESERVATION_TTL_MINUTES)
+    # No cascades or signals hang off reservations, so this is a single DELETE
+    deleted, _ = BookingReservation.objects.filter(expires_at__lte=cutoff).delete()
+    return deleted
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.leases import acquire_lease, default_owner, lease_renewer, release_lease
+from bookings.outbox import build_digests, deliver_pending_emails
+
+LEASE_NAME = 'email-outbox'
+
+
+class Command(BaseCommand):
+    help = 'Merge due notification digests and deliver queued emails over a reused SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=5, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails per SMTP connection')
+        parser.add_argument('--once', action='store_true', help='Deliver a single batch and exit')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        owner = default_owner()
+        lease_ttl = max(interval * 2, 60)
+
+        try:
+            while True:
+                result = {'sent': 0, 'failed': 0}
+                if acquire_lease(LEASE_NAME, owner, lease_ttl):
+                    build_digests()
+                    result = deliver_pending_emails(
+                        batch_size=options['batch_size'], renew=lease_renewer(LEASE_NAME, owner, lease_ttl),
+                    )
+                    if result['sent'] or result['failed']:
+                        self.stdout.write(f"Sent {result['sent']}, failed {result['failed']} emails")
+                elif options['once']:
+                    self.stdout.write("Another node holds the outbox lease, skipping")
+
+                if options['once']:
+                    break
+                # Keep draining without pausing while there is a backlog
+                if not (result['sent'] or result['failed']):
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            release_lease(LEASE_NAME, owner)
@@ -0,0 +1,13 @@
+from bookings.counters import rebuild_counters
+from mentorship.rebuild import RebuildCommand
+
+
+class Command(RebuildCommand):
+    help = "Recompute every mentor's booking counters from the bookings table and fix any that drifted"
+    noun = 'mentors'
+
+    def rebuild(self, dry_run):
+        return rebuild_counters(dry_run=dry_run)
+
+    def describe(self, mentor_id):
+        return f"Mentor {mentor_id}"
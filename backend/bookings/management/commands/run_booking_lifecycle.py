@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.leases import acquire_lease, default_owner, lease_renewer, release_lease
+from bookings.lifecycle import advance_booking_statuses, expire_booking_reservations
+
+LEASE_NAME = 'booking-lifecycle'
+
+
+class Command(BaseCommand):
+    help = 'Move bookings to in_progress/completed and sweep expired reservations on a fixed tick (safe to run on several nodes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between ticks')
+        parser.add_argument('--once', action='store_true', help='Run a single tick and exit')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        owner = default_owner()
+        # The lease outlives one tick so a crashed node is replaced after a couple of intervals
+        lease_ttl = interval * 2
+
+        try:
+            while True:
+                if acquire_lease(LEASE_NAME, owner, lease_ttl):
+                    # A long backlog can outlast the TTL, so the lease is renewed between batches
+                    renew = lease_renewer(LEASE_NAME, owner, lease_ttl)
+                    result = advance_booking_statuses(renew=renew)
+                    if result['started'] or result['completed']:
+                        self.stdout.write(
+                            f"Started {result['started']}, completed {result['completed']} bookings"
+                        )
+                    expired = expire_booking_reservations() if renew() else 0
+                    if expired:
+                        self.stdout.write(f"Removed {expired} expired booking reservations")
+                elif options['once']:
+                    self.stdout.write("Another node holds the lifecycle lease, skipping")
+
+                if options['once']:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            release_lease(LEASE_NAME, owner)
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def backfill_session_window(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    batch = []
+    for booking in Booking.objects.filter(session_start_at__isnull=True).only(
+        'id', 'session_date', 'session_time', 'duration_minutes'
+    ).iterator(chunk_size=BATCH_SIZE):
+        if not (booking.session_date and booking.session_time):
+            continue
+        booking.session_start_at = timezone.make_aware(datetime.combine(booking.session_date, booking.session_time))
+        booking.session_end_at = booking.session_start_at + timedelta(minutes=booking.duration_minutes or 60)
+        batch.append(booking)
+        if len(batch) >= BATCH_SIZE:
+            Booking.objects.bulk_update(batch, ['session_start_at', 'session_end_at'])
+            batch = []
+    if batch:
+        Booking.objects.bulk_update(batch, ['session_start_at', 'session_end_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_session_window'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_session_window, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_outbound_email_digest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['mentee', 'session_date', 'session_time', 'id'], name='booking_mentee_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['mentor', 'session_date', 'session_time', 'id'], name='booking_mentor_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['session_date', 'session_time', 'id'], name='booking_page_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0003_availability'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0010_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_intent_id', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('session_type', models.CharField(choices=[('video_call', 'Video Call'), ('audio_call', 'Audio Call'), ('chat', 'Chat'), ('in_person', 'In Person')], default='video_call', max_length=20)),
+                ('session_date', models.DateField()),
+                ('session_time', models.TimeField()),
+                ('duration_minutes', models.IntegerField(default=60)),
+                ('topic', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('onsite_address', models.CharField(blank=True, max_length=255, null=True)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('session_start_at', models.DateTimeField()),
+                ('session_end_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('mentee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_reservations', to=settings.AUTH_USER_MODEL)),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_reservations', to='mentors.mentorprofile')),
+            ],
+            options={
+                'verbose_name': 'Booking Reservation',
+                'verbose_name_plural': 'Booking Reservations',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['mentor', 'expires_at', 'session_start_at'], name='reservation_mentor_idx'), models.Index(fields=['expires_at'], name='reservation_expires_idx')],
+            },
+        ),
+    ]
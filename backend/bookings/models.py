@@ -1,6 +1,12 @@
-from django.db import models
+import uuid
+from datetime import datetime, timedelta
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
+from django.utils import timezone
 from mentors.models import MentorProfile
+from .signals import booking_status_changed, bookings_created
 
 class Booking(models.Model):
     STATUS_CHOICES = (
@@ -35,11 +41,205 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     onsite_address = models.CharField(max_length=255, blank=True, null=True, help_text="Address for onsite sessions")
+    # Materialized from session_date/session_time/duration_minutes so range filters run in the DB
+    session_start_at = models.DateTimeField(blank=True, null=True, editable=False)
+    session_end_at = models.DateTimeField(blank=True, null=True, editable=False)
     
     def __str__(self):
         return f"{self.mentee.username} - {self.mentor.user.username} - {self.session_date}"
+
+    def sync_session_window(self):
+        """Recompute session_start_at/session_end_at from the date, time and duration"""
+        # Values may still be strings when the instance was built by hand
+        session_date = self._meta.get_field('session_date').to_python(self.session_date)
+        session_time = self._meta.get_field('session_time').to_python(self.session_time)
+        if session_date and session_time:
+            self.session_start_at = timezone.make_aware(datetime.combine(session_date, session_time))
+            self.session_end_at = self.session_start_at + timedelta(minutes=int(self.duration_minutes or 60))
+        else:
+            self.session_start_at = None
+            self.session_end_at = None
+
+    def save(self, *args, **kwargs):
+        self.sync_session_window()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'session_start_at', 'session_end_at'}
+        super().save(*args, **kwargs)
     
     class Meta:
         ordering = ['-session_date', '-session_time']
         verbose_name = "Booking"
         verbose_name_plural = "Bookings"
+        indexes = [
+            models.Index(fields=['mentor', 'session_end_at'], name='booking_mentor_end_idx'),
+            models.Index(fields=['mentee', 'session_end_at'], name='booking_mentee_end_idx'),
+            models.Index(fields=['status', 'session_end_at'], name='booking_status_end_idx'),
+            # Keyset pagination over (-session_date, -session_time, -id)
+            models.Index(fields=['mentee', 'session_date', 'session_time', 'id'], name='booking_mentee_page_idx'),
+            models.Index(fields=['mentor', 'session_date', 'session_time', 'id'], name='booking_mentor_page_idx'),
+            models.Index(fields=['session_date', 'session_time', 'id'], name='booking_page_idx'),
+        ]
+
+
+class WorkerLease(models.Model):
+    """Lease row that lets only one node run a background job at a time"""
+    name = models.CharField(max_length=100, primary_key=True)
+    owner = models.CharField(max_length=255, blank=True, default='')
+    expires_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.owner or 'free'} until {self.expires_at}"
+
+    class Meta:
+        verbose_name = "Worker Lease"
+        verbose_name_plural = "Worker Leases"
+
+
+class OutboundEmail(models.Model):
+    """Transactional outbox row, written with the booking change and drained by deliver_outbox"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('digest', 'Awaiting Digest'),
+        ('digested', 'Merged Into Digest'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    to_email = models.EmailField()
+    from_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} - {self.status}"
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+            models.Index(fields=['status', 'to_email', 'created_at'], name='outbox_status_to_idx'),
+        ]
+
+
+class BookingReservation(models.Model):
+    """Booking draft awaiting payment; holds the mentor's slot until expires_at"""
+    mentee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_reservations')
+    mentor = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='booking_reservations')
+    # Filled in once Stripe has created the intent; NULLs do not clash in the unique index
+    payment_intent_id = models.CharField(max_length=255, unique=True, blank=True, null=True)
+    session_type = models.CharField(max_length=20, choices=Booking.SESSION_TYPES, default='video_call')
+    session_date = models.DateField()
+    session_time = models.TimeField()
+    duration_minutes = models.IntegerField(default=60)
+    topic = models.CharField(max_length=200)
+    description = models.TextField(blank=True, null=True)
+    onsite_address = models.CharField(max_length=255, blank=True, null=True)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    session_start_at = models.DateTimeField()
+    session_end_at = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.payment_intent_id or 'unpaid'} - {self.session_date} until {self.expires_at}"
+
+    def to_booking(self):
+        """Unsaved Booking built from the already validated draft"""
+        booking = Booking(
+            mentee_id=self.mentee_id,
+            mentor_id=self.mentor_id,
+            session_type=self.session_type,
+            session_date=self.session_date,
+            session_time=self.session_time,
+            duration_minutes=self.duration_minutes,
+            topic=self.topic,
+            description=self.description,
+            onsite_address=self.onsite_address,
+            total_amount=self.total_amount,
+        )
+        if self.session_type == 'video_call':
+            booking.meeting_link = f"https://meet.google.com/mentor-{uuid.uuid4().hex[:12]}"
+        return booking
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Booking Reservation"
+        verbose_name_plural = "Booking Reservations"
+        indexes = [
+            models.Index(fields=['mentor', 'expires_at', 'session_start_at'], name='reservation_mentor_idx'),
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+
+COUNTED_FIELDS = {'mentor', 'mentor_id', 'mentee', 'mentee_id', 'status', 'total_amount', 'duration_minutes', 'session_date'}
+# What booking_status_changed carries per row, besides the old status
+COUNTED_ROW = ('mentor_id', 'mentee_id', 'total_amount', 'duration_minutes', 'session_date')
+
+def lock_counted_mentors(*mentor_ids):
+    """Inside a transaction, lock the mentors whose counters a booking write is about to change"""
+    from .slots import lock_mentors
+    # Without one the booking write and the counter update commit separately and hold no locks together
+    if transaction.get_connection().in_atomic_block:
+        lock_mentors(mentor_id for mentor_id in mentor_ids if mentor_id is not None)
+
+@receiver(pre_save, sender=Booking)
+def remember_counted_row(sender, instance, raw, update_fields=None, **kwargs):
+    # The stored values, so post_save receivers can apply the difference
+    instance._previous_row = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not COUNTED_FIELDS.intersection(update_fields):
+        return
+    row = Booking.objects.filter(pk=instance.pk).values(*COUNTED_ROW, 'status').first()
+    if row is not None:
+        lock_counted_mentors(row['mentor_id'], instance.mentor_id)
+        instance._previous_row = row
+
+@receiver(pre_delete, sender=Booking)
+def lock_deleted_booking_mentor(sender, instance, **kwargs):
+    lock_counted_mentors(instance.mentor_id)
+
+@receiver(post_save, sender=Booking)
+def count_saved_booking(sender, instance, created, raw, **kwargs):
+    from .counters import contribution, record_changes
+    previous = getattr(instance, '_previous_row', None)
+    if raw or (not created and previous is None):
+        return
+    record_changes(
+        added=[(instance.mentor_id, contribution(instance.status, instance.total_amount, instance.duration_minutes))],
+        removed=[
+            (previous['mentor_id'], contribution(previous['status'], previous['total_amount'], previous['duration_minutes']))
+        ] if previous else [],
+    )
+
+@receiver(post_delete, sender=Booking)
+def count_deleted_booking(sender, instance, **kwargs):
+    from .counters import contribution, record_changes
+    record_changes(removed=[(instance.mentor_id, contribution(instance.status, instance.total_amount, instance.duration_minutes))])
+
+@receiver(booking_status_changed)
+def count_status_change(sender, bookings, to_status, **kwargs):
+    from .counters import contribution, record_changes
+    record_changes(
+        added=[(row['mentor_id'], contribution(to_status, row['total_amount'], row['duration_minutes'])) for row in bookings],
+        removed=[(row['mentor_id'], contribution(row['status'], row['total_amount'], row['duration_minutes'])) for row in bookings],
+    )
+
+@receiver(bookings_created)
+def count_created_bookings(sender, bookings, **kwargs):
+    from .counters import contribution, record_changes
+    record_changes(added=[
+        (booking.mentor_id, contribution(booking.status, booking.total_amount, booking.duration_minutes))
+        for booking in bookings
+    ])
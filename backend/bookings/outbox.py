@@ -0,0 +1,170 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.html import escape, linebreaks
+
+from .models import OutboundEmail
+
+
+def wants_digest(user):
+    """True if the user opted into digest notifications on their profile"""
+    profile = getattr(user, 'profile', None) if user is not None else None
+    return profile is not None and profile.notification_frequency == 'digest'
+
+
+def enqueue_email(subject, message, recipient, html_message=None, from_email=None, digest_user=None):
+    """Queue an email for delivery; call inside the transaction that caused it.
+
+    Pass `digest_user` for notifications that can wait: if that user opted into
+    digests, the email is held and merged into their next digest instead.
+    """
+    return OutboundEmail.objects.create(
+        to_email=recipient,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        subject=subject[:255],
+        body=message,
+        html_body=html_message,
+        status='digest' if wants_digest(digest_user) else 'pending',
+    )
+
+
+def _compact(text):
+    """Drop the template indentation and blank lines left over from strip_tags"""
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _build_digest(to_email, items):
+    count = len(items)
+    subject = f"Your MentorConnect updates: {count} new notification{'s' if count != 1 else ''}"
+    body = '\n\n'.join(f"{item.subject}\n{'-' * len(item.subject)}\n{_compact(item.body)}" for item in items)
+    sections = ''.join(f"<h3>{escape(item.subject)}</h3>{linebreaks(_compact(item.body))}" for item in items)
+    html_body = f"""
+        <html>
+        <body>
+            <h2>{escape(subject)}</h2>
+            {sections}
+            <p>Best regards,<br>MentorConnect Team</p>
+        </body>
+        </html>
+        """
+    return OutboundEmail(
+        to_email=to_email,
+        from_email=items[0].from_email,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+    )
+
+
+def build_digests(now=None):
+    """Merge held notifications into one email per recipient once their window has passed.
+
+    Returns the number of digest emails queued.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=settings.EMAIL_DIGEST_WINDOW_MINUTES)
+    due_recipients = (
+        OutboundEmail.objects.filter(status='digest')
+        .values('to_email')
+        .annotate(oldest=Min('created_at'))
+        .filter(oldest__lte=cutoff)
+        .values_list('to_email', flat=True)
+    )
+
+    queued = 0
+    for to_email in list(due_recipients):
+        with transaction.atomic():
+            items = list(
+                OutboundEmail.objects.select_for_update()
+                .filter(status='digest', to_email=to_email)
+                .order_by('id')
+            )
+            if not items:
+                continue
+            _build_digest(to_email, items).save()
+            OutboundEmail.objects.filter(pk__in=[item.pk for item in items]).update(status='digested')
+            queued += 1
+    return queued
+
+
+def _retry_delay(attempts):
+    """Exponential backoff with jitter, capped at EMAIL_OUTBOX_MAX_RETRY_DELAY"""
+    delay = settings.EMAIL_OUTBOX_RETRY_BASE_DELAY * (2 ** (attempts - 1))
+    delay = min(delay, settings.EMAIL_OUTBOX_MAX_RETRY_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=[email.to_email],
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _record_failure(email, error, now):
+    attempts = email.attempts + 1
+    if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        status, next_attempt_at = 'failed', email.next_attempt_at
+    else:
+        status, next_attempt_at = 'pending', now + _retry_delay(attempts)
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        status=status, attempts=attempts, next_attempt_at=next_attempt_at, last_error=str(error)[:2000]
+    )
+
+
+def deliver_pending_emails(batch_size=None, connection=None, renew=None):
+    """Send one batch of due emails over a single reused connection.
+
+    `renew` (see lease_renewer) is called before each email; once it returns
+    False the rest of the batch is left for the node that took over. Returns a
+    dict with the number of emails sent and failed.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    emails = list(
+        OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=now).order_by('id')[:batch_size]
+    )
+    if not emails:
+        return {'sent': 0, 'failed': 0}
+
+    connection = connection or get_connection(fail_silently=False)
+    sent_ids, failed = [], 0
+    try:
+        connection.open()
+    except Exception as e:
+        # The mail server is unreachable; back off the whole batch
+        for email in emails:
+            _record_failure(email, e, now)
+        return {'sent': 0, 'failed': len(emails)}
+
+    try:
+        for email in emails:
+            if renew is not None and not renew():
+                break
+            # One message per send_messages call keeps failures attributable
+            # to a single row while the SMTP session stays open.
+            try:
+                connection.send_messages([_build_message(email, connection)])
+                sent_ids.append(email.pk)
+            except Exception as e:
+                _record_failure(email, e, now)
+                failed += 1
+    finally:
+        connection.close()
+
+    if sent_ids:
+        OutboundEmail.objects.filter(pk__in=sent_ids).update(
+            status='sent', sent_at=timezone.now(), last_error=None
+        )
+    return {'sent': len(sent_ids), 'failed': failed}
@@ -1,6 +1,13 @@
+import uuid
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Booking
+from .signals import bookings_created
+from .slots import SlotUnavailable, ensure_slot_free, find_conflicts
 from users.serializers import UserSerializer
+from mentors.models import MentorProfile
 from mentors.serializers import MentorListSerializer
 from decimal import Decimal
 
@@ -41,8 +48,108 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         
         # Generate Google Meet link for video calls
         if validated_data.get('session_type') == 'video_call':
-            import uuid
             meeting_id = f"mentor-{uuid.uuid4().hex[:12]}"
             validated_data['meeting_link'] = f"https://meet.google.com/{meeting_id}"
         
-        return super().create(validated_data) 
\ No newline at end of file
+        # Check and insert under the mentor's lock so concurrent requests cannot double-book
+        window = Booking(**{field: validated_data.get(field) for field in ('session_date', 'session_time', 'duration_minutes')})
+        window.sync_session_window()
+        with transaction.atomic():
+            try:
+                ensure_slot_free(mentor.id, window.session_start_at, window.session_end_at)
+            except SlotUnavailable as e:
+                raise serializers.ValidationError({'session_time': [str(e)]})
+            return super().create(validated_data) 
+
+MAX_SERIES_SESSIONS = 52
+
+class RecurrenceSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    interval_weeks = serializers.IntegerField(default=1, min_value=1, max_value=4)
+    count = serializers.IntegerField(min_value=1, max_value=MAX_SERIES_SESSIONS)
+
+class BookingSeriesCreateSerializer(serializers.Serializer):
+    """Create several sessions with one mentor at the same time of day in one request"""
+    MAX_SESSIONS = MAX_SERIES_SESSIONS
+
+    mentor = serializers.PrimaryKeyRelatedField(queryset=MentorProfile.objects.all())
+    session_type = serializers.ChoiceField(choices=Booking.SESSION_TYPES, default='video_call')
+    session_time = serializers.TimeField()
+    duration_minutes = serializers.IntegerField(default=60, min_value=15, max_value=480)
+    topic = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    onsite_address = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    dates = serializers.ListField(child=serializers.DateField(), required=False, allow_empty=False)
+    recurrence = RecurrenceSerializer(required=False)
+
+    def validate(self, data):
+        dates = data.get('dates')
+        recurrence = data.get('recurrence')
+        if bool(dates) == bool(recurrence):
+            raise serializers.ValidationError("Provide either a list of dates or a recurrence rule")
+        if recurrence:
+            dates = [
+                recurrence['start_date'] + timedelta(weeks=recurrence['interval_weeks'] * i)
+                for i in range(recurrence['count'])
+            ]
+        dates = sorted(set(dates))
+        if len(dates) > self.MAX_SESSIONS:
+            raise serializers.ValidationError(f"A series can have at most {self.MAX_SESSIONS} sessions")
+
+        windows = []
+        for session_date in dates:
+            window = Booking(session_date=session_date, session_time=data['session_time'], duration_minutes=data['duration_minutes'])
+            window.sync_session_window()
+            windows.append((window.session_start_at, window.session_end_at))
+        if windows[0][0] <= timezone.now():
+            raise serializers.ValidationError({'dates': ["Sessions must be in the future"]})
+        for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+            if next_start < previous_end:
+                raise serializers.ValidationError({'dates': ["Sessions in the series overlap each other"]})
+
+        data['dates'] = dates
+        data['windows'] = windows
+        return data
+
+    def create(self, validated_data):
+        mentee = validated_data['mentee']
+        mentor = validated_data['mentor']
+        windows = validated_data['windows']
+        duration_minutes = validated_data['duration_minutes']
+        amount = mentor.hourly_rate * Decimal(duration_minutes) / Decimal(60)
+
+        bookings = []
+        for session_date, (start, end) in zip(validated_data['dates'], windows):
+            booking = Booking(
+                mentee=mentee,
+                mentor=mentor,
+                session_type=validated_data['session_type'],
+                session_date=session_date,
+                session_time=validated_data['session_time'],
+                duration_minutes=duration_minutes,
+                topic=validated_data['topic'],
+                description=validated_data.get('description'),
+                onsite_address=validated_data.get('onsite_address'),
+                total_amount=amount,
+                session_start_at=start,
+                session_end_at=end,
+            )
+            if booking.session_type == 'video_call':
+                booking.meeting_link = f"https://meet.google.com/mentor-{uuid.uuid4().hex[:12]}"
+            bookings.append(booking)
+
+        with transaction.atomic():
+            conflicts = find_conflicts(mentor.id, windows)
+            if conflicts:
+                taken = [timezone.localtime(start).date() for start, _ in conflicts]
+                raise serializers.ValidationError({'dates': [f"The mentor is already booked on {', '.join(map(str, taken))}"]})
+            Booking.objects.bulk_create(bookings)
+            bookings_created.send(sender=Booking, bookings=bookings)
+
+        # bulk_create does not return primary keys on MySQL, so read the rows back
+        return list(
+            Booking.objects.filter(
+                mentor=mentor, mentee=mentee, status='pending',
+                session_start_at__in=[start for start, _ in windows],
+            ).select_related('mentee', 'mentor__user__profile').prefetch_related('mentor__expertise').order_by('session_start_at')
+        )
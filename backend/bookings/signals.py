@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Sent after a bulk UPDATE moved bookings to `to_status`, where post_save does
+# not fire. `bookings` is a list of dicts with the rows' COUNTED_ROW values and
+# their previous `status`, read under a row lock before the UPDATE.
+booking_status_changed = Signal()
+
+# Sent after Booking.objects.bulk_create() with the new `bookings`.
+bookings_created = Signal()
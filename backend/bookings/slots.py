@@ -0,0 +1,107 @@
+from django.utils import timezone
+
+from mentors.models import MentorProfile
+
+from .models import Booking, BookingReservation
+
+# Bookings in these states hold the mentor's time
+BLOCKING_STATUSES = ['pending', 'confirmed', 'in_progress']
+
+
+class SlotUnavailable(Exception):
+    """The requested session overlaps a booking or reservation the mentor already has"""
+
+
+def lock_mentor_schedule(mentor_id):
+    """Serialize booking writes for one mentor; must run inside transaction.atomic()"""
+    MentorProfile.objects.select_for_update().only('id').get(pk=mentor_id)
+
+
+def lock_mentors(mentor_ids):
+    """
+    lock_mentor_schedule for several mentors, in id order.
+
+    Booking changes update the mentor's counters, so every write path takes the
+    mentor lock before it locks or writes any booking row. Taking the booking
+    first would deadlock against booking creation, which starts at the mentor.
+    """
+    list(MentorProfile.objects.select_for_update().filter(pk__in=set(mentor_ids)).order_by('pk').values_list('pk', flat=True))
+
+
+def overlapping_bookings(mentor_id, start, end):
+    """Active bookings for the mentor that intersect [start, end)"""
+    return Booking.objects.filter(
+        mentor_id=mentor_id,
+        status__in=BLOCKING_STATUSES,
+        session_start_at__lt=end,
+        session_end_at__gt=start,
+    )
+
+
+def overlapping_reservations(mentor_id, start, end, now=None):
+    """Unexpired payment reservations for the mentor that intersect [start, end)"""
+    return BookingReservation.objects.filter(
+        mentor_id=mentor_id,
+        expires_at__gt=now or timezone.now(),
+        session_start_at__lt=end,
+        session_end_at__gt=start,
+    )
+
+
+def ensure_slot_free(mentor_id, start, end, exclude_reservation=None):
+    """
+    Lock the mentor's schedule and raise SlotUnavailable if [start, end) is taken.
+
+    Call inside the same transaction.atomic() block that inserts the booking, so
+    the mentor row lock is held until the insert commits. Other mentors are not
+    blocked, so non-conflicting bookings keep their throughput.
+    `exclude_reservation` is the caller's own reservation when converting or renewing it.
+    """
+    lock_mentor_schedule(mentor_id)
+    # A locking read sees rows committed by the transaction we just waited on,
+    # whatever snapshot this transaction may already hold.
+    if overlapping_bookings(mentor_id, start, end).select_for_update().exists():
+        raise SlotUnavailable("The mentor already has a session booked at this time")
+    reservations = overlapping_reservations(mentor_id, start, end)
+    if exclude_reservation is not None:
+        reservations = reservations.exclude(pk=exclude_reservation)
+    if reservations.select_for_update().exists():
+        raise SlotUnavailable("This time is being held for another booking, try again shortly")
+
+
+def find_conflicts(mentor_id, windows):
+    """
+    Lock the mentor's schedule and return the (start, end) windows that are taken.
+
+    `windows` must be sorted by start. All existing bookings across the whole
+    span and the unexpired reservations are read in one locking query each and
+    compared in a single sweep.
+    """
+    lock_mentor_schedule(mentor_id)
+    if not windows:
+        return []
+    span_start, span_end = windows[0][0], max(end for _, end in windows)
+    busy = sorted(
+        list(
+            overlapping_bookings(mentor_id, span_start, span_end)
+            .select_for_update()
+            .values_list('session_start_at', 'session_end_at')
+        )
+        + list(
+            overlapping_reservations(mentor_id, span_start, span_end)
+            .select_for_update()
+            .values_list('session_start_at', 'session_end_at')
+        )
+    )
+    conflicts = []
+    first_busy = 0
+    for start, end in windows:
+        while first_busy < len(busy) and busy[first_busy][1] <= start:
+            first_busy += 1
+        index = first_busy
+        while index < len(busy) and busy[index][0] < end:
+            if busy[index][1] > start:
+                conflicts.append((start, end))
+                break
+            index += 1
+    return conflicts
@@ -1,3 +1,621 @@
-from django.test import TestCase
+import threading
+from unittest import mock
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import stripe
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from rest_framework.test import APIClient
+from django.utils import timezone
+
+from mentors.models import Expertise, MentorProfile
+from mentors.tests import create_mentor
+from mentorship.rebuild import rebuild_rows
+from mentorship.testing import QueryCountMixin
+from payments import gateway
+from payments.fake_stripe import FakeStripeServer
+from payments.models import Payment
+from users.models import UserStats
+from users.stats import live_stats, materialized_stats
+
+from .counters import COUNTER_FIELDS, expected_counters, rebuild_counters
+from .leases import acquire_lease, lease_renewer
+from .lifecycle import advance_booking_statuses
+from .models import Booking, BookingReservation, OutboundEmail, WorkerLease
+from .outbox import build_digests, deliver_pending_emails, enqueue_email
+from .transitions import TransitionError, transition_booking
+
+
+def create_booking(mentee, mentor, start, status='pending', minutes=60, amount='50.00'):
+    return Booking.objects.create(
+        mentee=mentee, mentor=mentor, session_date=start.date(), session_time=start.time(),
+        duration_minutes=minutes, topic='Career advice', total_amount=Decimal(amount), status=status,
+    )
+
+
+def counters(mentor):
+    return MentorProfile.objects.filter(pk=mentor.pk).values_list(*MentorProfile.COUNTER_FIELDS).get()
+
+
+class BookingStatusTests(TestCase):
+    def setUp(self):
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.mentor = create_mentor('mentor')
+        self.now = timezone.make_aware(datetime.combine(timezone.localdate(), time(12)))
+
+    def test_transition_updates_status_and_counters(self):
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+
+        transition_booking(booking.pk, 'cancel', self.mentee)
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'cancelled')
+        self.assertEqual(counters(self.mentor), (0, 0, 0, Decimal('0')))
+
+    def test_transition_by_someone_else_is_forbidden(self):
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+        stranger = User.objects.create_user('stranger', 'stranger@example.com', 'pw')
+
+        with self.assertRaises(TransitionError) as error:
+            transition_booking(booking.pk, 'cancel', stranger)
+
+        self.assertEqual(error.exception.status_code, 403)
+        self.assertEqual(Booking.objects.get().status, 'pending')
+
+    def test_someone_else_takes_no_lock(self):
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+        stranger = User.objects.create_user('stranger', 'stranger@example.com', 'pw')
+
+        with mock.patch('bookings.transitions.lock_mentor_schedule') as lock, self.assertRaises(TransitionError):
+            transition_booking(booking.pk, 'accept', stranger)
+
+        lock.assert_not_called()
+
+    def test_single_source_transition_counts_the_written_row(self):
+        booking = create_booking(self.mentee, self.mentor, self.now - timedelta(days=1), status='confirmed', minutes=90, amount='75.00')
+
+        transition_booking(booking.pk, 'complete', self.mentor.user)
+
+        self.assertEqual(counters(self.mentor), (1, 1, 90, Decimal('75.00')))
+
+    @override_settings(USER_STATS_MATERIALIZED=True)
+    def test_ambiguous_source_reports_the_status_it_left(self):
+        UserStats.objects.create(user=self.mentee)
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1), status='confirmed')
+
+        transition_booking(booking.pk, 'cancel', self.mentee)
+
+        self.assertEqual(materialized_stats(self.mentee)['upcoming_sessions'], 0)
+        self.assertEqual(materialized_stats(self.mentee), live_stats(self.mentee))
+
+    def test_saving_uncounted_fields_skips_the_counter_read(self):
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+        booking.meeting_link = 'https://meet.example.com/abc'
+
+        with self.assertNumQueries(1), mock.patch('bookings.models.lock_counted_mentors') as lock:
+            booking.save(update_fields=['meeting_link', 'updated_at'])
+
+        lock.assert_not_called()
+
+    def test_confirming_a_video_booking_keeps_the_link(self):
+        booking = create_booking(self.mentee, self.mentor, self.now + timedelta(days=1))
+        Booking.objects.filter(pk=booking.pk).update(session_type='video')
+
+        response = self.client.post(
+            '/api/bookings/confirm/', {'booking_id': booking.pk}, content_type='application/json',
+        )
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.meeting_link, response.json()['meet_link'])
+        self.assertEqual(booking.status, 'confirmed')
+        self.assertEqual(counters(self.mentor), (1, 0, 0, Decimal('0')))
+
+    def test_lifecycle_starts_and_completes_sessions_across_mentors(self):
+        other = create_mentor('other')
+        finished = create_booking(self.mentee, self.mentor, self.now - timedelta(hours=3), status='confirmed')
+        running = create_booking(self.mentee, other, self.now - timedelta(minutes=30))
+        cancelled = create_booking(self.mentee, other, self.now - timedelta(hours=3), status='cancelled')
+
+        self.assertEqual(advance_booking_statuses(self.now), {'started': 1, 'completed': 1})
+
+        statuses = dict(Booking.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {finished.pk: 'completed', running.pk: 'in_progress', cancelled.pk: 'cancelled'})
+        self.assertEqual(counters(self.mentor), (1, 1, 60, Decimal('50.00')))
+        self.assertEqual(counters(other), (1, 0, 0, Decimal('0')))
+
+
+class RebuildCountersTests(TestCase):
+    def setUp(self):
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.mentor = create_mentor('mentor')
+        self.idle = create_mentor('idle')
+        start = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=1), time(10)))
+        create_booking(self.mentee, self.mentor, start, status='completed')
+        create_booking(self.mentee, self.mentor, start + timedelta(hours=2))
+
+    def test_drifted_counters_are_reported_and_fixed(self):
+        MentorProfile.objects.update(total_sessions=9, total_earnings=1)
+
+        self.assertEqual(len(rebuild_counters(dry_run=True)), 2)
+        self.assertEqual(counters(self.mentor), (9, 1, 60, Decimal('1')))
+
+        drifted = rebuild_counters()
+
+        self.assertEqual({mentor_id for mentor_id, _, _ in drifted}, {self.mentor.pk, self.idle.pk})
+        self.assertEqual(counters(self.mentor), (2, 1, 60, Decimal('50.00')))
+        self.assertEqual(counters(self.idle), (0, 0, 0, Decimal('0')))
+        self.assertEqual(rebuild_counters(dry_run=True), [])
+
+    def test_walks_every_batch(self):
+        MentorProfile.objects.update(total_sessions=9)
+
+        drifted = rebuild_rows(MentorProfile.objects.all(), COUNTER_FIELDS, expected_counters, lambda rows: None, batch_size=1)
+
+        self.assertEqual(len(drifted), 2)
+
+
+class BookingQueryCountTests(QueryCountMixin, TestCase):
+    """Each booking nests its mentee and a mentor with expertise; none of that may cost a query per row"""
+
+    def setUp(self):
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.mentor = create_mentor('mentor')
+        self.expertise = [Expertise.objects.create(name=name) for name in ('Python', 'Career')]
+        self.start = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), time(8)))
+        self.client = APIClient()
+
+    def seed_mentee_bookings(self, n, status='pending', days=1):
+        # A different mentor for every booking
+        while Booking.objects.count() < n:
+            mentor = create_mentor(f'mentor{Booking.objects.count()}')
+            mentor.expertise.set(self.expertise)
+            create_booking(self.mentee, mentor, self.start + timedelta(days=days - 1), status=status)
+
+    def seed_mentor_bookings(self, n):
+        # A different mentee for every booking
+        while Booking.objects.count() < n:
+            mentee = User.objects.create_user(f'mentee{Booking.objects.count()}', 'm@example.com', 'pw')
+            create_booking(mentee, self.mentor, self.start + timedelta(hours=Booking.objects.count()))
+
+    def test_mentee_list(self):
+        self.client.force_authenticate(self.mentee)
+        self.assertConstantQueries(self.seed_mentee_bookings, lambda: self.client.get('/api/bookings/'))
+
+    def test_mentor_list(self):
+        self.client.force_authenticate(self.mentor.user)
+        self.assertConstantQueries(self.seed_mentor_bookings, lambda: self.client.get('/api/bookings/'))
+
+    def test_upcoming(self):
+        self.client.force_authenticate(self.mentee)
+        self.assertConstantQueries(self.seed_mentee_bookings, lambda: self.client.get('/api/bookings/upcoming/'))
+
+    def test_past(self):
+        self.client.force_authenticate(self.mentee)
+        self.assertConstantQueries(
+            lambda n: self.seed_mentee_bookings(n, status='completed', days=-3), lambda: self.client.get('/api/bookings/past/'),
+        )
+
+    def test_detail(self):
+        self.client.force_authenticate(self.mentee)
+        self.seed_mentee_bookings(1)
+        booking = Booking.objects.get()
+
+        def seed_expertise(n):
+            booking.mentor.expertise.set([Expertise.objects.get_or_create(name=f'Topic {i}')[0] for i in range(n)])
+
+        self.assertConstantQueries(seed_expertise, lambda: self.client.get(f'/api/bookings/{booking.pk}/'))
+
+
+class WorkerLeaseTests(TestCase):
+    def setUp(self):
+        self.clock = 1000.0
+        patched = mock.patch('bookings.leases.time.monotonic', side_effect=lambda: self.clock)
+        patched.start()
+        self.addCleanup(patched.stop)
+        self.assertTrue(acquire_lease('job', 'node-a', 30))
+        self.renew = lease_renewer('job', 'node-a', 30)
+
+    def expire(self):
+        WorkerLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_renewal_extends_the_lease_after_a_third_of_its_ttl(self):
+        WorkerLease.objects.update(expires_at=timezone.now() + timedelta(seconds=5))
+
+        self.clock += 9
+        self.assertTrue(self.renew())
+        self.assertLess(WorkerLease.objects.get().expires_at, timezone.now() + timedelta(seconds=6))
+
+        self.clock += 1
+        self.assertTrue(self.renew())
+        self.assertGreater(WorkerLease.objects.get().expires_at, timezone.now() + timedelta(seconds=25))
+
+    def test_renewal_fails_once_another_node_took_over(self):
+        self.expire()
+        self.assertTrue(acquire_lease('job', 'node-b', 30))
+
+        self.clock += 10
+
+        self.assertFalse(self.renew())
+        self.assertEqual(WorkerLease.objects.get().owner, 'node-b')
+
+    def test_lifecycle_stops_between_batches_once_the_lease_is_lost(self):
+        mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        mentor = create_mentor('mentor')
+        past = timezone.now() - timedelta(days=1)
+        for hour in range(3):
+            create_booking(mentee, mentor, past + timedelta(hours=hour), status='confirmed')
+        held = iter([True, True, False])
+
+        with mock.patch('bookings.lifecycle.MOVE_BATCH_SIZE', 1):
+            result = advance_booking_statuses(renew=lambda: next(held, False))
+
+        self.assertEqual(result, {'started': 0, 'completed': 2})
+        self.assertEqual(Booking.objects.filter(status='confirmed').count(), 1)
+
+    def test_outbox_leaves_the_rest_of_the_batch_once_the_lease_is_lost(self):
+        for i in range(3):
+            enqueue_email('Subject', 'Body', f'user{i}@example.com')
+        held = iter([True, False])
+
+        result = deliver_pending_emails(connection=CountingBackend(), renew=lambda: next(held, False))
+
+        self.assertEqual(result, {'sent': 1, 'failed': 0})
+        self.assertEqual(OutboundEmail.objects.filter(status='pending').count(), 2)
+
+
+class CountingBackend(EmailBackend):
+    """The locmem backend, counting connections and failing for chosen recipients"""
+
+    def __init__(self, *args, fail_for=(), unreachable=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_for = set(fail_for)
+        self.unreachable = unreachable
+        self.opened = 0
+
+    def open(self):
+        if self.unreachable:
+            raise ConnectionRefusedError('SMTP server unreachable')
+        self.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.fail_for.intersection(message.to):
+                raise OSError(f'Mailbox unavailable: {message.to[0]}')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_BASE_DELAY=30)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.mentor = create_mentor('mentor')
+        self.booking = create_booking(self.mentee, self.mentor, timezone.now() + timedelta(days=2))
+        self.client = APIClient()
+
+    def test_status_change_queues_email_instead_of_sending(self):
+        self.client.force_authenticate(self.mentee)
+
+        response = self.client.post(f'/api/bookings/{self.booking.pk}/cancel/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            sorted(OutboundEmail.objects.filter(status='pending').values_list('to_email', flat=True)),
+            ['mentee@example.com', 'mentor@example.com'],
+        )
+
+    def test_email_is_not_queued_when_the_transaction_rolls_back(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            enqueue_email('Subject', 'Body', 'mentee@example.com')
+            raise RuntimeError
+
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_worker_sends_a_batch_over_one_connection(self):
+        for i in range(5):
+            enqueue_email(f'Subject {i}', 'Body', f'user{i}@example.com', html_message='<p>Body</p>')
+        connection = CountingBackend()
+
+        self.assertEqual(deliver_pending_emails(connection=connection), {'sent': 5, 'failed': 0})
+
+        self.assertEqual(connection.opened, 1)
+        self.assertEqual([message.subject for message in mail.outbox], [f'Subject {i}' for i in range(5)])
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>Body</p>', 'text/html')])
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 5)
+        # Nothing left to send
+        self.assertEqual(deliver_pending_emails(connection=CountingBackend()), {'sent': 0, 'failed': 0})
+
+    def test_failed_email_backs_off_and_eventually_gives_up(self):
+        enqueue_email('Fine', 'Body', 'fine@example.com')
+        broken = enqueue_email('Broken', 'Body', 'broken@example.com')
+
+        result = deliver_pending_emails(connection=CountingBackend(fail_for=['broken@example.com']))
+
+        self.assertEqual(result, {'sent': 1, 'failed': 1})
+        broken.refresh_from_db()
+        self.assertEqual((broken.status, broken.attempts), ('pending', 1))
+        self.assertIn('Mailbox unavailable', broken.last_error)
+        self.assertGreater(broken.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        # Not due yet
+        self.assertEqual(deliver_pending_emails(connection=CountingBackend()), {'sent': 0, 'failed': 0})
+
+        for _ in range(2):
+            OutboundEmail.objects.filter(pk=broken.pk).update(next_attempt_at=timezone.now())
+            deliver_pending_emails(connection=CountingBackend(fail_for=['broken@example.com']))
+        broken.refresh_from_db()
+        self.assertEqual((broken.status, broken.attempts), ('failed', 3))
+
+    def test_unreachable_server_backs_off_the_whole_batch(self):
+        enqueue_email('One', 'Body', 'one@example.com')
+        enqueue_email('Two', 'Body', 'two@example.com')
+
+        self.assertEqual(deliver_pending_emails(connection=CountingBackend(unreachable=True)), {'sent': 0, 'failed': 2})
+
+        self.assertEqual(list(OutboundEmail.objects.values_list('status', 'attempts')), [('pending', 1), ('pending', 1)])
+        self.assertEqual(mail.outbox, [])
+
+    @override_settings(EMAIL_DIGEST_WINDOW_MINUTES=60)
+    def test_digest_notifications_are_merged_once_the_window_passes(self):
+        self.mentee.profile.notification_frequency = 'digest'
+        self.mentee.profile.save()
+        enqueue_email('Declined', 'First', 'mentee@example.com', digest_user=self.mentee)
+        enqueue_email('Completed', 'Second', 'mentee@example.com', digest_user=self.mentee)
+
+        self.assertEqual(build_digests(), 0)
+        self.assertEqual(deliver_pending_emails(connection=CountingBackend()), {'sent': 0, 'failed': 0})
+
+        self.assertEqual(build_digests(now=timezone.now() + timedelta(minutes=61)), 1)
+        deliver_pending_emails(connection=CountingBackend())
+        [digest] = mail.outbox
+        self.assertIn('2 new notifications', digest.subject)
+        self.assertIn('First', digest.body)
+        self.assertIn('Second', digest.body)
+
+
+class DoubleBookingTests(TestCase):
+    def setUp(self):
+        self.mentor = create_mentor('mentor')
+        self.client = APIClient()
+        self.day = (timezone.localdate() + timedelta(days=14)).isoformat()
+
+    def book(self, username, session_time):
+        self.client.force_authenticate(User.objects.create_user(username, f'{username}@example.com', 'pw'))
+        return self.client.post('/api/bookings/', {
+            'mentor': self.mentor.pk, 'session_date': self.day, 'session_time': session_time,
+            'duration_minutes': 60, 'topic': 'Career advice', 'session_type': 'chat',
+        }, format='json')
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book('first', '10:00').status_code, 201)
+
+        response = self.book('second', '10:30')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('session_time', response.json())
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_adjacent_booking_is_accepted(self):
+        self.assertEqual(self.book('first', '10:00').status_code, 201)
+        self.assertEqual(self.book('second', '11:00').status_code, 201)
+
+    def test_cancelled_booking_frees_the_slot(self):
+        self.book('first', '10:00')
+        Booking.objects.update(status='cancelled')
+
+        self.assertEqual(self.book('second', '10:00').status_code, 201)
+
+
+class BookingSeriesTests(TestCase):
+    def setUp(self):
+        self.mentor = create_mentor('mentor')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('mentee', 'mentee@example.com', 'pw'))
+
+    def book_series(self, count):
+        return self.client.post('/api/bookings/series/', {
+            'mentor': self.mentor.pk, 'session_time': '10:00', 'topic': 'Career advice', 'session_type': 'chat',
+            'recurrence': {'start_date': (timezone.localdate() + timedelta(days=1)).isoformat(), 'count': count},
+        }, format='json')
+
+    def test_recurrence_books_weekly_sessions(self):
+        response = self.book_series(3)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_recurrence_count_is_capped(self):
+        response = self.book_series(10 ** 9)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('count', response.json()['recurrence'])
+        self.assertFalse(Booking.objects.exists())
+
+
+class ReservationRetryTests(TestCase):
+    def setUp(self):
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+        settings = override_settings(STRIPE_API_BASE=self.server.base_url, STRIPE_SECRET_KEY='sk_test_fake', STRIPE_MAX_NETWORK_RETRIES=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        gateway.reset_client()
+        self.addCleanup(gateway.reset_client)
+
+        self.mentor = create_mentor('mentor')
+        MentorProfile.objects.filter(pk=self.mentor.pk).update(hourly_rate=50)
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.client = APIClient()
+        self.day = (timezone.localdate() + timedelta(days=14)).isoformat()
+
+    def checkout(self, user=None, topic='Career advice', **headers):
+        self.client.force_authenticate(user or self.mentee)
+        return self.client.post('/api/bookings/create-with-payment/', {
+            'mentor': self.mentor.pk, 'session_date': self.day, 'session_time': '10:00',
+            'duration_minutes': 60, 'topic': topic, 'session_type': 'chat',
+        }, format='json', **headers)
+
+    def test_retry_reuses_the_mentees_own_hold(self):
+        first = self.checkout()
+        retry = self.checkout(topic='Interview practice')
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()['payment_intent_id'], first.json()['payment_intent_id'])
+        reservation = BookingReservation.objects.get()
+        self.assertEqual(reservation.topic, 'Interview practice')
+
+    def test_someone_elses_hold_still_blocks_the_slot(self):
+        self.checkout()
+
+        response = self.checkout(user=User.objects.create_user('other', 'other@example.com', 'pw'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('session_time', response.json())
+
+    def test_retry_after_a_cancelled_intent_gets_a_new_one(self):
+        first = self.checkout().json()['payment_intent_id']
+        self.server.set_status(first, 'canceled')
+
+        retry = self.checkout().json()['payment_intent_id']
+
+        self.assertNotEqual(retry, first)
+        self.assertEqual(BookingReservation.objects.get().payment_intent_id, retry)
+
+    def test_retry_after_paying_is_refused(self):
+        self.server.set_status(self.checkout().json()['payment_intent_id'], 'succeeded')
+
+        self.assertEqual(self.checkout().status_code, 409)
+        self.assertEqual(BookingReservation.objects.count(), 1)
+
+    def paid_checkout(self):
+        intent_id = self.checkout().json()['payment_intent_id']
+        self.server.set_status(intent_id, 'succeeded')
+        return intent_id
+
+    def confirm(self, intent_id):
+        return self.client.post('/api/bookings/confirm-payment/', {'payment_intent_id': intent_id}, format='json')
+
+    def test_payment_after_the_reservation_was_swept_is_refunded(self):
+        intent_id = self.paid_checkout()
+        BookingReservation.objects.all().delete()
+
+        response = self.confirm(intent_id)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.json()['refunded'])
+        self.assertEqual([refund['payment_intent'] for refund in self.server.refunds.values()], [intent_id])
+        payment = Payment.objects.get(payment_intent_id=intent_id)
+        self.assertEqual((payment.status, payment.booking, payment.user), ('refunded', None, self.mentee))
+        self.assertFalse(Booking.objects.exists())
+
+        self.assertEqual(self.confirm(intent_id).status_code, 409)
+        self.assertEqual(len(self.server.refunds), 1)
+
+    def test_late_payment_for_a_taken_slot_is_refunded(self):
+        intent_id = self.paid_checkout()
+        BookingReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        self.assertEqual(self.checkout(user=other).status_code, 200)
+        self.client.force_authenticate(self.mentee)
+
+        response = self.confirm(intent_id)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('session_time', response.json())
+        self.assertEqual(Payment.objects.get(payment_intent_id=intent_id).status, 'refunded')
+        self.assertEqual(BookingReservation.objects.get().mentee, other)
+
+    def test_swept_payment_of_someone_else_is_not_found(self):
+        intent_id = self.paid_checkout()
+        BookingReservation.objects.all().delete()
+        self.client.force_authenticate(User.objects.create_user('other', 'other@example.com', 'pw'))
+
+        self.assertEqual(self.confirm(intent_id).status_code, 404)
+        self.assertEqual(self.server.refunds, {})
+
+    def test_refund_outage_leaves_the_payment_to_retry(self):
+        intent_id = self.paid_checkout()
+        BookingReservation.objects.all().delete()
+
+        self.server.failure_rate = 1.0
+        self.assertEqual(self.confirm(intent_id).status_code, 503)
+        self.assertFalse(Payment.objects.exists())
+
+        self.server.failure_rate = 0.0
+        self.assertEqual(self.confirm(intent_id).status_code, 409)
+        self.assertEqual(Payment.objects.get().status, 'refunded')
+
+    def test_gateway_outage_is_not_replayed_under_the_key(self):
+        self.server.failure_rate = 1.0
+        failed = self.checkout(HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.server.failure_rate = 0.0
+
+        retry = self.checkout(HTTP_IDEMPOTENCY_KEY='checkout-1')
+
+        self.assertEqual((failed.status_code, retry.status_code), (503, 200))
+        self.assertEqual(BookingReservation.objects.get().payment_intent_id, retry.json()['payment_intent_id'])
+
+    def test_stripe_refusal_is_a_gateway_error(self):
+        refusal = stripe.InvalidRequestError('Amount must be at least 50 cents', 'amount')
+        with mock.patch('payments.gateway.create_payment_intent', side_effect=refusal):
+            response = self.checkout(HTTP_IDEMPOTENCY_KEY='checkout-1')
+
+        self.assertEqual(response.status_code, 502)
+        self.assertFalse(BookingReservation.objects.exists())
+        self.assertEqual(self.checkout(HTTP_IDEMPOTENCY_KEY='checkout-1').status_code, 200)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class DoubleBookingStressTests(TransactionTestCase):
+    """
+    Many mentees race for overlapping slots with one mentor; no two bookings may
+    overlap. Needs a database with row locks: SQLite's test database refuses
+    concurrent writers with "table is locked" instead of making them wait.
+    """
+    THREADS = 12
+
+    def setUp(self):
+        self.mentor = create_mentor('mentor')
+        self.mentees = [User.objects.create_user(f'mentee{i}', f'mentee{i}@example.com', 'pw') for i in range(self.THREADS)]
+        self.day = timezone.localdate() + timedelta(days=14)
+
+    def book(self, mentee, session_time, barrier, results):
+        client = APIClient()
+        client.force_authenticate(mentee)
+        barrier.wait()
+        try:
+            response = client.post('/api/bookings/', {
+                'mentor': self.mentor.pk, 'session_date': self.day.isoformat(), 'session_time': session_time,
+                'duration_minutes': 60, 'topic': 'Career advice', 'session_type': 'chat',
+            }, format='json')
+            results.append(response.status_code)
+        except Exception as e:
+            results.append(repr(e))
+        finally:
+            connection.close()
+
+    def test_parallel_bookings_never_overlap(self):
+        # Starts every 20 minutes, so each hour-long session overlaps its neighbours
+        times = [f'{9 + minutes // 60:02d}:{minutes % 60:02d}' for minutes in range(0, 20 * self.THREADS, 20)]
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        threads = [
+            threading.Thread(target=self.book, args=(mentee, session_time, barrier, results))
+            for mentee, session_time in zip(self.mentees, times)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(set(results) <= {201, 400}, results)
+        windows = sorted(Booking.objects.filter(mentor=self.mentor).values_list('session_start_at', 'session_end_at'))
+        self.assertEqual(results.count(201), len(windows))
+        # At least every third start fits, whoever wins the races
+        self.assertGreaterEqual(len(windows), self.THREADS // 3)
+        for (_, end), (start, _) in zip(windows, windows[1:]):
+            self.assertLessEqual(end, start)
@@ -0,0 +1,116 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+
+from mentors.models import MentorProfile
+
+from .models import COUNTED_ROW, Booking
+from .signals import booking_status_changed
+from .slots import lock_mentor_schedule
+
+# Every user-driven status change. `from` lists the statuses the booking may be
+# in, `actors` who may perform it, and the messages mirror the API errors.
+TRANSITIONS = {
+    'accept': {
+        'from': ['pending'],
+        'to': 'confirmed',
+        'actors': ('mentor',),
+        'forbidden': 'Only the mentor can accept this booking',
+        'invalid': 'Only pending bookings can be accepted',
+    },
+    'decline': {
+        'from': ['pending'],
+        'to': 'cancelled',
+        'actors': ('mentor',),
+        'forbidden': 'Only the mentor can decline this booking',
+        'invalid': 'Only pending bookings can be declined',
+    },
+    'complete': {
+        'from': ['confirmed'],
+        'to': 'completed',
+        'actors': ('mentor',),
+        'forbidden': 'Only the mentor can complete this booking',
+        'invalid': 'Only confirmed bookings can be completed',
+    },
+    'cancel': {
+        'from': ['pending', 'confirmed', 'in_progress', 'no_show'],
+        'to': 'cancelled',
+        'actors': ('mentee', 'mentor'),
+        'forbidden': 'You can only cancel your own bookings',
+        'invalid': 'This booking cannot be cancelled',
+    },
+    'confirm_payment': {
+        # Already confirmed is allowed so a retried confirmation still succeeds
+        'from': ['pending', 'confirmed'],
+        'to': 'confirmed',
+        'actors': ('mentee',),
+        'forbidden': 'You can only pay for your own bookings',
+        'invalid': 'This booking can no longer be confirmed',
+    },
+}
+
+
+class TransitionError(Exception):
+    """A transition was refused; carries the API message and HTTP status"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _actor_filter(actors, user):
+    condition = Q()
+    if 'mentee' in actors:
+        condition |= Q(mentee=user)
+    if 'mentor' in actors:
+        # Subquery rather than a join so the UPDATE stays a single statement on MySQL
+        condition |= Q(mentor__in=MentorProfile.objects.filter(user=user).values('id'))
+    return condition
+
+
+def transition_booking(booking_id, action, user, **changes):
+    """
+    Apply `action` to a booking with one conditional UPDATE.
+
+    The WHERE clause carries the allowed source statuses and the permission
+    check, so concurrent clicks cannot both win. The booking's mentor is read
+    through the same filter and locked first, the order booking creation
+    takes its locks in, so only a party to the booking ever takes a lock.
+    Extra column values (which may be expressions) are written in the same
+    statement. booking_status_changed is sent in the same transaction so the
+    mentor's counters move with the status; when the action has a single
+    source status that is the old status, otherwise the row is locked and
+    read before the UPDATE. On failure a single read works out which error
+    to raise.
+    """
+    spec = TRANSITIONS[action]
+    allowed = Booking.objects.filter(_actor_filter(spec['actors'], user), pk=booking_id, status__in=spec['from'])
+    with transaction.atomic():
+        mentor_id = allowed.values_list('mentor_id', flat=True).first()
+        if mentor_id is not None:
+            lock_mentor_schedule(mentor_id)
+            before = None
+            if len(spec['from']) > 1:
+                before = allowed.select_for_update().values(*COUNTED_ROW, 'status').first()
+            updated = allowed.update(status=spec['to'], updated_at=timezone.now(), **changes)
+            if updated:
+                if before is None:
+                    # The UPDATE holds the row lock, so this reads the row as it was just written
+                    before = Booking.objects.filter(pk=booking_id).values(*COUNTED_ROW).get()
+                    before['status'] = spec['from'][0]
+                booking_status_changed.send(sender=Booking, bookings=[before], to_status=spec['to'])
+                return
+
+    booking = Booking.objects.filter(pk=booking_id).values('mentee_id', 'mentor__user_id').first()
+    if booking is None:
+        raise TransitionError('Booking not found', status.HTTP_404_NOT_FOUND)
+    allowed_users = set()
+    if 'mentee' in spec['actors']:
+        allowed_users.add(booking['mentee_id'])
+    if 'mentor' in spec['actors']:
+        allowed_users.add(booking['mentor__user_id'])
+    if user.id not in allowed_users:
+        raise TransitionError(spec['forbidden'], status.HTTP_403_FORBIDDEN)
+    raise TransitionError(spec['invalid'], status.HTTP_400_BAD_REQUEST)
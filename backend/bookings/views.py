@@ -2,21 +2,29 @@ from django.shortcuts import render
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from .models import Booking
-from .serializers import BookingSerializer, BookingCreateSerializer
-from .email_utils import send_booking_notification_to_mentor, send_booking_confirmation_to_mentee, send_booking_status_update
+from .models import Booking, BookingReservation
+from .serializers import BookingSerializer, BookingCreateSerializer, BookingSeriesCreateSerializer
+from .email_utils import send_booking_notification_to_mentor, send_booking_confirmation_to_mentee, send_booking_status_update, send_booking_series_notification_to_mentor
+from .transitions import transition_booking, TransitionError
+from .fulfilment import REFUNDED, fulfil_payment_intent, FulfilmentError
+from .slots import SlotUnavailable, ensure_slot_free, lock_mentor_schedule
 import uuid
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from django.conf import settings
-import stripe
+from django.db import transaction
+from django.db.models import Case, F, Q, URLField, Value, When
 import json
+import stripe
+from payments import gateway
+from payments.idempotency import idempotent
 from payments.models import Payment
 from payments.serializers import CreatePaymentIntentSerializer
 from decimal import Decimal
-
-# Configure Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
+from datetime import timedelta
+from django.utils import timezone
+from mentorship.pagination import KeysetPagination
+from users.authentication import request_role
 
 # Create your views here.
 
@@ -24,237 +32,139 @@ class BookingViewSet(viewsets.ModelViewSet):
     queryset = Booking.objects.all()     #type:ignore
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
-
-    def auto_complete_past_bookings(self):
-        from django.utils import timezone
-        from datetime import datetime, timedelta
-        now = timezone.localtime()
-        bookings = Booking.objects.filter(status__in=['pending', 'confirmed', 'in_progress'])
-        for booking in bookings:
-            if booking.session_date and booking.session_time:
-                session_datetime = datetime.combine(booking.session_date, booking.session_time)
-                session_datetime = timezone.make_aware(session_datetime)
-                session_end = session_datetime + timedelta(minutes=booking.duration_minutes or 60)
-                print(f"Booking {booking.id}: session_datetime={session_datetime}, session_end={session_end}, now={now}, status={booking.status}")
-                if session_datetime <= now < session_end:
-                    if booking.status != 'in_progress':
-                        booking.status = 'in_progress'
-                        booking.save()
-                elif now >= session_end:
-                    if booking.status != 'completed':
-                        booking.status = 'completed'
-                        booking.save()
-                # else: keep as pending/confirmed
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-session_date', '-session_time', '-id')
 
     def get_queryset(self):
         user = self.request.user
+        # Load everything BookingSerializer nests in a constant number of queries
+        queryset = Booking.objects.select_related(
+            'mentee', 'mentor__user__profile'
+        ).prefetch_related('mentor__expertise')    #type:ignore
         if user.is_superuser:
-            return Booking.objects.all()    #type:ignore
+            return queryset
         
         # If user is a mentor, show bookings where they are the mentor
-        if hasattr(user, 'profile') and user.profile.user_type == 'mentor':
-            return Booking.objects.filter(mentor__user=user)    #type:ignore
+        user_type, mentor_profile_id = request_role(self.request)
+        if user_type == 'mentor':
+            return queryset.filter(mentor_id=mentor_profile_id)
         
         # If user is a mentee, show their bookings
-        return Booking.objects.filter(mentee=user)    #type:ignore
+        return queryset.filter(mentee=user)
 
     def get_serializer_class(self):
         if self.action == 'create':
             return BookingCreateSerializer
+        if self.action == 'series':
+            return BookingSeriesCreateSerializer
         return BookingSerializer
 
     def perform_create(self, serializer):
-        booking = serializer.save(mentee=self.request.user)
-        print(f"DEBUG: Created booking with meeting_link: {booking.meeting_link}")
-        print(f"DEBUG: Booking session_type: {booking.session_type}")
-        # Send notification email to mentor
-        send_booking_notification_to_mentor(booking)
+        with transaction.atomic():
+            booking = serializer.save(mentee=self.request.user)
+            # Queue notification email to mentor
+            send_booking_notification_to_mentor(booking)
+
+    @action(detail=False, methods=['post'])
+    def series(self, request):
+        """Book a recurring series (or an explicit list of dates) with one mentor"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            bookings = serializer.save(mentee=request.user)
+            # One combined email for the whole series
+            send_booking_series_notification_to_mentor(bookings)
+        
+        return Response({
+            'count': len(bookings),
+            'total_amount': sum(booking.total_amount for booking in bookings),
+            'bookings': BookingSerializer(bookings, many=True, context=self.get_serializer_context()).data,
+        }, status=status.HTTP_201_CREATED)
+
+    def _transition(self, request, pk, action_name, email_action=None, **changes):
+        """Run a state-machine transition, queue its email and return the updated booking"""
+        with transaction.atomic():
+            try:
+                transition_booking(pk, action_name, request.user, **changes)
+            except TransitionError as e:
+                return Response({'error': e.message}, status=e.status_code)
+            
+            booking = Booking.objects.select_related(
+                'mentee', 'mentor__user__profile'
+            ).prefetch_related('mentor__expertise').get(pk=pk)
+            
+            if action_name == 'accept':
+                # Queue confirmation email to mentee (includes meeting link and all details)
+                send_booking_confirmation_to_mentee(booking)
+            elif email_action:
+                # Queue status update email
+                send_booking_status_update(booking, email_action)
+        
+        serializer = BookingSerializer(booking, context=self.get_serializer_context())
+        return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def accept(self, request, pk=None):
         """Mentor accepts a booking"""
-        # Get the booking directly without queryset filtering
-        try:
-            booking = Booking.objects.get(pk=pk)
-        except Booking.DoesNotExist:
-            return Response({'error': 'Booking not found'}, 
-                          status=status.HTTP_404_NOT_FOUND)
-        
-        # Check if user is the mentor for this booking
-        if booking.mentor.user != request.user:
-            return Response({'error': 'Only the mentor can accept this booking'}, 
-                          status=status.HTTP_403_FORBIDDEN)
-        
-        if booking.status != 'pending':
-            return Response({'error': 'Only pending bookings can be accepted'}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-        
-        booking.status = 'confirmed'
-        
         # Generate Google Meet link for video calls if not already set
-        if booking.session_type == 'video_call' and not booking.meeting_link:
-            # Generate a unique meeting link using booking ID and timestamp
-            meeting_id = f"mentor-{booking.id}-{uuid.uuid4().hex[:8]}"
-            booking.meeting_link = f"https://meet.google.com/{meeting_id}"
-            print(f"DEBUG: Generated meeting link: {booking.meeting_link}")
-        else:
-            print(f"DEBUG: Meeting link already exists or not video call: {booking.meeting_link}")
-        
-        booking.save()
-        
-        # Send confirmation email to mentee (includes meeting link and all details)
-        send_booking_confirmation_to_mentee(booking)
-        
-        serializer = self.get_serializer(booking)
-        return Response(serializer.data)
+        meeting_link = f"https://meet.google.com/mentor-{pk}-{uuid.uuid4().hex[:8]}"
+        return self._transition(
+            request, pk, 'accept',
+            meeting_link=Case(
+                When(
+                    Q(session_type='video_call') & (Q(meeting_link__isnull=True) | Q(meeting_link='')),
+                    then=Value(meeting_link),
+                ),
+                default=F('meeting_link'),
+                output_field=URLField(),
+            ),
+        )
 
     @action(detail=True, methods=['post'])
     def decline(self, request, pk=None):
         """Mentor declines a booking"""
-        # Get the booking directly without queryset filtering
-        try:
-            booking = Booking.objects.get(pk=pk)
-        except Booking.DoesNotExist:
-            return Response({'error': 'Booking not found'}, 
-                          status=status.HTTP_404_NOT_FOUND)
-        
-        # Check if user is the mentor for this booking
-        if booking.mentor.user != request.user:
-            return Response({'error': 'Only the mentor can decline this booking'}, 
-                          status=status.HTTP_403_FORBIDDEN)
-        
-        if booking.status != 'pending':
-            return Response({'error': 'Only pending bookings can be declined'}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-        
-        booking.status = 'cancelled'
-        booking.save()
-        
-        # Send status update email
-        send_booking_status_update(booking, 'declined')
-        
-        serializer = self.get_serializer(booking)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'decline', email_action='declined')
 
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         """Mark booking as completed"""
-        # Get the booking directly without queryset filtering
-        try:
-            booking = Booking.objects.get(pk=pk)
-        except Booking.DoesNotExist:
-            return Response({'error': 'Booking not found'}, 
-                          status=status.HTTP_404_NOT_FOUND)
-        
-        # Check if user is the mentor for this booking
-        if booking.mentor.user != request.user:
-            return Response({'error': 'Only the mentor can complete this booking'}, 
-                          status=status.HTTP_403_FORBIDDEN)
-        
-        if booking.status != 'confirmed':
-            return Response({'error': 'Only confirmed bookings can be completed'}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-        
-        booking.status = 'completed'
-        booking.save()
-        
-        # Send status update email
-        send_booking_status_update(booking, 'completed')
-        
-        serializer = self.get_serializer(booking)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'complete', email_action='completed')
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel a booking (mentee or mentor)"""
-        # Get the booking directly without queryset filtering
-        try:
-            booking = Booking.objects.get(pk=pk)
-        except Booking.DoesNotExist:
-            return Response({'error': 'Booking not found'}, 
-                          status=status.HTTP_404_NOT_FOUND)
-        
-        # Check if user is the mentee or mentor
-        if booking.mentee != request.user and booking.mentor.user != request.user:
-            return Response({'error': 'You can only cancel your own bookings'}, 
-                          status=status.HTTP_403_FORBIDDEN)
-        
-        if booking.status in ['completed', 'cancelled']:
-            return Response({'error': 'This booking cannot be cancelled'}, 
-                          status=status.HTTP_400_BAD_REQUEST)
-        
-        booking.status = 'cancelled'
-        booking.save()
-        
-        # Send status update email
-        send_booking_status_update(booking, 'cancelled')
-        
-        serializer = self.get_serializer(booking)
-        return Response(serializer.data)
+        return self._transition(request, pk, 'cancel', email_action='cancelled')
 
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """Get upcoming bookings"""
-        self.auto_complete_past_bookings()
         from django.utils import timezone
-        from datetime import timedelta
         
         now = timezone.now()
-        queryset = self.get_queryset()
-        
-        # Filter for upcoming sessions based on session end time
-        upcoming_bookings = []
-        for booking in queryset:
-            if booking.session_date and booking.session_time:
-                # Combine date and time to create a datetime
-                from datetime import datetime
-                session_datetime = datetime.combine(booking.session_date, booking.session_time)
-                # Make it timezone-aware
-                session_datetime = timezone.make_aware(session_datetime)
-                # Calculate session end time (session_datetime + duration_minutes)
-                session_end = session_datetime + timedelta(minutes=booking.duration_minutes or 60)
-                # Only include if session hasn't ended yet and status is valid
-                if session_end > now and booking.status in ['pending', 'in_progress']:
-                    upcoming_bookings.append(booking)
+        # Only include sessions that haven't ended yet and have a valid status
+        upcoming_bookings = self.get_queryset().filter(
+            session_end_at__gt=now,
+            status__in=['pending', 'in_progress']
+        )
         
-        serializer = self.get_serializer(upcoming_bookings, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(upcoming_bookings)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def past(self, request):
         """Get past bookings"""
-        self.auto_complete_past_bookings()
         from django.utils import timezone
-        from datetime import timedelta
         
         now = timezone.now()
-        queryset = self.get_queryset()
-        
-        # Filter for past sessions based on session end time or status
-        past_bookings = []
-        for booking in queryset:
-            # Include if status is completed or cancelled
-            if booking.status in ['completed', 'cancelled']:
-                past_bookings.append(booking)
-            # Or if session has passed its end time
-            elif booking.session_date and booking.session_time:
-                # Combine date and time to create a datetime
-                from datetime import datetime
-                session_datetime = datetime.combine(booking.session_date, booking.session_time)
-                # Make it timezone-aware
-                session_datetime = timezone.make_aware(session_datetime)
-                # Calculate session end time (session_datetime + duration_minutes)
-                session_end = session_datetime + timedelta(minutes=booking.duration_minutes or 60)
-                # Include if session has ended
-                if session_end <= now:
-                    past_bookings.append(booking)
+        # Include completed/cancelled bookings and any session that has passed its end time
+        past_bookings = self.get_queryset().filter(
+            Q(status__in=['completed', 'cancelled']) | Q(session_end_at__lte=now)
+        )
         
-        serializer = self.get_serializer(past_bookings, many=True)
-        return Response(serializer.data)
-
-    def list(self, request, *args, **kwargs):
-        self.auto_complete_past_bookings()
-        return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(past_bookings)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 @csrf_exempt
 def confirm_booking(request):
@@ -267,13 +177,14 @@ def confirm_booking(request):
             # Mark booking as paid/confirmed
             booking.status = "confirmed"
             booking.payment_intent_id = payment_intent_id
-            booking.save()
+            booking.save(update_fields=['status', 'updated_at'])
             # If video call, generate Google Meet link (placeholder for now)
             if booking.session_type == "video":
                 # TODO: Integrate Google Calendar API for real Meet link
                 meet_link = "https://meet.google.com/" + str(booking.id)
-                booking.meet_link = meet_link
-                booking.save()
+                booking.meeting_link = meet_link
+                # Only the link changed, so the counter receivers have nothing to re-read
+                booking.save(update_fields=['meeting_link', 'updated_at'])
                 return JsonResponse({"meet_link": meet_link})
             elif booking.session_type == "physical":
                 return JsonResponse({"address": booking.address})
@@ -287,6 +198,7 @@ def confirm_booking(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def create_booking_with_payment(request):
     """Create a booking with payment intent - payment-first approach"""
     try:
@@ -314,27 +226,78 @@ def create_booking_with_payment(request):
         if not payment_serializer.is_valid():
             return Response(payment_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create Stripe payment intent
-        print(f"Using Stripe key: {settings.STRIPE_SECRET_KEY[:20]}...")
-        
-        # Prepare only serializable fields for metadata
-        serializable_booking_data = {
-            'session_type': booking_data.get('session_type'),
-            'session_date': str(booking_data.get('session_date')),
-            'session_time': str(booking_data.get('session_time')),
-            'duration_minutes': str(booking_data.get('duration_minutes')),
+        # Hold the slot with a local draft; Stripe only learns which reservation it pays for
+        window = Booking(session_date=booking_data['session_date'], session_time=booking_data['session_time'], duration_minutes=duration_minutes)
+        window.sync_session_window()
+        draft = {
+            'session_type': booking_data.get('session_type', 'video_call'),
+            'session_date': booking_data['session_date'],
+            'session_time': booking_data['session_time'],
+            'duration_minutes': duration_minutes,
             'topic': booking_data.get('topic'),
             'description': booking_data.get('description'),
             'onsite_address': booking_data.get('onsite_address', ''),
-            'mentor_id': str(mentor.id),
-            'mentee_id': str(request.user.id)
+            'expires_at': timezone.now() + timedelta(minutes=settings.BOOKING_RESERVATION_TTL_MINUTES),
         }
-        
-        payment_intent = stripe.PaymentIntent.create(
-            amount=payment_data['amount'],
-            currency=payment_data['currency'],
-            metadata=serializable_booking_data
-        )
+        with transaction.atomic():
+            lock_mentor_schedule(mentor.id)
+            # A retry of the same checkout takes over the mentee's own hold instead of being blocked by it
+            reservation = BookingReservation.objects.select_for_update().filter(
+                mentee=request.user,
+                mentor=mentor,
+                session_start_at=window.session_start_at,
+                session_end_at=window.session_end_at,
+                total_amount=total_amount,
+                expires_at__gt=timezone.now(),
+            ).first()
+            try:
+                ensure_slot_free(
+                    mentor.id, window.session_start_at, window.session_end_at,
+                    exclude_reservation=reservation.pk if reservation else None,
+                )
+            except SlotUnavailable as e:
+                return Response({'session_time': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+            retrying = reservation is not None
+            if retrying:
+                for field, value in draft.items():
+                    setattr(reservation, field, value)
+                reservation.save(update_fields=list(draft))
+            else:
+                reservation = BookingReservation.objects.create(
+                    mentee=request.user,
+                    mentor=mentor,
+                    total_amount=total_amount,
+                    session_start_at=window.session_start_at,
+                    session_end_at=window.session_end_at,
+                    **draft,
+                )
+
+        payment_intent = None
+        if retrying and reservation.payment_intent_id:
+            payment_intent = gateway.retrieve_payment_intent(reservation.payment_intent_id)
+            if payment_intent.status in ('processing', 'succeeded'):
+                return Response(
+                    {'error': 'This session has already been paid for', 'payment_intent_id': payment_intent.id},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if payment_intent.status == 'canceled':
+                payment_intent = None
+        if payment_intent is None:
+            try:
+                payment_intent = gateway.create_payment_intent(
+                    amount=payment_data['amount'],
+                    currency=payment_data['currency'],
+                    metadata={
+                        'reservation_id': str(reservation.id),
+                        'mentee_id': str(request.user.id)
+                    }
+                )
+            except Exception:
+                # Release a new slot straight away rather than waiting for the TTL
+                if not retrying:
+                    reservation.delete()
+                raise
+        BookingReservation.objects.filter(pk=reservation.pk).update(payment_intent_id=payment_intent.id)
         
         return Response({
             'client_secret': payment_intent.client_secret,
@@ -343,17 +306,25 @@ def create_booking_with_payment(request):
             'currency': 'usd'
         })
         
-    except Exception as e:
+    except gateway.PaymentGatewayUnavailable as e:
+        print(f"Payment gateway unavailable: {str(e)}")
+        return Response(
+            {'error': 'Payment provider is unavailable, please try again shortly'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except stripe.StripeError as e:
+        # Stripe refused the request; not the client's fault, and not worth replaying under its key
         print(f"Error creating booking with payment: {str(e)}")
         return Response(
             {'error': f'Failed to create payment intent: {str(e)}'},
-            status=status.HTTP_400_BAD_REQUEST
+            status=status.HTTP_502_BAD_GATEWAY
         )
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@idempotent
 def confirm_booking_payment(request):
-    """Confirm payment and create booking"""
+    """Return the booking paid for by a PaymentIntent, creating it if the webhook has not yet"""
     try:
         payment_intent_id = request.data.get('payment_intent_id')
         if not payment_intent_id:
@@ -362,55 +333,37 @@ def confirm_booking_payment(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Verify payment with Stripe
-        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-        
-        if payment_intent.status != 'succeeded':
-            return Response(
-                {'error': 'Payment not completed'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Extract booking data from metadata
-        booking_data = {
-            'session_type': payment_intent.metadata.get('session_type'),
-            'session_date': payment_intent.metadata.get('session_date'),
-            'session_time': payment_intent.metadata.get('session_time'),
-            'duration_minutes': int(payment_intent.metadata.get('duration_minutes', 60)),
-            'topic': payment_intent.metadata.get('topic'),
-            'description': payment_intent.metadata.get('description'),
-            'onsite_address': payment_intent.metadata.get('onsite_address'),
-            'mentor': int(payment_intent.metadata.get('mentor_id'))
-        }
-        print("Booking data for serializer:", booking_data)
-        
-        # Create the booking
-        booking_serializer = BookingCreateSerializer(data=booking_data)
-        if not booking_serializer.is_valid():
-            print("Booking serializer errors:", booking_serializer.errors)
-            return Response(booking_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
-        booking = booking_serializer.save(mentee=request.user)
-        
-        # Create payment record
-        Payment.objects.create(
-            booking=booking,
-            user=request.user,
-            payment_intent_id=payment_intent_id,
-            amount=payment_intent.amount / 100,  # Convert from cents
-            currency=payment_intent.currency,
-            status='completed'
-        )
-        
-        # Generate Google Meet link for video calls
-        if booking.session_type == 'video_call':
-            meeting_id = f"mentor-{booking.id}-{uuid.uuid4().hex[:8]}"
-            booking.meeting_link = f"https://meet.google.com/{meeting_id}"
-            booking.save()
-        
-        # Send confirmation emails
-        send_booking_notification_to_mentor(booking)
-        send_booking_confirmation_to_mentee(booking)
+        # Normally the payment_intent.succeeded webhook has already created the booking
+        payment = Payment.objects.select_related('booking').filter(
+            payment_intent_id=payment_intent_id, user=request.user
+        ).first()
+        if payment is not None and payment.booking is None:
+            return Response({'error': REFUNDED, 'refunded': True}, status=status.HTTP_409_CONFLICT)
+        if payment is not None:
+            booking = payment.booking
+        else:
+            # Webhook not delivered yet: the draft is local, Stripe only confirms the charge
+            reserved = BookingReservation.objects.filter(payment_intent_id=payment_intent_id, mentee=request.user).exists()
+            try:
+                payment_intent = gateway.retrieve_payment_intent(payment_intent_id)
+            except stripe.InvalidRequestError:
+                payment_intent = None
+            # Once the reservation is swept only the intent's metadata says whose payment it is
+            if payment_intent is None or not (
+                reserved or payment_intent.metadata.get('mentee_id') == str(request.user.id)
+            ):
+                return Response(
+                    {'error': 'No booking found for this payment'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            try:
+                booking, _ = fulfil_payment_intent(payment_intent)
+            except FulfilmentError as e:
+                print("Booking fulfilment errors:", e.detail)
+                detail = e.detail if isinstance(e.detail, dict) else {'error': e.detail}
+                if e.refunded:
+                    return Response({**detail, 'refunded': True}, status=status.HTTP_409_CONFLICT)
+                return Response(detail, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'message': 'Booking created successfully',
@@ -418,11 +371,15 @@ def confirm_booking_payment(request):
             'meeting_link': booking.meeting_link
         })
         
-    except Exception as e:
-        import traceback
+    except gateway.PaymentGatewayUnavailable as e:
+        print(f"Payment gateway unavailable: {str(e)}")
+        return Response(
+            {'error': 'Payment provider is unavailable, please try again shortly'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except stripe.StripeError as e:
         print("Error confirming booking payment:", str(e))
-        traceback.print_exc()
         return Response(
             {'error': f'Failed to confirm payment: {str(e)}'},
-            status=status.HTTP_400_BAD_REQUEST
+            status=status.HTTP_502_BAD_GATEWAY
         )
@@ -1,13 +1,27 @@
 from django.contrib import admin
-from .models import MentorProfile, Expertise
+from .models import MentorProfile, Expertise, AvailabilityRule, AvailabilityException
 
 @admin.register(MentorProfile)
 class MentorProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'experience_level', 'hourly_rate', 'is_verified', 'is_active', 'created_at')
     search_fields = ('user__username', 'company', 'position')
     list_filter = ('experience_level', 'is_verified', 'is_active')
+    # Maintained from bookings; saving the form must not write back stale values
+    readonly_fields = MentorProfile.COUNTER_FIELDS + MentorProfile.RATING_FIELDS
 
 @admin.register(Expertise)
 class ExpertiseAdmin(admin.ModelAdmin):
     list_display = ('name', 'description')
     search_fields = ('name',)
+
+@admin.register(AvailabilityRule)
+class AvailabilityRuleAdmin(admin.ModelAdmin):
+    list_display = ('mentor', 'weekday', 'start_time', 'end_time')
+    list_filter = ('weekday',)
+    search_fields = ('mentor__user__username',)
+
+@admin.register(AvailabilityException)
+class AvailabilityExceptionAdmin(admin.ModelAdmin):
+    list_display = ('mentor', 'date', 'start_time', 'end_time', 'is_available', 'reason')
+    list_filter = ('is_available', 'date')
+    search_fields = ('mentor__user__username', 'reason')
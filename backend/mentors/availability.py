@@ -0,0 +1,130 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from bookings.models import Booking, BookingReservation
+from .models import AvailabilityRule, AvailabilityException
+
+# Bookings in these states occupy the mentor's time
+BUSY_STATUSES = ['pending', 'confirmed', 'in_progress']
+
+
+def _aware(day, at):
+    return timezone.make_aware(datetime.combine(day, at))
+
+
+def _window(day, start_time, end_time):
+    """Local-time window on `day`; a missing or midnight end runs to the end of the day"""
+    start = _aware(day, start_time or time.min)
+    end = _aware(day + timedelta(days=1), time.min) if not end_time or end_time == time.min else _aware(day, end_time)
+    return start, end
+
+
+def _merge(intervals):
+    """Sort and merge overlapping (start, end) intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(windows, busy):
+    """Remove `busy` from `windows` in one pass; both must be sorted by start"""
+    free = []
+    first_busy = 0
+    for window_start, window_end in windows:
+        cursor = window_start
+        # Busy intervals that ended before this window can never matter again
+        while first_busy < len(busy) and busy[first_busy][1] <= cursor:
+            first_busy += 1
+        index = first_busy
+        while index < len(busy) and busy[index][0] < window_end:
+            busy_start, busy_end = busy[index]
+            if busy_start > cursor:
+                free.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            if cursor >= window_end:
+                break
+            index += 1
+        if cursor < window_end:
+            free.append((cursor, window_end))
+    return free
+
+
+def split_into_slots(intervals, slot_minutes):
+    """Cut free intervals into bookable slots of a fixed length"""
+    length = timedelta(minutes=slot_minutes)
+    slots = []
+    for start, end in intervals:
+        while start + length <= end:
+            slots.append((start, start + length))
+            start += length
+    return slots
+
+
+def get_free_slots(mentor, start_date, end_date, slot_minutes=None, now=None):
+    """
+    Free (start, end) intervals for `mentor` between two dates, inclusive.
+
+    Runs exactly four queries (rules, exceptions, bookings, reservations)
+    whatever the range, then builds the open windows day by day and subtracts
+    busy time in a single sweep over the sorted intervals.
+    """
+    now = now or timezone.now()
+    range_start = _aware(start_date, time.min)
+    range_end = _aware(end_date + timedelta(days=1), time.min)
+
+    rules_by_weekday = {}
+    for weekday, start_time, end_time in AvailabilityRule.objects.filter(mentor=mentor).values_list(
+        'weekday', 'start_time', 'end_time'
+    ):
+        rules_by_weekday.setdefault(weekday, []).append((start_time, end_time))
+
+    days_off = set()
+    extra_windows = []
+    blocked = []
+    for day, start_time, end_time, is_available in AvailabilityException.objects.filter(
+        mentor=mentor, date__gte=start_date, date__lte=end_date
+    ).values_list('date', 'start_time', 'end_time', 'is_available'):
+        if is_available:
+            extra_windows.append(_window(day, start_time, end_time))
+        elif start_time is None and end_time is None:
+            days_off.add(day)
+        else:
+            blocked.append(_window(day, start_time, end_time))
+
+    windows = list(extra_windows)
+    day = start_date
+    while day <= end_date:
+        if day not in days_off:
+            for start_time, end_time in rules_by_weekday.get(day.weekday(), ()):
+                windows.append(_window(day, start_time, end_time))
+        day += timedelta(days=1)
+    # Nothing in the past can be booked
+    windows = [(max(start, now), end) for start, end in _merge(windows) if end > now]
+
+    busy = list(
+        Booking.objects.filter(
+            mentor=mentor,
+            status__in=BUSY_STATUSES,
+            session_start_at__lt=range_end,
+            session_end_at__gt=range_start,
+        ).values_list('session_start_at', 'session_end_at')
+    )
+    # Slots held while a mentee is paying are not free either
+    busy += BookingReservation.objects.filter(
+        mentor=mentor,
+        expires_at__gt=now,
+        session_start_at__lt=range_end,
+        session_end_at__gt=range_start,
+    ).values_list('session_start_at', 'session_end_at')
+    busy = _merge(busy + blocked)
+
+    free = subtract_intervals(windows, busy)
+    if slot_minutes:
+        free = split_into_slots(free, slot_minutes)
+    return free
@@ -0,0 +1,130 @@
+"""
+Response cache for the anonymous mentor list and detail endpoints.
+
+Keys embed version numbers: one per mentor for its detail page and one list
+generation shared by every list page. Signals bump them once the change has
+committed, so a write never has to find the keys it affects, and a rebuild that
+raced with the write is stored under a version nobody reads any more. Profile
+edits bump both; booking counters and ratings only bump the detail version.
+
+An entry is fresh for MENTOR_CACHE_TTL seconds. After that it is served stale
+for up to MENTOR_CACHE_STALE_SECONDS more while the one request holding a short
+lock (taken with cache.add) rebuilds it. On a plain miss the requests that lose
+the lock wait briefly for the winner instead of all going to the database.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+PREFIX = 'mentors:'
+LIST_GENERATION = f'{PREFIX}list:generation'
+LOCK_SECONDS = 10
+WAIT_SECONDS = 2.0
+POLL_SECONDS = 0.05
+
+
+def _mentor_version_key(mentor_id):
+    return f'{PREFIX}version:{mentor_id}'
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses an old version
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def _request_digest(request, *parts):
+    # Pagination links are absolute, so the scheme and host are part of the key
+    params = sorted(request.query_params.lists())
+    return hashlib.sha1(repr((request.build_absolute_uri('/'), params, parts)).encode('utf-8')).hexdigest()
+
+
+def list_key(request):
+    return f'{PREFIX}list:{_version(LIST_GENERATION)}:{_request_digest(request)}'
+
+
+def detail_key(request, mentor_id):
+    return f'{PREFIX}detail:{mentor_id}:{_version(_mentor_version_key(mentor_id))}:{_request_digest(request)}'
+
+
+def _rebuild(key, build):
+    try:
+        response = build()
+        if response.status_code == 200:
+            cache.set(
+                key,
+                (response.data, time.time() + settings.MENTOR_CACHE_TTL),
+                settings.MENTOR_CACHE_TTL + settings.MENTOR_CACHE_STALE_SECONDS,
+            )
+        return response
+    finally:
+        cache.delete(f'{key}:lock')
+
+
+def _cached(data, state):
+    response = Response(data)
+    response['X-Cache'] = state
+    return response
+
+
+def cached_response(key, build):
+    """The cached response under `key`, calling build() (returning a Response) when needed"""
+    entry = cache.get(key)
+    if entry is not None:
+        data, fresh_until = entry
+        if fresh_until > time.time():
+            return _cached(data, 'hit')
+        if not cache.add(f'{key}:lock', 1, LOCK_SECONDS):
+            return _cached(data, 'stale')
+        response = _rebuild(key, build)
+        response['X-Cache'] = 'refresh'
+        return response
+
+    if not cache.add(f'{key}:lock', 1, LOCK_SECONDS):
+        deadline = time.monotonic() + WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(POLL_SECONDS)
+            entry = cache.get(key)
+            if entry is not None:
+                return _cached(entry[0], 'hit')
+        # The rebuild is taking too long; answer this request on its own
+        response = build()
+    else:
+        response = _rebuild(key, build)
+    response['X-Cache'] = 'miss'
+    return response
+
+
+def invalidate_mentors(mentor_ids, lists=True):
+    """
+    Stop serving cached pages that show these mentors, once the current transaction commits.
+
+    Booking counters and ratings pass lists=False: those change with every booking
+    or review, so list pages pick them up when their entries go stale instead of
+    every write emptying the whole list cache.
+    """
+    mentor_ids = list(mentor_ids)
+    if not mentor_ids:
+        return
+
+    def bump():
+        for mentor_id in mentor_ids:
+            _bump(_mentor_version_key(mentor_id))
+        if lists:
+            _bump(LIST_GENERATION)
+
+    transaction.on_commit(bump)
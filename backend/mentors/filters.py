@@ -0,0 +1,28 @@
+import django_filters
+from django.db.models import Exists, OuterRef
+
+from .models import MentorProfile
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class MentorProfileFilter(django_filters.FilterSet):
+    """Query-string filters for the mentor list; sorting is ?ordering= on the view"""
+    expertise = NumberInFilter(method='filter_expertise', help_text="Comma-separated expertise ids; matches any")
+    experience_level = django_filters.MultipleChoiceFilter(choices=MentorProfile.EXPERIENCE_LEVELS)
+    min_rate = django_filters.NumberFilter(field_name='hourly_rate', lookup_expr='gte')
+    max_rate = django_filters.NumberFilter(field_name='hourly_rate', lookup_expr='lte')
+    min_rating = django_filters.NumberFilter(field_name='rating', lookup_expr='gte')
+
+    class Meta:
+        model = MentorProfile
+        fields = ['expertise', 'experience_level', 'min_rate', 'max_rate', 'min_rating', 'is_verified', 'is_active']
+
+    def filter_expertise(self, queryset, name, value):
+        # EXISTS instead of a join so mentors with several matching skills are not repeated
+        through = MentorProfile.expertise.through
+        return queryset.filter(Exists(
+            through.objects.filter(mentorprofile_id=OuterRef('pk'), expertise_id__in=value)
+        ))
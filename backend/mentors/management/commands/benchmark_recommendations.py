@@ -0,0 +1,78 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from mentors.recommendations import LEVELS, MentorFeatures, empty_profile
+
+
+class Command(BaseCommand):
+    help = 'Time recommendation scoring over synthetic mentors, without touching the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mentors', type=int, default=100000)
+        parser.add_argument('--expertise', type=int, default=200, help='Distinct expertise areas')
+        parser.add_argument('--per-mentor', type=int, default=3, help='Expertise areas per mentor')
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--updates', type=int, default=500, help='Mentors changed per incremental refresh')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        levels = list(LEVELS)
+        expertise_ids = range(1, options['expertise'] + 1)
+
+        def mentor_row(mentor_id):
+            return (
+                mentor_id,
+                round(rng.uniform(0, 5), 2),
+                rng.choice((25, 40, 60, 80, 120, 200)),
+                rng.choice(levels),
+                rng.randint(0, 500),
+                rng.random() > 0.05,
+            )
+
+        def expertise_pairs(mentor_ids):
+            return [
+                (mentor_id, expertise_id)
+                for mentor_id in mentor_ids
+                for expertise_id in rng.sample(expertise_ids, options['per_mentor'])
+            ]
+
+        mentor_ids = list(range(1, options['mentors'] + 1))
+        rows = [mentor_row(mentor_id) for mentor_id in mentor_ids]
+        pairs = expertise_pairs(mentor_ids)
+
+        started = time.perf_counter()
+        features = MentorFeatures(rows, pairs)
+        self.stdout.write(f"Built features for {len(features)} mentors in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        changed = rng.sample(mentor_ids, min(options['updates'], len(mentor_ids)))
+        started = time.perf_counter()
+        features = features.updated([mentor_row(mentor_id) for mentor_id in changed], expertise_pairs(changed))
+        self.stdout.write(f"Refreshed {len(changed)} changed mentors in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        timings = []
+        for _ in range(options['queries']):
+            # A mentee with a handful of past mentors, some reviewed, and topic hits from search
+            profile = empty_profile()
+            for expertise_id in rng.sample(expertise_ids, rng.randint(1, 6)):
+                profile['expertise'][expertise_id] = rng.choice((2.0, 1.0, 1.0, -1.0))
+            profile['topics'] = {rng.choice(mentor_ids): rng.uniform(1, 20) for _ in range(rng.randint(0, 200))}
+            profile['log_rate'] = float(features.log_rate[rng.randrange(len(features))])
+            profile['level'] = float(rng.randint(0, 3))
+            profile['exclude'] = set(rng.sample(mentor_ids, 3))
+
+            started = time.perf_counter()
+            features.top(profile, options['limit'])
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        self.stdout.write(
+            f"Scored {options['queries']} mentees: "
+            f"p50 {statistics.median(timings):.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, "
+            f"max {timings[-1]:.2f} ms"
+        )
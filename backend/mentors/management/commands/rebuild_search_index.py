@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from mentors.models import MentorProfile, MentorSearchDocument
+from mentors.search import INDEX_BATCH_SIZE, index_mentors, remove_mentors
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search document of every mentor (run once after deploying search, or after changing the analyzer)'
+
+    def handle(self, *args, **options):
+        mentor_ids = MentorProfile.objects.order_by('id').values_list('id', flat=True)
+        batch = []
+        total = 0
+        for mentor_id in mentor_ids.iterator(chunk_size=INDEX_BATCH_SIZE):
+            batch.append(mentor_id)
+            if len(batch) >= INDEX_BATCH_SIZE:
+                index_mentors(batch)
+                total += len(batch)
+                batch = []
+        index_mentors(batch)
+        total += len(batch)
+
+        # Documents left behind by mentors deleted while signals were not running
+        orphans = MentorSearchDocument.objects.filter(is_active=True).exclude(
+            mentor_id__in=MentorProfile.objects.values('id')
+        ).values_list('mentor_id', flat=True)
+        remove_mentors(orphans)
+        self.stdout.write(f"Indexed {total} mentors")
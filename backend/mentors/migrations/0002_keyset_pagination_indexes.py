@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=models.Index(fields=['created_at', 'id'], name='mentor_page_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.IntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_rules', to='mentors.mentorprofile')),
+            ],
+            options={
+                'verbose_name': 'Availability Rule',
+                'verbose_name_plural': 'Availability Rules',
+                'ordering': ['weekday', 'start_time'],
+                'indexes': [models.Index(fields=['mentor', 'weekday'], name='availability_rule_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AvailabilityException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField(blank=True, help_text='Leave empty to cover the whole day', null=True)),
+                ('end_time', models.TimeField(blank=True, help_text='Leave empty to cover the whole day', null=True)),
+                ('is_available', models.BooleanField(default=False, help_text='Unchecked blocks the time, checked adds extra availability')),
+                ('reason', models.CharField(blank=True, max_length=200, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_exceptions', to='mentors.mentorprofile')),
+            ],
+            options={
+                'verbose_name': 'Availability Exception',
+                'verbose_name_plural': 'Availability Exceptions',
+                'ordering': ['date', 'start_time'],
+                'indexes': [models.Index(fields=['mentor', 'date'], name='availability_exception_idx')],
+            },
+        ),
+    ]
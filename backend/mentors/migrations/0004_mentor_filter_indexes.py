@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0003_availability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=models.Index(fields=['rating', 'id'], name='mentor_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=models.Index(fields=['hourly_rate', 'id'], name='mentor_rate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=models.Index(fields=['total_sessions', 'id'], name='mentor_sessions_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0004_mentor_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorSearchDocument',
+            fields=[
+                ('mentor_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('terms', models.JSONField(default=dict, help_text='term -> weighted frequency')),
+                ('length', models.IntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Mentor Search Document',
+                'verbose_name_plural': 'Mentor Search Documents',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0005_mentorsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='completed_sessions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='total_earnings',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='total_minutes',
+            field=models.IntegerField(default=0),
+        ),
+    ]
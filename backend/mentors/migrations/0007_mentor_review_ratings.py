@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0006_mentor_booking_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='rating_score',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='ratings_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='ratings_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='ratings_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='ratings_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='ratings_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='review_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=models.Index(fields=['rating_score', 'id'], name='mentor_rating_score_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+HISTOGRAM_FIELDS = ('ratings_1', 'ratings_2', 'ratings_3', 'ratings_4', 'ratings_5')
+CENT = Decimal('0.01')
+
+
+def backfill_review_ratings(apps, schema_editor):
+    MentorProfile = apps.get_model('mentors', 'MentorProfile')
+    Review = apps.get_model('reviews', 'Review')
+    histograms = {}
+    for mentor_id, stars, count in Review.objects.order_by().values_list('mentor_id', 'rating').annotate(n=Count('id')):
+        histograms.setdefault(mentor_id, [0] * len(HISTOGRAM_FIELDS))[stars - 1] = count
+
+    # Mentors without reviews keep the zeros the columns were added with
+    prior_weight = settings.RATING_PRIOR_WEIGHT
+    batch = []
+    for mentor_id in sorted(histograms):
+        histogram = histograms[mentor_id]
+        count = sum(histogram)
+        total = sum(stars * n for stars, n in enumerate(histogram, start=1))
+        batch.append(MentorProfile(
+            pk=mentor_id,
+            review_count=count,
+            rating=Decimal(total / count).quantize(CENT),
+            rating_score=Decimal((prior_weight * settings.RATING_PRIOR_MEAN + total) / (prior_weight + count)).quantize(CENT),
+            **dict(zip(HISTOGRAM_FIELDS, histogram)),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            MentorProfile.objects.bulk_update(batch, ['review_count', 'rating', 'rating_score', *HISTOGRAM_FIELDS])
+            batch = []
+    if batch:
+        MentorProfile.objects.bulk_update(batch, ['review_count', 'rating', 'rating_score', *HISTOGRAM_FIELDS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0007_mentor_review_ratings'),
+        ('reviews', '0003_review_mentor_feed_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_review_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+BATCH_SIZE = 1000
+COUNTER_FIELDS = ('total_sessions', 'completed_sessions', 'total_minutes', 'total_earnings')
+
+
+def backfill_booking_counters(apps, schema_editor):
+    MentorProfile = apps.get_model('mentors', 'MentorProfile')
+    Booking = apps.get_model('bookings', 'Booking')
+    # total_sessions predates the other three columns and may hold counts from
+    # before, so start every mentor from zero, bookings or not
+    MentorProfile.objects.update(total_sessions=0, completed_sessions=0, total_minutes=0, total_earnings=0)
+    completed = Q(status='completed')
+    rows = Booking.objects.order_by('mentor_id').values('mentor_id').annotate(
+        total_sessions=Count('id', filter=~Q(status='cancelled')),
+        completed_sessions=Count('id', filter=completed),
+        total_minutes=Sum('duration_minutes', filter=completed),
+        total_earnings=Sum('total_amount', filter=completed),
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(MentorProfile(
+            pk=row['mentor_id'],
+            total_sessions=row['total_sessions'],
+            completed_sessions=row['completed_sessions'],
+            total_minutes=row['total_minutes'] or 0,
+            total_earnings=row['total_earnings'] or Decimal('0'),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            MentorProfile.objects.bulk_update(batch, COUNTER_FIELDS)
+            batch = []
+    if batch:
+        MentorProfile.objects.bulk_update(batch, COUNTER_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentors', '0008_backfill_review_ratings'),
+        ('bookings', '0011_bookingreservation'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_booking_counters, migrations.RunPython.noop),
+    ]
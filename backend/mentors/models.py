@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Expertise(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -29,15 +32,207 @@ class MentorProfile(models.Model):
     availability = models.TextField(help_text="Describe your availability for mentorship sessions")
     is_verified = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    # Booking counters, kept current by bookings/counters.py; total_sessions
+    # excludes cancelled bookings, the others count completed ones only
     total_sessions = models.IntegerField(default=0)
+    completed_sessions = models.IntegerField(default=0)
+    total_minutes = models.IntegerField(default=0)
+    total_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    # Review counters, kept current by reviews/ratings.py. rating is the plain
+    # average; rating_score pulls it towards RATING_PRIOR_MEAN while there are
+    # few reviews, so it is the fairer sort key. Both are 0 until the first review.
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    rating_score = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    review_count = models.IntegerField(default=0)
+    ratings_1 = models.IntegerField(default=0)
+    ratings_2 = models.IntegerField(default=0)
+    ratings_3 = models.IntegerField(default=0)
+    ratings_4 = models.IntegerField(default=0)
+    ratings_5 = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     
+    COUNTER_FIELDS = ('total_sessions', 'completed_sessions', 'total_minutes', 'total_earnings')
+    HISTOGRAM_FIELDS = ('ratings_1', 'ratings_2', 'ratings_3', 'ratings_4', 'ratings_5')
+    RATING_FIELDS = ('rating', 'rating_score', 'review_count', *HISTOGRAM_FIELDS)
+
     def __str__(self):
         return f"{self.user.username} - Mentor"
+
+    def save(self, *args, **kwargs):
+        # Counters and ratings only move through F() updates; saving an
+        # instance loaded earlier must not write their old values back
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in (*self.COUNTER_FIELDS, *self.RATING_FIELDS)
+            ]
+        super().save(*args, **kwargs)
     
     class Meta:
         verbose_name = "Mentor Profile"
         verbose_name_plural = "Mentor Profiles"
+        indexes = [
+            # Keyset pagination over (-created_at, -id)
+            models.Index(fields=['created_at', 'id'], name='mentor_page_idx'),
+            # ?ordering= on the mentor list, also used for the rate/rating range filters
+            models.Index(fields=['rating', 'id'], name='mentor_rating_idx'),
+            models.Index(fields=['rating_score', 'id'], name='mentor_rating_score_idx'),
+            models.Index(fields=['hourly_rate', 'id'], name='mentor_rate_idx'),
+            models.Index(fields=['total_sessions', 'id'], name='mentor_sessions_idx'),
+        ]
+
+
+class AvailabilityRule(models.Model):
+    """Weekly recurring window in which a mentor takes sessions (local time)"""
+    WEEKDAYS = (
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    )
+
+    mentor = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='availability_rules')
+    weekday = models.IntegerField(choices=WEEKDAYS)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.mentor.user.username} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+
+    class Meta:
+        ordering = ['weekday', 'start_time']
+        verbose_name = "Availability Rule"
+        verbose_name_plural = "Availability Rules"
+        indexes = [
+            models.Index(fields=['mentor', 'weekday'], name='availability_rule_idx'),
+        ]
+
+
+class AvailabilityException(models.Model):
+    """One-off change to the weekly rules: a day off, a blocked window or an extra window"""
+    mentor = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='availability_exceptions')
+    date = models.DateField()
+    start_time = models.TimeField(blank=True, null=True, help_text="Leave empty to cover the whole day")
+    end_time = models.TimeField(blank=True, null=True, help_text="Leave empty to cover the whole day")
+    is_available = models.BooleanField(default=False, help_text="Unchecked blocks the time, checked adds extra availability")
+    reason = models.CharField(max_length=200, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.mentor.user.username} - {self.date} - {'available' if self.is_available else 'blocked'}"
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        verbose_name = "Availability Exception"
+        verbose_name_plural = "Availability Exceptions"
+        indexes = [
+            models.Index(fields=['mentor', 'date'], name='availability_exception_idx'),
+        ]
+
+
+class MentorSearchDocument(models.Model):
+    """
+    Analyzed search text for one mentor, kept in step with the profile by signals.
+
+    Each process builds its in-memory index from these rows and then only
+    re-reads the ones whose updated_at moved past its watermark. Rows are never
+    deleted, so a removed mentor reaches every process as is_active=False.
+    """
+    mentor_id = models.BigIntegerField(primary_key=True)
+    terms = models.JSONField(default=dict, help_text="term -> weighted frequency")
+    length = models.IntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Search document for mentor {self.mentor_id}"
+
+    class Meta:
+        verbose_name = "Mentor Search Document"
+        verbose_name_plural = "Mentor Search Documents"
+
+
+# MentorProfile columns that end up in the search document
+SEARCH_FIELDS = {'user', 'user_id', 'position', 'company', 'is_active'}
+
+@receiver(post_save, sender=MentorProfile)
+def index_mentor_profile(sender, instance, update_fields=None, **kwargs):
+    from .cache import invalidate_mentors
+    from .search import index_mentors_on_commit
+    if update_fields is None or SEARCH_FIELDS.intersection(update_fields):
+        index_mentors_on_commit([instance.pk])
+    invalidate_mentors([instance.pk])
+
+@receiver(post_delete, sender=MentorProfile)
+def unindex_mentor_profile(sender, instance, **kwargs):
+    from .cache import invalidate_mentors
+    from .search import index_mentors_on_commit
+    index_mentors_on_commit([instance.pk])
+    invalidate_mentors([instance.pk])
+
+@receiver(m2m_changed, sender=MentorProfile.expertise.through)
+def mentor_expertise_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Remember who loses this expertise; the rows are gone by post_clear
+        instance._cleared_mentors = list(instance.mentors.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        mentor_ids = [instance.pk]
+    elif action == 'post_clear':
+        mentor_ids = getattr(instance, '_cleared_mentors', [])
+    else:
+        mentor_ids = list(pk_set)
+    # Expertise is part of the profile, so readers watching updated_at must see the change
+    MentorProfile.objects.filter(pk__in=mentor_ids).update(updated_at=timezone.now())
+    from .cache import invalidate_mentors
+    from .search import index_mentors_on_commit
+    index_mentors_on_commit(mentor_ids)
+    invalidate_mentors(mentor_ids)
+
+@receiver(post_save, sender=Expertise)
+def index_expertise_mentors(sender, instance, created, **kwargs):
+    from .cache import invalidate_mentors
+    from .search import index_mentors_on_commit
+    if not created:
+        mentor_ids = list(instance.mentors.values_list('id', flat=True))
+        index_mentors_on_commit(mentor_ids)
+        invalidate_mentors(mentor_ids)
+
+@receiver(pre_delete, sender=Expertise)
+def remember_expertise_mentors(sender, instance, **kwargs):
+    # The cascade removes the m2m rows without an m2m_changed signal
+    instance._cleared_mentors = list(instance.mentors.values_list('id', flat=True))
+
+@receiver(post_delete, sender=Expertise)
+def index_deleted_expertise_mentors(sender, instance, **kwargs):
+    from .cache import invalidate_mentors
+    from .search import index_mentors_on_commit
+    mentor_ids = getattr(instance, '_cleared_mentors', [])
+    MentorProfile.objects.filter(pk__in=mentor_ids).update(updated_at=timezone.now())
+    index_mentors_on_commit(mentor_ids)
+    invalidate_mentors(mentor_ids)
+
+@receiver(post_save, sender='users.UserProfile')
+def index_mentor_bio(sender, instance, update_fields=None, **kwargs):
+    from .cache import invalidate_mentors
+    from .search import index_mentors_on_commit
+    mentor_ids = list(MentorProfile.objects.filter(user_id=instance.user_id).values_list('id', flat=True))
+    if update_fields is None or 'bio' in update_fields:
+        index_mentors_on_commit(mentor_ids)
+    invalidate_mentors(mentor_ids)
+
+@receiver(post_save, sender=User)
+def invalidate_mentor_user(sender, instance, update_fields=None, **kwargs):
+    # Name, username and email are shown on the mentor pages; logins only touch last_login
+    from .cache import invalidate_mentors
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_mentors(MentorProfile.objects.filter(user_id=instance.pk).values_list('id', flat=True))
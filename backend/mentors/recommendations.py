@@ -0,0 +1,265 @@
+"""
+Mentor recommendations for a mentee, scored in one vectorized pass.
+
+MentorFeatures keeps one row per mentor in NumPy arrays (rating, price, level,
+popularity, expertise memberships). Each process builds it once, then re-reads
+only the mentors whose updated_at passed its watermark and swaps in an updated
+copy. Scoring a mentee is a fixed number of array operations over all mentors;
+only the mentee's own history is read from the database per request.
+"""
+import math
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import MentorProfile
+
+LEVELS = {'junior': 0, 'mid': 1, 'senior': 2, 'expert': 3}
+WEIGHTS = {
+    'expertise': 3.0,
+    'topics': 2.0,
+    'rating': 1.0,
+    'price': 1.0,
+    'level': 0.5,
+    'popularity': 0.5,
+}
+# Review stars -> how much a past mentor says about what the mentee likes
+REVIEW_WEIGHTS = {5: 2.0, 4: 1.0, 3: 0.0, 2: -1.0, 1: -2.0}
+UNREVIEWED_WEIGHT = 1.0
+# Mentors the mentee rated this low or lower are never recommended again
+EXCLUDE_AT_OR_BELOW = 2
+# Re-read rows this far behind the watermark so late commits are not missed
+WATERMARK_OVERLAP = timedelta(seconds=60)
+# Full reload now and then, which is also how deleted mentors drop out
+FULL_RELOAD_SECONDS = 3600
+
+MENTOR_FIELDS = ('id', 'rating', 'hourly_rate', 'experience_level', 'total_sessions', 'is_active')
+
+
+class MentorFeatures:
+    """
+    Column arrays for every mentor. Instances are never modified once built;
+    `updated()` returns a copy, so a request that is scoring never sees a
+    half-applied refresh.
+    """
+
+    def __init__(self, mentor_rows, expertise_pairs):
+        """mentor_rows: (id, rating, hourly_rate, level, total_sessions, is_active); expertise_pairs: (mentor_id, expertise_id)"""
+        columns = list(zip(*mentor_rows)) or [()] * 6
+        self.mentor_ids = np.asarray(columns[0], dtype=np.int64)
+        self.rating = np.asarray(columns[1], dtype=np.float32)
+        self.log_rate = np.log1p(np.asarray(columns[2], dtype=np.float32))
+        self.level = np.asarray([LEVELS.get(level, 0) for level in columns[3]], dtype=np.float32)
+        self.sessions = np.asarray(columns[4], dtype=np.float32)
+        self.active = np.asarray(columns[5], dtype=bool)
+        self.row_of = {int(mentor_id): row for row, mentor_id in enumerate(self.mentor_ids)}
+        self.expertise_index = {}
+        self.pair_rows, self.pair_expertise = self._pairs(expertise_pairs)
+
+    def __len__(self):
+        return len(self.mentor_ids)
+
+    def _pairs(self, expertise_pairs):
+        rows, expertise = [], []
+        for mentor_id, expertise_id in expertise_pairs:
+            row = self.row_of.get(mentor_id)
+            if row is not None:
+                rows.append(row)
+                expertise.append(self.expertise_index.setdefault(expertise_id, len(self.expertise_index)))
+        return np.asarray(rows, dtype=np.int32), np.asarray(expertise, dtype=np.int32)
+
+    def updated(self, mentor_rows, expertise_pairs):
+        """Copy with the given mentors replaced or added; expertise_pairs must cover all of them"""
+        features = object.__new__(MentorFeatures)
+        features.__dict__.update(self.__dict__)
+        features.row_of = dict(self.row_of)
+        features.expertise_index = dict(self.expertise_index)
+        arrays = {name: getattr(self, name).copy() for name in ('mentor_ids', 'rating', 'log_rate', 'level', 'sessions', 'active')}
+
+        appended = {name: [] for name in arrays}
+        changed_rows = []
+        for mentor_id, rating, hourly_rate, level, total_sessions, is_active in mentor_rows:
+            values = {
+                'mentor_ids': mentor_id,
+                'rating': float(rating),
+                'log_rate': math.log1p(float(hourly_rate)),
+                'level': LEVELS.get(level, 0),
+                'sessions': total_sessions,
+                'active': is_active,
+            }
+            row = features.row_of.get(mentor_id)
+            if row is None:
+                row = len(features.row_of)
+                features.row_of[mentor_id] = row
+                for name, value in values.items():
+                    appended[name].append(value)
+            else:
+                for name, value in values.items():
+                    arrays[name][row] = value
+            changed_rows.append(row)
+        for name, values in appended.items():
+            if values:
+                arrays[name] = np.concatenate([arrays[name], np.asarray(values, dtype=arrays[name].dtype)])
+        features.__dict__.update(arrays)
+
+        keep = ~np.isin(self.pair_rows, np.asarray(changed_rows, dtype=np.int32))
+        new_rows, new_expertise = features._pairs(expertise_pairs)
+        features.pair_rows = np.concatenate([self.pair_rows[keep], new_rows])
+        features.pair_expertise = np.concatenate([self.pair_expertise[keep], new_expertise])
+        return features
+
+    def score(self, profile):
+        """Score of every mentor for a mentee profile (see build_mentee_profile); excluded mentors get -inf"""
+        size = len(self.mentor_ids)
+        scores = np.zeros(size, dtype=np.float32)
+
+        preference = np.zeros(len(self.expertise_index), dtype=np.float32)
+        for expertise_id, weight in profile['expertise'].items():
+            index = self.expertise_index.get(expertise_id)
+            if index is not None:
+                preference[index] += weight
+        if preference.any():
+            affinity = np.bincount(self.pair_rows, weights=preference[self.pair_expertise], minlength=size)
+            scores += WEIGHTS['expertise'] * affinity / max(np.abs(affinity).max(), 1e-6)
+
+        if profile['topics']:
+            best = max(profile['topics'].values())
+            for mentor_id, relevance in profile['topics'].items():
+                row = self.row_of.get(mentor_id)
+                if row is not None:
+                    scores[row] += WEIGHTS['topics'] * relevance / best
+
+        scores += WEIGHTS['rating'] * self.rating / 5
+        if profile['log_rate'] is not None:
+            scores += WEIGHTS['price'] * np.exp(-np.abs(self.log_rate - profile['log_rate']))
+        if profile['level'] is not None:
+            scores += WEIGHTS['level'] * (1 - np.abs(self.level - profile['level']) / 3)
+        if size:
+            scores += WEIGHTS['popularity'] * np.log1p(self.sessions) / max(math.log1p(float(self.sessions.max())), 1e-6)
+
+        scores[~self.active] = -np.inf
+        for mentor_id in profile['exclude']:
+            row = self.row_of.get(mentor_id)
+            if row is not None:
+                scores[row] = -np.inf
+        return scores
+
+    def top(self, profile, limit):
+        """[(mentor_id, score)] best first"""
+        scores = self.score(profile)
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        ranked = sorted(candidates, key=lambda row: (-scores[row], self.mentor_ids[row]))
+        return [(int(self.mentor_ids[row]), float(scores[row])) for row in ranked]
+
+
+def empty_profile():
+    return {'expertise': {}, 'topics': {}, 'log_rate': None, 'level': None, 'exclude': set()}
+
+
+def build_mentee_profile(user, features):
+    """What the mentee's bookings and reviews say about the mentors they want"""
+    from bookings.models import Booking
+    from reviews.models import Review
+    from .search import search_mentors
+
+    profile = empty_profile()
+    own_mentor = MentorProfile.objects.filter(user=user).values_list('id', flat=True).first()
+    if own_mentor:
+        profile['exclude'].add(own_mentor)
+
+    bookings = list(
+        Booking.objects.filter(mentee=user).exclude(status='cancelled')
+        .order_by('-session_start_at').values_list('mentor_id', 'topic')[:100]
+    )
+    if not bookings:
+        return profile
+    stars = {}
+    for mentor_id, rating in Review.objects.filter(mentee=user).values_list('mentor_id', 'rating'):
+        stars.setdefault(mentor_id, []).append(rating)
+
+    mentor_weights = {}
+    for mentor_id, _ in bookings:
+        ratings = stars.get(mentor_id)
+        if ratings and min(ratings) <= EXCLUDE_AT_OR_BELOW:
+            profile['exclude'].add(mentor_id)
+        weight = sum(REVIEW_WEIGHTS[r] for r in ratings) / len(ratings) if ratings else UNREVIEWED_WEIGHT
+        mentor_weights[mentor_id] = mentor_weights.get(mentor_id, 0.0) + weight
+
+    through = MentorProfile.expertise.through
+    for mentor_id, expertise_id in through.objects.filter(mentorprofile_id__in=mentor_weights).values_list(
+        'mentorprofile_id', 'expertise_id'
+    ):
+        profile['expertise'][expertise_id] = profile['expertise'].get(expertise_id, 0.0) + mentor_weights[mentor_id]
+
+    # Price and seniority the mentee was happy with, from the in-memory features
+    liked = [(features.row_of[m], w) for m, w in mentor_weights.items() if w > 0 and m in features.row_of]
+    if liked:
+        rows = np.asarray([row for row, _ in liked])
+        weights = np.asarray([weight for _, weight in liked], dtype=np.float32)
+        profile['log_rate'] = float(np.average(features.log_rate[rows], weights=weights))
+        profile['level'] = float(np.average(features.level[rows], weights=weights))
+
+    topics = ' '.join(topic for _, topic in bookings[:20] if topic)
+    profile['topics'] = dict(search_mentors(topics, limit=500)) if topics else {}
+    return profile
+
+
+def _mentor_rows(queryset):
+    return queryset.values_list(*MENTOR_FIELDS)
+
+
+def _expertise_pairs(mentor_ids=None):
+    pairs = MentorProfile.expertise.through.objects.all()
+    if mentor_ids is not None:
+        pairs = pairs.filter(mentorprofile_id__in=mentor_ids)
+    return pairs.values_list('mentorprofile_id', 'expertise_id')
+
+
+class MentorRecommender:
+    """Per-process holder of MentorFeatures that keeps it fresh"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.features = None
+        self._watermark = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self.features is not None and now - self._checked_at < settings.RECOMMENDATION_REFRESH_SECONDS:
+            return
+        with self._lock:
+            started = timezone.now()
+            if force or self.features is None or now - self._loaded_at > FULL_RELOAD_SECONDS:
+                self.features = MentorFeatures(
+                    _mentor_rows(MentorProfile.objects.all()).iterator(chunk_size=5000),
+                    _expertise_pairs().iterator(chunk_size=5000),
+                )
+                self._loaded_at = now
+            else:
+                changed = list(_mentor_rows(
+                    MentorProfile.objects.filter(updated_at__gte=self._watermark - WATERMARK_OVERLAP)
+                ))
+                if changed:
+                    self.features = self.features.updated(changed, _expertise_pairs([row[0] for row in changed]))
+            self._watermark = started
+            self._checked_at = now
+
+    def recommend(self, user, limit=10):
+        self.refresh()
+        features = self.features
+        return features.top(build_mentee_profile(user, features), limit)
+
+
+recommender = MentorRecommender()
+
+
+def recommend_mentors(user, limit=10):
+    return recommender.recommend(user, limit)
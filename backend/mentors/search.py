@@ -0,0 +1,252 @@
+"""
+Full-text mentor search with BM25 ranking.
+
+Signals keep one MentorSearchDocument row per mentor up to date, rebuilding it
+after the changing transaction commits. Each process
+holds an in-memory inverted index built from those rows: a compact base segment
+in NumPy arrays plus a small overlay of documents changed since it was built.
+Before a search the index re-reads only the rows whose updated_at passed its
+watermark, and it folds the overlay into a fresh base once it grows too large.
+"""
+import math
+import re
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import MentorProfile, MentorSearchDocument
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from has have i in into is it its me my "
+    "of on or our so than that the their they this to was we were will with you your".split()
+)
+# Matches in expertise and job titles say more than a passing mention in a bio
+FIELD_WEIGHTS = (
+    ('expertise', 3),
+    ('position', 2),
+    ('company', 2),
+    ('name', 2),
+    ('bio', 1),
+    ('expertise_description', 1),
+)
+K1 = 1.2
+B = 0.75
+INDEX_BATCH_SIZE = 1000
+# Re-read rows this far behind the watermark so a transaction that committed
+# late with an older updated_at is still picked up
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall((text or '').lower()) if token not in STOPWORDS]
+
+
+def analyze(fields):
+    """Weighted term frequencies for a dict of field name -> text"""
+    terms = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(fields.get(field)):
+            terms[token] = terms.get(token, 0) + weight
+    return terms
+
+
+def mentor_fields(mentor):
+    expertise = list(mentor.expertise.all())
+    user = mentor.user
+    profile = getattr(user, 'profile', None)
+    return {
+        'expertise': ' '.join(item.name for item in expertise),
+        'expertise_description': ' '.join(item.description or '' for item in expertise),
+        'position': mentor.position,
+        'company': mentor.company,
+        'name': f"{user.first_name} {user.last_name} {user.username}",
+        'bio': profile.bio if profile else '',
+    }
+
+
+def index_mentors(mentor_ids):
+    """(Re)build the search documents for the given mentors, in batches"""
+    mentor_ids = list(mentor_ids)
+    for start in range(0, len(mentor_ids), INDEX_BATCH_SIZE):
+        batch = mentor_ids[start:start + INDEX_BATCH_SIZE]
+        existing = {
+            mentor_id: rest
+            for mentor_id, *rest in MentorSearchDocument.objects.filter(mentor_id__in=batch).values_list(
+                'mentor_id', 'terms', 'length', 'is_active'
+            )
+        }
+        now = timezone.now()
+        documents = []
+        found = set()
+        for mentor in MentorProfile.objects.filter(pk__in=batch).select_related('user__profile').prefetch_related('expertise'):
+            found.add(mentor.pk)
+            terms = analyze(mentor_fields(mentor))
+            length = sum(terms.values())
+            # Unchanged documents are not rewritten, so every process is not made to re-read them
+            if existing.get(mentor.pk) == [terms, length, mentor.is_active]:
+                continue
+            documents.append(MentorSearchDocument(
+                mentor_id=mentor.pk, terms=terms, length=length, is_active=mentor.is_active, updated_at=now
+            ))
+        if documents:
+            MentorSearchDocument.objects.bulk_create(
+                documents,
+                update_conflicts=True,
+                # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target
+                unique_fields=['mentor_id'] if connection.features.supports_update_conflicts_with_target else None,
+                update_fields=['terms', 'length', 'is_active', 'updated_at'],
+            )
+        remove_mentors(set(batch) - found)
+
+
+def index_mentors_on_commit(mentor_ids):
+    """Rebuild the documents once the current transaction commits, rather than inside the write itself"""
+    mentor_ids = list(mentor_ids)
+    if mentor_ids:
+        # Mentors deleted by then are found missing and hidden by index_mentors
+        transaction.on_commit(lambda: index_mentors(mentor_ids))
+
+
+def remove_mentors(mentor_ids):
+    """Hide deleted mentors; the row stays so other processes notice the change"""
+    mentor_ids = list(mentor_ids)
+    if mentor_ids:
+        MentorSearchDocument.objects.filter(mentor_id__in=mentor_ids).update(
+            terms={}, length=0, is_active=False, updated_at=timezone.now()
+        )
+
+
+class _Segment:
+    """Immutable inverted index over a set of documents, postings grouped by term"""
+
+    def __init__(self, documents):
+        vocabulary = {}
+        term_ids, rows, frequencies = [], [], []
+        mentor_ids, lengths = [], []
+        for row, (mentor_id, terms, length) in enumerate(documents):
+            mentor_ids.append(mentor_id)
+            lengths.append(length)
+            for term, frequency in terms.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                frequencies.append(frequency)
+
+        order = np.argsort(np.asarray(term_ids, dtype=np.int32), kind='stable')
+        self.rows = np.asarray(rows, dtype=np.int32)[order]
+        self.frequencies = np.asarray(frequencies, dtype=np.float32)[order]
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(np.asarray(term_ids, dtype=np.int32), minlength=len(vocabulary)))))
+        self.offsets = {term: (int(bounds[term_id]), int(bounds[term_id + 1])) for term, term_id in vocabulary.items()}
+        self.mentor_ids = np.asarray(mentor_ids, dtype=np.int64)
+        self.row_of = {mentor_id: row for row, mentor_id in enumerate(mentor_ids)}
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.alive = np.ones(len(mentor_ids), dtype=bool)
+        self.alive_count = len(mentor_ids)
+        self.alive_length = float(self.lengths.sum())
+
+    def postings(self, term):
+        start, end = self.offsets.get(term, (0, 0))
+        return self.rows[start:end], self.frequencies[start:end]
+
+    def kill(self, mentor_id):
+        row = self.row_of.get(mentor_id)
+        if row is not None and self.alive[row]:
+            self.alive[row] = False
+            self.alive_count -= 1
+            self.alive_length -= float(self.lengths[row])
+
+
+class MentorSearchIndex:
+    """Per-process BM25 index over MentorSearchDocument rows"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._base = None
+        # mentor_id -> (terms, length) for active documents changed since the base was built
+        self._overlay = {}
+        self._watermark = None
+        self._checked_at = 0.0
+
+    def refresh(self, force=False):
+        """Pick up changed documents; cheap when nothing changed"""
+        if not force and self._base is not None and time.monotonic() - self._checked_at < settings.SEARCH_INDEX_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._base is None or force:
+                self._rebuild()
+                return
+            started = timezone.now()
+            changed = MentorSearchDocument.objects.filter(
+                updated_at__gte=self._watermark - WATERMARK_OVERLAP
+            ).values_list('mentor_id', 'terms', 'length', 'is_active')
+            for mentor_id, terms, length, is_active in changed:
+                self._base.kill(mentor_id)
+                if is_active and length:
+                    self._overlay[mentor_id] = (terms, length)
+                else:
+                    self._overlay.pop(mentor_id, None)
+            self._watermark = started
+            self._checked_at = time.monotonic()
+            if len(self._overlay) > max(1000, self._base.alive_count // 50):
+                self._rebuild()
+
+    def _rebuild(self):
+        started = timezone.now()
+        documents = MentorSearchDocument.objects.filter(is_active=True, length__gt=0).values_list(
+            'mentor_id', 'terms', 'length'
+        ).iterator(chunk_size=5000)
+        self._base = _Segment(documents)
+        self._overlay = {}
+        self._watermark = started
+        self._checked_at = time.monotonic()
+
+    def search(self, query, limit=20):
+        """[(mentor_id, score)] best first"""
+        self.refresh()
+        tokens = list(dict.fromkeys(tokenize(query)))
+        base, overlay = self._base, dict(self._overlay)
+        if not tokens:
+            return []
+
+        overlay_length = sum(length for _, length in overlay.values())
+        documents = base.alive_count + len(overlay)
+        if not documents:
+            return []
+        average_length = (base.alive_length + overlay_length) / documents
+
+        scores = np.zeros(len(base.mentor_ids), dtype=np.float32)
+        length_norm = K1 * (1 - B + B * base.lengths / average_length)
+        overlay_scores = {}
+        for token in tokens:
+            rows, frequencies = base.postings(token)
+            overlay_hits = [(mentor_id, terms[token], length) for mentor_id, (terms, length) in overlay.items() if token in terms]
+            # Rows of documents that moved to the overlay are still in the postings
+            document_frequency = int(np.count_nonzero(base.alive[rows])) + len(overlay_hits)
+            if not document_frequency:
+                continue
+            idf = math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+            # Postings of one term hold each row once, so fancy-index += is safe
+            scores[rows] += idf * frequencies * (K1 + 1) / (frequencies + length_norm[rows])
+            for mentor_id, frequency, length in overlay_hits:
+                norm = K1 * (1 - B + B * length / average_length)
+                overlay_scores[mentor_id] = overlay_scores.get(mentor_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+
+        scores[~base.alive] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        hits = {int(base.mentor_ids[row]): float(scores[row]) for row in candidates}
+        hits.update(overlay_scores)
+        return sorted(hits.items(), key=lambda hit: (-hit[1], hit[0]))[:limit]
+
+
+mentor_index = MentorSearchIndex()
+
+
+def search_mentors(query, limit=20):
+    return mentor_index.search(query, limit)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import MentorProfile, Expertise
+from datetime import time, timedelta
+from .models import MentorProfile, Expertise, AvailabilityRule, AvailabilityException
 from users.serializers import UserSerializer
 
 class ExpertiseSerializer(serializers.ModelSerializer):
@@ -7,6 +8,10 @@ class ExpertiseSerializer(serializers.ModelSerializer):
         model = Expertise
         fields = '__all__'
 
+def rating_histogram(mentor):
+    """{'1': count, ..., '5': count} from the counters on the profile"""
+    return {str(stars): getattr(mentor, field) for stars, field in enumerate(MentorProfile.HISTOGRAM_FIELDS, start=1)}
+
 class MentorProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     expertise = ExpertiseSerializer(many=True, read_only=True)
@@ -18,13 +23,22 @@ class MentorProfileSerializer(serializers.ModelSerializer):
         required=False
     )
     # Add these fields from related UserProfile
-    bio = serializers.CharField(source='user.userprofile.bio', read_only=True)
-    profile_picture = serializers.ImageField(source='user.userprofile.profile_picture', read_only=True)
+    bio = serializers.CharField(source='user.profile.bio', read_only=True)
+    profile_picture = serializers.ImageField(source='user.profile.profile_picture', read_only=True)
+    rating_histogram = serializers.SerializerMethodField()
 
     class Meta:
         model = MentorProfile
-        fields = '__all__'  # This will now include bio and profile_picture
-        read_only_fields = ['user', 'is_verified', 'total_sessions', 'rating', 'created_at', 'updated_at']
+        # Everything, plus bio and profile_picture; the histogram columns come as rating_histogram.
+        # Minutes and earnings are the mentor's own business: their dashboard stats show them
+        exclude = (*MentorProfile.HISTOGRAM_FIELDS, 'total_minutes', 'total_earnings')
+        read_only_fields = [
+            'user', 'is_verified', 'total_sessions', 'completed_sessions',
+            'rating', 'rating_score', 'review_count', 'created_at', 'updated_at',
+        ]
+
+    def get_rating_histogram(self, obj):
+        return rating_histogram(obj)
 
     def create(self, validated_data):
         user = self.context['request'].user
@@ -35,12 +49,71 @@ class MentorListSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     expertise = ExpertiseSerializer(many=True, read_only=True)
     # Add these fields for the list as well
-    bio = serializers.CharField(source='user.userprofile.bio', read_only=True)
-    profile_picture = serializers.ImageField(source='user.userprofile.profile_picture', read_only=True)
+    bio = serializers.CharField(source='user.profile.bio', read_only=True)
+    profile_picture = serializers.ImageField(source='user.profile.profile_picture', read_only=True)
+    rating_histogram = serializers.SerializerMethodField()
 
     class Meta:
         model = MentorProfile
         fields = [
             'id', 'user', 'expertise', 'experience_level', 'hourly_rate',
-            'is_verified', 'rating', 'total_sessions', 'bio', 'profile_picture'
-        ]
\ No newline at end of file
+            'is_verified', 'rating', 'rating_score', 'review_count', 'rating_histogram',
+            'total_sessions', 'completed_sessions', 'bio', 'profile_picture'
+        ]
+
+    def get_rating_histogram(self, obj):
+        return rating_histogram(obj)
+
+def ends_before_start(start_time, end_time):
+    """An end_time of 00:00 means midnight at the end of the day, as in availability._window"""
+    return start_time is not None and end_time is not None and end_time != time.min and end_time <= start_time
+
+class AvailabilityRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityRule
+        fields = ['id', 'weekday', 'start_time', 'end_time', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate(self, data):
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if ends_before_start(start_time, end_time):
+            raise serializers.ValidationError("end_time must be after start_time")
+        return data
+
+class AvailabilityExceptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityException
+        fields = ['id', 'date', 'start_time', 'end_time', 'is_available', 'reason', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate(self, data):
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if (start_time is None) != (end_time is None):
+            raise serializers.ValidationError("Set both start_time and end_time, or neither for the whole day")
+        if ends_before_start(start_time, end_time):
+            raise serializers.ValidationError("end_time must be after start_time")
+        return data
+
+class FreeSlotQuerySerializer(serializers.Serializer):
+    MAX_RANGE_DAYS = 92
+
+    start = serializers.DateField()
+    end = serializers.DateField()
+    slot_minutes = serializers.IntegerField(required=False, min_value=15, max_value=480)
+
+    def validate(self, data):
+        if data['end'] < data['start']:
+            raise serializers.ValidationError("end must not be before start")
+        if data['end'] - data['start'] > timedelta(days=self.MAX_RANGE_DAYS):
+            raise serializers.ValidationError(f"The range can span at most {self.MAX_RANGE_DAYS} days")
+        return data
+
+class MentorSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+
+
+class RecommendationQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=50)
@@ -1,3 +1,700 @@
-from django.test import TestCase
+import json
+import math
+from base64 import b64encode
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from bookings.models import Booking, BookingReservation
+from mentorship.pagination import paginated_response
+from mentorship.testing import QueryCountMixin
+
+from . import cache as response_cache
+from .availability import get_free_slots
+from .cache import cached_response, detail_key, invalidate_mentors, list_key
+from .filters import MentorProfileFilter
+from .models import AvailabilityException, AvailabilityRule, Expertise, MentorProfile, MentorSearchDocument
+from .recommendations import WEIGHTS, MentorFeatures, MentorRecommender, empty_profile
+from .search import B, K1, MentorSearchIndex, analyze, index_mentors
+from .serializers import MentorProfileSerializer
+from .views import MentorProfileViewSet
+
+
+def create_mentor(username):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+    user.profile.user_type = 'mentor'
+    user.profile.save()
+    return MentorProfile.objects.get(user=user)
+
+
+class PublicMentorProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.mentor = create_mentor('mentor')
+        MentorProfile.objects.filter(pk=self.mentor.pk).update(total_sessions=3, total_minutes=180, total_earnings=150)
+        self.client = APIClient()
+
+    def test_list_hides_minutes_and_earnings(self):
+        [mentor] = self.client.get('/api/mentors/').json()['results']
+
+        self.assertEqual(mentor['total_sessions'], 3)
+        self.assertNotIn('total_minutes', mentor)
+        self.assertNotIn('total_earnings', mentor)
+
+    def test_detail_hides_minutes_and_earnings(self):
+        mentor = self.client.get(f'/api/mentors/{self.mentor.pk}/').json()
+
+        self.assertEqual(mentor['id'], self.mentor.pk)
+        self.assertNotIn('total_minutes', mentor)
+        self.assertNotIn('total_earnings', mentor)
+
+
+class MentorCursorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            create_mentor(f'mentor{i}')
+        self.client = APIClient()
+
+    def get_page(self, values, ordering='-created_at'):
+        cursor = b64encode(json.dumps({'v': values, 'r': 0}).encode()).decode()
+        return self.client.get('/api/mentors/', {'page_size': 1, 'ordering': ordering, 'cursor': cursor})
+
+    def test_next_link_walks_every_mentor(self):
+        seen = []
+        url = '/api/mentors/?page_size=1&ordering=-rating'
+        while url:
+            page = self.client.get(url).json()
+            seen.extend(mentor['id'] for mentor in page['results'])
+            url = page['next']
+        self.assertEqual(sorted(seen), sorted(MentorProfile.objects.values_list('pk', flat=True)))
+
+    def test_every_ordering_field_walks_every_mentor(self):
+        MentorProfile.objects.filter(user__username='mentor1').update(rating=Decimal('4.00'), hourly_rate=Decimal('40.00'))
+        for field in MentorProfileViewSet.keyset_ordering_fields:
+            for ordering in (field, f'-{field}'):
+                with self.subTest(ordering=ordering):
+                    seen = []
+                    url = f'/api/mentors/?page_size=1&ordering={ordering}'
+                    while url:
+                        page = self.client.get(url).json()
+                        seen.extend(mentor['id'] for mentor in page['results'])
+                        url = page['next']
+                    self.assertCountEqual(seen, MentorProfile.objects.values_list('pk', flat=True))
+
+    def test_nullable_ordering_field_is_refused(self):
+        # A page ending on a NULL company would hand out a cursor nothing can seek past
+        request = Request(APIRequestFactory().get('/api/mentors/'))
+
+        with self.assertRaises(ImproperlyConfigured):
+            paginated_response(request, MentorProfile.objects.all(), MentorProfileSerializer, ('company', 'id'))
+
+    def test_tampered_cursor_is_not_found(self):
+        for values, ordering in (
+            (['not a date', 1], '-created_at'),
+            ([None, 1], '-created_at'),
+            ([{'x': 1}, 1], '-rating'),
+            (['1e9', 1], '-rating'),
+            (['2024-01-01T00:00:00+00:00', 'abc'], '-created_at'),
+            (['2024-01-01T00:00:00+00:00', [1]], '-created_at'),
+        ):
+            with self.subTest(values=values):
+                self.assertEqual(self.get_page(values, ordering).status_code, 404)
+
+    def test_malformed_cursor_is_not_found(self):
+        for cursor in ('!!!', b64encode(b'[1, 2]').decode(), b64encode(b'{"v": [1, 2]}').decode()):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get('/api/mentors/', {'cursor': cursor}).status_code, 404)
+
+
+class MentorFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.python, self.django, self.go = (Expertise.objects.create(name=name) for name in ('Python', 'Django', 'Go'))
+        self.junior = self.mentor('junior', 'junior', '30.00', '4.10', self.python, self.django)
+        self.senior = self.mentor('senior', 'senior', '80.00', '4.80', self.python)
+        self.mid = self.mentor('mid', 'mid', '120.00', '3.50', self.go)
+        self.expert = self.mentor('expert', 'expert', '60.00', '5.00')
+        self.client = APIClient()
+
+    def mentor(self, username, level, rate, rating, *expertise):
+        mentor = create_mentor(username)
+        MentorProfile.objects.filter(pk=mentor.pk).update(
+            experience_level=level, hourly_rate=Decimal(rate), rating=Decimal(rating),
+        )
+        mentor.expertise.set(expertise)
+        return mentor
+
+    def ids(self, **params):
+        response = self.client.get('/api/mentors/', params)
+        self.assertEqual(response.status_code, 200)
+        return [mentor['id'] for mentor in response.json()['results']]
+
+    def walk(self, **params):
+        seen = []
+        page = self.client.get('/api/mentors/', {'page_size': 1, **params}).json()
+        while True:
+            seen.extend(mentor['id'] for mentor in page['results'])
+            if not page['next']:
+                return seen
+            page = self.client.get(page['next']).json()
+
+    def test_expertise_matches_any_without_repeating_mentors(self):
+        ids = self.ids(expertise=f'{self.python.pk},{self.django.pk}')
+
+        self.assertEqual(sorted(ids), sorted([self.junior.pk, self.senior.pk]))
+
+    def test_expertise_is_an_exists_subquery(self):
+        queryset = MentorProfileFilter({'expertise': f'{self.python.pk},{self.go.pk}'}, queryset=MentorProfile.objects.all()).qs
+        sql = str(queryset.query).upper()
+
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertEqual(queryset.count(), 3)
+
+    def test_rate_bounds_are_inclusive(self):
+        self.assertEqual(sorted(self.ids(min_rate='60', max_rate='120')), sorted([self.senior.pk, self.mid.pk, self.expert.pk]))
+        self.assertEqual(self.ids(max_rate='30'), [self.junior.pk])
+
+    def test_experience_levels_and_rating(self):
+        self.assertEqual(sorted(self.ids(experience_level=['junior', 'expert'])), sorted([self.junior.pk, self.expert.pk]))
+        self.assertEqual(sorted(self.ids(min_rating='4.5')), sorted([self.senior.pk, self.expert.pk]))
+
+    def test_invalid_values_are_rejected(self):
+        for params in ({'expertise': 'python'}, {'min_rate': 'cheap'}, {'experience_level': 'guru'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/mentors/', params).status_code, 400)
+
+    def test_filters_combine_with_keyset_ordering(self):
+        params = {'expertise': f'{self.python.pk},{self.django.pk},{self.go.pk}', 'min_rate': '50'}
+
+        self.assertEqual(self.walk(ordering='-hourly_rate', **params), [self.mid.pk, self.senior.pk])
+        self.assertEqual(self.walk(ordering='hourly_rate', **params), [self.senior.pk, self.mid.pk])
+        self.assertEqual(self.walk(ordering='-rating', experience_level=['junior', 'senior', 'mid']), [
+            self.senior.pk, self.junior.pk, self.mid.pk,
+        ])
+
+    def test_previous_link_returns_to_the_filtered_first_page(self):
+        params = {'page_size': 1, 'ordering': 'hourly_rate', 'expertise': f'{self.python.pk},{self.go.pk}'}
+        first = self.client.get('/api/mentors/', params).json()
+        second = self.client.get(first['next']).json()
+
+        back = self.client.get(second['previous']).json()
+
+        self.assertEqual([mentor['id'] for mentor in back['results']], [self.junior.pk])
+        self.assertIsNone(back['previous'])
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.mentor = create_mentor('mentor')
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor.user)
+        self.day = timezone.localdate() + timedelta(days=7)
+
+    def test_rule_may_run_until_midnight(self):
+        response = self.client.post('/api/mentors/availability-rules/', {
+            'weekday': self.day.weekday(), 'start_time': '22:00', 'end_time': '00:00',
+        })
+        self.assertEqual(response.status_code, 201)
+
+        slots = self.client.get(f'/api/mentors/{self.mentor.pk}/free-slots/', {'start': self.day, 'end': self.day}).json()['slots']
+
+        midnight = timezone.make_aware(datetime.combine(self.day + timedelta(days=1), time.min))
+        self.assertEqual([datetime.fromisoformat(slot['end']) for slot in slots], [midnight])
+
+    def test_exception_may_run_until_midnight(self):
+        response = self.client.post('/api/mentors/availability-exceptions/', {
+            'date': self.day, 'start_time': '20:00', 'end_time': '00:00', 'is_available': True,
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_end_before_start_is_rejected(self):
+        response = self.client.post('/api/mentors/availability-rules/', {
+            'weekday': self.day.weekday(), 'start_time': '22:00', 'end_time': '21:00',
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class FreeSlotTests(TestCase):
+    def setUp(self):
+        self.mentor = create_mentor('mentor')
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        # A Monday well clear of the real clock; `now` is pinned to the Sunday before it
+        self.day = date(2030, 1, 7)
+        self.now = self.at(self.day - timedelta(days=1), 12)
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def hours(self, slots):
+        return [(timezone.localtime(start).strftime('%d %H:%M'), timezone.localtime(end).strftime('%d %H:%M')) for start, end in slots]
+
+    def rule(self, start, end, weekday=None):
+        AvailabilityRule.objects.create(
+            mentor=self.mentor, weekday=self.day.weekday() if weekday is None else weekday, start_time=start, end_time=end,
+        )
+
+    def book(self, start, minutes=60, status='confirmed'):
+        Booking.objects.create(
+            mentee=self.mentee, mentor=self.mentor, session_date=start.date(), session_time=start.time(),
+            duration_minutes=minutes, topic='Career advice', total_amount=Decimal('50.00'), status=status,
+        )
+
+    def reserve(self, start, minutes=60, expires_at=None):
+        BookingReservation.objects.create(
+            mentee=self.mentee, mentor=self.mentor, session_date=start.date(), session_time=start.time(),
+            duration_minutes=minutes, topic='Career advice', total_amount=Decimal('50.00'),
+            session_start_at=start, session_end_at=start + timedelta(minutes=minutes),
+            expires_at=expires_at or self.now + timedelta(minutes=15),
+        )
+
+    def free(self, start=None, end=None, **kwargs):
+        return self.hours(get_free_slots(self.mentor, start or self.day, end or self.day, now=self.now, **kwargs))
+
+    def test_rules_minus_exceptions_bookings_and_reservations(self):
+        self.rule(time(9), time(17))
+        AvailabilityException.objects.create(mentor=self.mentor, date=self.day, start_time=time(12), end_time=time(13))
+        self.book(self.at(self.day, 10))
+        self.book(self.at(self.day, 14), status='cancelled')
+        self.reserve(self.at(self.day, 15))
+        self.reserve(self.at(self.day, 16), expires_at=self.now - timedelta(minutes=1))
+
+        self.assertEqual(self.free(), [
+            ('07 09:00', '07 10:00'), ('07 11:00', '07 12:00'), ('07 13:00', '07 15:00'), ('07 16:00', '07 17:00'),
+        ])
+
+    def test_extra_windows_and_days_off(self):
+        self.rule(time(9), time(12))
+        AvailabilityException.objects.create(
+            mentor=self.mentor, date=self.day, start_time=time(11), end_time=time(14), is_available=True,
+        )
+        self.assertEqual(self.free(), [('07 09:00', '07 14:00')])
+
+        AvailabilityException.objects.create(mentor=self.mentor, date=self.day)
+        # A day off drops the weekly rule but keeps the explicitly added window
+        self.assertEqual(self.free(), [('07 11:00', '07 14:00')])
+
+    def test_window_ending_at_midnight(self):
+        self.rule(time(22), time(0))
+        self.book(self.at(self.day, 23, 30), minutes=30)
+
+        self.assertEqual(self.free(), [('07 22:00', '07 23:30')])
+        self.assertEqual(self.free(slot_minutes=60), [('07 22:00', '07 23:00')])
+
+    def test_booking_across_midnight_blocks_the_next_morning(self):
+        self.rule(time(22), time(0))
+        self.rule(time(0), time(2), weekday=(self.day + timedelta(days=1)).weekday())
+        self.book(self.at(self.day, 23), minutes=120)
+
+        self.assertEqual(self.free(end=self.day + timedelta(days=1)), [('07 22:00', '07 23:00'), ('08 01:00', '08 02:00')])
+
+    def test_slot_minutes_split_the_free_time(self):
+        self.rule(time(9), time(11))
+        self.book(self.at(self.day, 9, 30), minutes=30)
+
+        self.assertEqual(self.free(slot_minutes=30), [('07 09:00', '07 09:30'), ('07 10:00', '07 10:30'), ('07 10:30', '07 11:00')])
+        # Leftovers shorter than a slot are dropped
+        self.assertEqual(self.free(slot_minutes=45), [('07 10:00', '07 10:45')])
+
+    def test_multi_day_range_runs_a_fixed_number_of_queries(self):
+        self.rule(time(9), time(10))
+        self.rule(time(18), time(19), weekday=(self.day + timedelta(days=2)).weekday())
+        AvailabilityException.objects.create(mentor=self.mentor, date=self.day + timedelta(days=7))
+        self.book(self.at(self.day + timedelta(days=14), 9), minutes=30)
+
+        with self.assertNumQueries(4):
+            free = self.free(end=self.day + timedelta(days=20))
+
+        self.assertEqual(free, [
+            ('07 09:00', '07 10:00'), ('09 18:00', '09 19:00'),
+            ('16 18:00', '16 19:00'),
+            ('21 09:30', '21 10:00'), ('23 18:00', '23 19:00'),
+        ])
+
+    def test_past_time_is_not_free(self):
+        self.rule(time(9), time(17))
+        self.now = self.at(self.day, 12, 20)
+
+        self.assertEqual(self.free(), [('07 12:20', '07 17:00')])
+
+    def test_endpoint_returns_local_slots(self):
+        self.rule(time(9), time(11))
+        self.reserve(self.at(self.day, 10))
+        self.now = timezone.now()
+
+        response = APIClient().get(f'/api/mentors/{self.mentor.pk}/free-slots/', {
+            'start': self.day, 'end': self.day, 'slot_minutes': 30,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(datetime.fromisoformat(slot['start']), datetime.fromisoformat(slot['end'])) for slot in response.json()['slots']],
+            [(self.at(self.day, 9), self.at(self.day, 9, 30)), (self.at(self.day, 9, 30), self.at(self.day, 10))],
+        )
+
+    def test_endpoint_validates_the_range(self):
+        url = f'/api/mentors/{self.mentor.pk}/free-slots/'
+
+        self.assertEqual(APIClient().get(url, {'start': self.day, 'end': self.day - timedelta(days=1)}).status_code, 400)
+        self.assertEqual(APIClient().get(url, {'start': self.day, 'end': self.day + timedelta(days=93)}).status_code, 400)
+        self.assertEqual(APIClient().get(url, {'start': self.day, 'end': self.day, 'slot_minutes': 5}).status_code, 400)
+
+
+class MentorResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.mentor = create_mentor('mentor')
+        self.client = APIClient()
+        self.request = Request(APIRequestFactory().get('/api/mentors/'))
+        self.build = mock.Mock(return_value=Response({'built': True}))
+
+    def keys(self):
+        return list_key(self.request), detail_key(self.request, self.mentor.pk)
+
+    def test_detail_is_cached_until_the_profile_changes(self):
+        url = f'/api/mentors/{self.mentor.pk}/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'hit')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor.company = 'Acme'
+            self.mentor.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual(response.json()['company'], 'Acme')
+
+    def test_profile_edits_bump_the_detail_and_list_versions(self):
+        list_before, detail_before = self.keys()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mentor.save()
+
+        list_after, detail_after = self.keys()
+        self.assertNotEqual(list_after, list_before)
+        self.assertNotEqual(detail_after, detail_before)
+
+    def test_counter_changes_leave_list_pages_to_their_ttl(self):
+        from bookings.counters import contribution, record_changes
+        list_before, detail_before = self.keys()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_changes(added=[(self.mentor.pk, contribution('pending', Decimal('50.00'), 60))])
+
+        list_after, detail_after = self.keys()
+        self.assertEqual(list_after, list_before)
+        self.assertNotEqual(detail_after, detail_before)
+
+    def test_versions_are_bumped_only_once_the_write_commits(self):
+        before = self.keys()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            invalidate_mentors([self.mentor.pk])
+            self.assertEqual(self.keys(), before)
+
+        self.assertEqual(self.keys(), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(self.keys(), before)
+
+    def test_stale_entry_is_served_while_another_request_rebuilds_it(self):
+        key = list_key(self.request)
+        cache.set(key, ({'built': False}, response_cache.time.time() - 1), 60)
+        cache.add(f'{key}:lock', 1)
+
+        response = cached_response(key, self.build)
+
+        self.assertEqual((response['X-Cache'], response.data), ('stale', {'built': False}))
+        self.build.assert_not_called()
+
+    def test_stale_entry_is_rebuilt_by_the_request_taking_the_lock(self):
+        key = list_key(self.request)
+        cache.set(key, ({'built': False}, response_cache.time.time() - 1), 60)
+
+        response = cached_response(key, self.build)
+
+        self.assertEqual((response['X-Cache'], response.data), ('refresh', {'built': True}))
+        self.assertEqual(cached_response(key, self.build)['X-Cache'], 'hit')
+        self.build.assert_called_once()
+        self.assertIsNone(cache.get(f'{key}:lock'))
+
+    def test_miss_waits_for_the_request_holding_the_lock(self):
+        key = list_key(self.request)
+        cache.add(f'{key}:lock', 1)
+
+        def rebuilt_elsewhere(seconds):
+            cache.set(key, ({'built': 'elsewhere'}, response_cache.time.time() + 60), 60)
+
+        with mock.patch('mentors.cache.time.sleep', side_effect=rebuilt_elsewhere):
+            response = cached_response(key, self.build)
+
+        self.assertEqual((response['X-Cache'], response.data), ('hit', {'built': 'elsewhere'}))
+        self.build.assert_not_called()
+
+    def test_miss_builds_itself_when_the_rebuild_takes_too_long(self):
+        key = list_key(self.request)
+        cache.add(f'{key}:lock', 1)
+
+        with mock.patch.object(response_cache, 'WAIT_SECONDS', 0.1):
+            response = cached_response(key, self.build)
+
+        self.assertEqual((response['X-Cache'], response.data), ('miss', {'built': True}))
+        self.build.assert_called_once()
+
+
+@override_settings(SEARCH_INDEX_REFRESH_SECONDS=0)
+class MentorSearchTests(TestCase):
+    def setUp(self):
+        self.python = Expertise.objects.create(name='Python')
+        self.rust = Expertise.objects.create(name='Rust')
+        self.expert = self.mentor('expert', expertise=[self.python])
+        self.mention = self.mentor('mention', bio='I sometimes write python scripts')
+        self.rustacean = self.mentor('rustacean', expertise=[self.rust], company='Ferrous')
+        index_mentors(MentorProfile.objects.values_list('pk', flat=True))
+        self.index = MentorSearchIndex()
+        self.index.refresh(force=True)
+
+    def mentor(self, username, expertise=(), bio='', company=None):
+        mentor = create_mentor(username)
+        mentor.expertise.set(expertise)
+        if bio:
+            mentor.user.profile.bio = bio
+            mentor.user.profile.save()
+        if company:
+            mentor.company = company
+            mentor.save()
+        return mentor
+
+    def ranking(self, query):
+        return [mentor_id for mentor_id, _ in self.index.search(query)]
+
+    def test_fields_are_weighted(self):
+        self.assertEqual(analyze({'expertise': 'Python', 'company': 'Python', 'bio': 'the python'}), {'python': 6})
+
+    def test_expertise_outranks_a_mention_in_the_bio(self):
+        self.assertEqual(self.ranking('python'), [self.expert.pk, self.mention.pk])
+
+    def test_scores_follow_bm25(self):
+        documents = {row.mentor_id: row for row in MentorSearchDocument.objects.all()}
+        average_length = sum(row.length for row in documents.values()) / len(documents)
+        idf = math.log(1 + (len(documents) - 1 + 0.5) / (1 + 0.5))
+        row = documents[self.rustacean.pk]
+        frequency = row.terms['ferrous']
+        expected = idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * row.length / average_length))
+
+        [(mentor_id, score)] = self.index.search('ferrous')
+
+        self.assertEqual(mentor_id, self.rustacean.pk)
+        self.assertAlmostEqual(score, expected, places=5)
+
+    def test_rarer_terms_weigh_more(self):
+        self.mention.expertise.set([self.rust])
+        index_mentors([self.mention.pk])
+
+        # Both have one matching expertise, but only one mentor knows Ferrous
+        self.assertEqual(self.ranking('rust ferrous')[0], self.rustacean.pk)
+
+    def test_edits_reach_the_index_through_the_overlay(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expert.company = 'Ferrous'
+            self.expert.save()
+            self.rustacean.company = 'Oxide'
+            self.rustacean.save()
+
+        self.assertEqual(self.ranking('ferrous'), [self.expert.pk])
+        self.assertEqual(self.ranking('oxide'), [self.rustacean.pk])
+        self.assertIn(self.expert.pk, self.index._overlay)
+
+    def test_deleted_mentors_drop_out(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expert.user.delete()
+
+        self.assertEqual(self.ranking('python'), [self.mention.pk])
+
+    def test_rebuild_folds_the_overlay_into_the_base(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expert.company = 'Ferrous'
+            self.expert.save()
+        self.index.refresh()
+
+        self.index.refresh(force=True)
+
+        self.assertEqual(self.index._overlay, {})
+        self.assertEqual(self.ranking('ferrous'), [self.expert.pk, self.rustacean.pk])
+
+    def test_documents_are_rebuilt_after_the_save_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.expert.company = 'Ferrous'
+            self.expert.save()
+            self.assertNotIn('ferrous', MentorSearchDocument.objects.get(pk=self.expert.pk).terms)
+
+        for callback in callbacks:
+            callback()
+        self.assertIn('ferrous', MentorSearchDocument.objects.get(pk=self.expert.pk).terms)
+
+    def test_saves_of_unindexed_fields_skip_the_rebuild(self):
+        with mock.patch('mentors.search.index_mentors_on_commit') as reindex:
+            self.expert.hourly_rate = 80
+            self.expert.save(update_fields=['hourly_rate'])
+            reindex.assert_not_called()
+
+            self.expert.save(update_fields=['company'])
+            reindex.assert_called_once_with([self.expert.pk])
+
+
+class MentorFeaturesTests(SimpleTestCase):
+    """Scoring on hand-built features: (id, rating, hourly_rate, level, total_sessions, is_active)"""
+
+    def setUp(self):
+        self.features = MentorFeatures(
+            [
+                (1, 5.0, 50, 'senior', 0, True),
+                (2, 2.5, 200, 'junior', 0, True),
+                (3, 5.0, 50, 'senior', 0, False),
+            ],
+            [(1, 10), (2, 20), (3, 10)],
+        )
+
+    def test_without_history_mentors_rank_by_rating(self):
+        scores = self.features.score(empty_profile())
+
+        self.assertAlmostEqual(float(scores[0]), WEIGHTS['rating'])
+        self.assertAlmostEqual(float(scores[1]), WEIGHTS['rating'] / 2)
+        self.assertEqual(self.features.top(empty_profile(), 10), [(1, scores[0]), (2, scores[1])])
+
+    def test_liked_expertise_outweighs_rating(self):
+        profile = {**empty_profile(), 'expertise': {20: 1.0}}
+
+        scores = self.features.score(profile)
+
+        self.assertAlmostEqual(float(scores[1]), WEIGHTS['rating'] / 2 + WEIGHTS['expertise'])
+        self.assertEqual([mentor_id for mentor_id, _ in self.features.top(profile, 10)], [2, 1])
+
+    def test_price_and_level_closeness(self):
+        profile = {**empty_profile(), 'log_rate': math.log1p(200), 'level': 0}
+
+        scores = self.features.score(profile)
+
+        self.assertAlmostEqual(float(scores[1]), WEIGHTS['rating'] / 2 + WEIGHTS['price'] + WEIGHTS['level'], places=5)
+        self.assertAlmostEqual(
+            float(scores[0]),
+            WEIGHTS['rating'] + WEIGHTS['price'] * math.exp(-abs(math.log1p(50) - math.log1p(200))) + WEIGHTS['level'] / 3,
+            places=5,
+        )
+
+    def test_inactive_and_excluded_mentors_are_never_ranked(self):
+        profile = {**empty_profile(), 'exclude': {2}}
+
+        self.assertEqual([mentor_id for mentor_id, _ in self.features.top(profile, 10)], [1])
+
+    def test_updated_replaces_and_adds_without_touching_the_original(self):
+        updated = self.features.updated(
+            [(2, 5.0, 50, 'senior', 0, True), (4, 4.0, 80, 'mid', 10, True)],
+            [(2, 10), (4, 20)],
+        )
+
+        profile = {**empty_profile(), 'expertise': {20: 1.0}}
+        self.assertEqual([mentor_id for mentor_id, _ in updated.top(profile, 1)], [4])
+        self.assertEqual(len(updated), 4)
+        self.assertEqual(float(updated.rating[updated.row_of[2]]), 5.0)
+        # Mentor 2 lost expertise 20 in the copy only
+        self.assertEqual([mentor_id for mentor_id, _ in self.features.top(profile, 1)], [2])
+        self.assertEqual(len(self.features), 3)
+
+
+@override_settings(RECOMMENDATION_REFRESH_SECONDS=0)
+class MentorRecommenderTests(TestCase):
+    def setUp(self):
+        from bookings.models import Booking
+
+        self.python, self.rust = Expertise.objects.create(name='Python'), Expertise.objects.create(name='Rust')
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.past = create_mentor('past')
+        self.pythonista = create_mentor('pythonista')
+        self.rustacean = create_mentor('rustacean')
+        self.past.expertise.set([self.python])
+        self.pythonista.expertise.set([self.python])
+        self.rustacean.expertise.set([self.rust])
+        start = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=7), time(10)))
+        Booking.objects.create(
+            mentee=self.mentee, mentor=self.past, session_date=start.date(), session_time=start.time(),
+            topic='Career advice', total_amount=Decimal('50.00'), status='completed',
+        )
+        self.recommender = MentorRecommender()
+        # Topic matches come from the process-wide search index, which other tests fill
+        search = mock.patch('mentors.search.search_mentors', return_value=[])
+        search.start()
+        self.addCleanup(search.stop)
+
+    def recommended(self):
+        return [mentor_id for mentor_id, _ in self.recommender.recommend(self.mentee)]
+
+    def test_mentors_sharing_past_expertise_come_first(self):
+        self.assertEqual(self.recommended(), [self.past.pk, self.pythonista.pk, self.rustacean.pk])
+
+    def test_badly_reviewed_mentors_are_excluded(self):
+        from reviews.models import Review
+
+        Review.objects.create(mentee=self.mentee, mentor=self.past, booking=self.past.bookings.get(), rating=1, comment='No')
+
+        self.assertNotIn(self.past.pk, self.recommended())
+
+    def test_mentor_changed_after_loading_is_picked_up(self):
+        self.recommender.refresh(force=True)
+
+        self.rustacean.expertise.set([self.python])
+        MentorProfile.objects.filter(pk=self.rustacean.pk).update(rating=5, updated_at=timezone.now())
+        MentorProfile.objects.filter(pk=self.pythonista.pk).update(is_active=False, updated_at=timezone.now())
+
+        self.assertEqual(self.recommended(), [self.rustacean.pk, self.past.pk])
+        self.assertEqual(len(self.recommender.features), 3)
+
+    def test_new_mentor_is_added_by_the_incremental_refresh(self):
+        self.recommender.refresh(force=True)
+        loaded = self.recommender.features
+
+        newcomer = create_mentor('newcomer')
+        newcomer.expertise.set([self.python])
+        self.recommender.refresh()
+
+        self.assertIsNot(self.recommender.features, loaded)
+        self.assertIn(newcomer.pk, self.recommended())
+        self.assertEqual(len(loaded), 3)
+
+
+class MentorQueryCountTests(QueryCountMixin, TestCase):
+    """Signed in, so responses come from the database rather than the anonymous response cache"""
+
+    def setUp(self):
+        self.expertise = [Expertise.objects.create(name=name) for name in ('Python', 'Career')]
+        self.viewer = User.objects.create_user('viewer', 'viewer@example.com', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def seed_mentors(self, n):
+        while MentorProfile.objects.count() < n:
+            create_mentor(f'mentor{MentorProfile.objects.count()}').expertise.set(self.expertise)
+
+    def test_list(self):
+        self.assertConstantQueries(self.seed_mentors, lambda: self.client.get('/api/mentors/'))
+
+    def test_sorted_list(self):
+        self.assertConstantQueries(self.seed_mentors, lambda: self.client.get('/api/mentors/?ordering=-rating_score'))
+
+    def test_detail(self):
+        mentor = create_mentor('mentor')
+
+        def seed_expertise(n):
+            mentor.expertise.set([Expertise.objects.get_or_create(name=f'Topic {i}')[0] for i in range(n)])
+
+        self.assertConstantQueries(seed_expertise, lambda: self.client.get(f'/api/mentors/{mentor.pk}/'))
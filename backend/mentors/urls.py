@@ -1,8 +1,10 @@
 from rest_framework.routers import DefaultRouter
-from .views import MentorProfileViewSet, ExpertiseViewSet
+from .views import MentorProfileViewSet, ExpertiseViewSet, AvailabilityRuleViewSet, AvailabilityExceptionViewSet
 
 router = DefaultRouter()
 router.register(r'expertise', ExpertiseViewSet, basename='expertise')
+router.register(r'availability-rules', AvailabilityRuleViewSet, basename='availability-rule')
+router.register(r'availability-exceptions', AvailabilityExceptionViewSet, basename='availability-exception')
 router.register(r'', MentorProfileViewSet, basename='mentorprofile')
 
 urlpatterns = router.urls 
\ No newline at end of file
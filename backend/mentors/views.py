@@ -1,8 +1,23 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
+from django.utils import timezone
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
-from .models import MentorProfile, Expertise
-from .serializers import MentorProfileSerializer, ExpertiseSerializer
+from .models import MentorProfile, Expertise, AvailabilityRule, AvailabilityException
+from .serializers import (
+    MentorProfileSerializer, ExpertiseSerializer, AvailabilityRuleSerializer,
+    AvailabilityExceptionSerializer, FreeSlotQuerySerializer, MentorSearchQuerySerializer,
+    RecommendationQuerySerializer,
+)
+from .availability import get_free_slots
+from .cache import cached_response, detail_key, list_key
+from .filters import MentorProfileFilter
+from .recommendations import recommend_mentors
+from .search import search_mentors
+from mentorship.pagination import KeysetPagination, paginated_response
+from reviews.models import Review
+from reviews.serializers import PublicReviewSerializer
 
 # Create your views here.
 
@@ -10,23 +25,106 @@ class MentorProfileViewSet(viewsets.ModelViewSet):
     queryset = MentorProfile.objects.all()
     serializer_class = MentorProfileSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+    # Each has an (field, id) index so a sorted page is a short index range scan
+    keyset_ordering_fields = ('created_at', 'rating', 'rating_score', 'hourly_rate', 'total_sessions')
+    filterset_class = MentorProfileFilter
 
     def get_queryset(self):
-        # Show all mentors for debugging
-        queryset = MentorProfile.objects.all()
-        print(f"Total mentors in database: {queryset.count()}")
-        for mentor in queryset:
-            print(f"Mentor: {mentor.user.username}, Active: {mentor.is_active}, Verified: {mentor.is_verified}")
-        return queryset
+        return MentorProfile.objects.select_related('user__profile').prefetch_related('expertise')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        print(f"Returning {len(serializer.data)} mentors")
-        return Response(serializer.data)
+        # Anonymous visitors all see the same pages, so those are served from the cache
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        return cached_response(list_key(request), lambda: super(MentorProfileViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            detail_key(request, kwargs['pk']),
+            lambda: super(MentorProfileViewSet, self).retrieve(request, *args, **kwargs),
+        )
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Active mentors ranked by relevance to ?q=, best first"""
+        query = MentorSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        hits = search_mentors(query.validated_data['q'], query.validated_data['limit'])
+        return Response({'query': query.validated_data['q'], 'results': self.ranked_results(hits)})
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def recommended(self, request):
+        """Mentors the current user is likely to book next, based on their bookings and reviews"""
+        query = RecommendationQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        hits = recommend_mentors(request.user, query.validated_data['limit'])
+        return Response({'results': self.ranked_results(hits)})
+
+    def ranked_results(self, hits):
+        """Serialize [(mentor_id, score)] in order, with the score added"""
+        mentors = self.get_queryset().in_bulk([mentor_id for mentor_id, _ in hits])
+        ranked = [(mentors[mentor_id], score) for mentor_id, score in hits if mentor_id in mentors]
+        serializer = self.get_serializer([mentor for mentor, _ in ranked], many=True)
+        return [{**data, 'score': round(score, 4)} for data, (_, score) in zip(serializer.data, ranked)]
+
+    @action(detail=True, methods=['get'])
+    def reviews(self, request, pk=None):
+        """A mentor's public reviews, newest first"""
+        mentor = get_object_or_404(MentorProfile.objects.only('id'), pk=pk)
+        # Served by the (mentor, is_public, created_at, id) index
+        reviews = Review.objects.filter(mentor=mentor, is_public=True).select_related('mentee')
+        return paginated_response(request, reviews, PublicReviewSerializer, ('-created_at', '-id'))
+
+    @action(detail=True, methods=['get'], url_path='free-slots')
+    def free_slots(self, request, pk=None):
+        """Free time for a mentor between ?start= and ?end= (YYYY-MM-DD, inclusive)"""
+        query = FreeSlotQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        mentor = get_object_or_404(MentorProfile.objects.only('id'), pk=pk)
+        slots = get_free_slots(
+            mentor,
+            query.validated_data['start'],
+            query.validated_data['end'],
+            slot_minutes=query.validated_data.get('slot_minutes'),
+        )
+        return Response({
+            'mentor': mentor.id,
+            'slots': [
+                {'start': timezone.localtime(start), 'end': timezone.localtime(end)}
+                for start, end in slots
+            ],
+        })
+
+class MentorAvailabilityMixin:
+    """Scope availability objects to the requesting mentor"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_mentor_profile(self):
+        try:
+            return self.request.user.mentor_profile
+        except MentorProfile.DoesNotExist:
+            raise PermissionDenied("Only mentors can manage availability")
+
+    def get_queryset(self):
+        return self.queryset.filter(mentor__user=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(mentor=self.get_mentor_profile())
+
+class AvailabilityRuleViewSet(MentorAvailabilityMixin, viewsets.ModelViewSet):
+    queryset = AvailabilityRule.objects.all()
+    serializer_class = AvailabilityRuleSerializer
+
+class AvailabilityExceptionViewSet(MentorAvailabilityMixin, viewsets.ModelViewSet):
+    queryset = AvailabilityException.objects.all()
+    serializer_class = AvailabilityExceptionSerializer
 
 class ExpertiseViewSet(viewsets.ModelViewSet):
     queryset = Expertise.objects.all()
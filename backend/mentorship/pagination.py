@@ -0,0 +1,188 @@
+import datetime
+import decimal
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorValueEncoder(json.JSONEncoder):
+    """Like DjangoJSONEncoder but keeps full microsecond precision for exact seeks"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on every ordering field, not just the first.
+
+    The cursor holds the ordering values of the last (or first) row on the page,
+    so each page is a single indexed range read of page_size + 1 rows. There is
+    no COUNT(*) and no OFFSET, whatever the size of the table. `id` is always
+    appended as the final tie-breaker so the order is total and deterministic.
+
+    Views set `keyset_ordering` to choose the order; it should match an index.
+    Views may also list `keyset_ordering_fields`; clients then pick one with
+    ?ordering=field or ?ordering=-field. Every ordering field must be NOT NULL:
+    SQL comparisons never match NULL, so a page ending on one could not be sought past.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view):
+        requested = request.query_params.get(self.ordering_query_param)
+        allowed = getattr(view, 'keyset_ordering_fields', ())
+        if requested and requested.lstrip('-') in allowed:
+            ordering = [requested]
+        else:
+            ordering = list(getattr(view, 'keyset_ordering', None) or self.ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            # Mirror the direction of the last field so the index can be scanned one way
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        for field in ordering:
+            name = field.lstrip('-')
+            if name != 'pk' and queryset.model._meta.get_field(name).null:
+                raise ImproperlyConfigured(f"Keyset ordering field {queryset.model.__name__}.{name} must not be nullable")
+        return ordering
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(request)
+        if cursor:
+            cursor['v'] = self._cursor_values(queryset.model, cursor['v'])
+        self.reverse = bool(cursor and cursor['r'])
+
+        ordering = [self._invert(field) for field in self.ordering] if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._seek_filter(ordering, cursor['v']))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        # Walking backwards there is always a next page (the one we came from)
+        self.has_next = True if self.reverse else has_more
+        self.has_previous = has_more if self.reverse else cursor is not None
+        self.first_values = self._row_values(rows[0]) if rows else None
+        self.last_values = self._row_values(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not (self.has_next and self.last_values):
+            return None
+        return self.encode_cursor(self.last_values, reverse=False)
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.first_values):
+            return None
+        return self.encode_cursor(self.first_values, reverse=True)
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': int(reverse)}, cls=CursorValueEncoder, separators=(',', ':'))
+        encoded = b64encode(payload.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if not isinstance(cursor['v'], list) or len(cursor['v']) != len(self.ordering):
+                raise ValueError
+            cursor['r'] = bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, UnicodeError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def _cursor_values(self, model, values):
+        """Check the cursor values against the ordering fields so a tampered cursor is a 404, not a 500"""
+        converted = []
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            model_field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                converted.append(model_field.clean(value, None))
+            except (ValidationError, TypeError, ValueError, decimal.InvalidOperation):
+                raise NotFound(self.invalid_cursor_message)
+        return converted
+
+    def _row_values(self, row):
+        return [getattr(row, field.lstrip('-')) for field in self.ordering]
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _seek_filter(ordering, values):
+        """(a, b, c) after (x, y, z) == a>x OR (a=x AND b>y) OR (a=x AND b=y AND c>z)"""
+        clauses = []
+        for position, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal_prefix = {ordering[i].lstrip('-'): values[i] for i in range(position)}
+            clauses.append(Q(**equal_prefix, **{f'{name}__{lookup}': values[position]}))
+        return reduce(or_, clauses)
+
+
+def paginated_response(request, queryset, serializer_class, ordering):
+    """Keyset-paginate a queryset from a function-based view"""
+    paginator = KeysetPagination()
+    paginator.ordering = tuple(ordering)
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
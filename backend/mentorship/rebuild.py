@@ -0,0 +1,72 @@
+"""
+Recomputing counters that are kept current with F() increments.
+
+rebuild_rows walks the counter rows a batch at a time, in primary key order.
+Each batch runs in its own transaction and locks its rows before it reads the
+source tables. A concurrent change then either committed before the lock, so
+the aggregates include it, or its increment waits for the batch to commit and
+lands on the rebuilt value. Either way it is counted exactly once. The lock is
+the first statement of the transaction, so on MySQL the aggregates are read
+from a snapshot taken after it. RebuildCommand is the rebuild_* management
+commands' shared front end.
+"""
+import operator
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def rebuild_rows(rows, fields, expected, fix, dry_run=False, same=operator.eq, batch_size=REBUILD_BATCH_SIZE):
+    """
+    Compare `fields` of every row in the `rows` queryset with the recomputed
+    values and fix those that differ. expected(pks) returns {pk: values} for a
+    batch, values being a tuple in `fields` order; fix([(pk, stored, expected)])
+    writes a batch's drifted rows. With dry_run nothing is locked or written.
+    Returns every (pk, stored, expected) that differed.
+    """
+    drifted = []
+    last_pk = None
+    while True:
+        with transaction.atomic():
+            batch = rows.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            if not dry_run:
+                batch = batch.select_for_update()
+            stored_rows = list(batch.values_list('pk', *fields)[:batch_size])
+            if not stored_rows:
+                break
+            want = expected([pk for pk, *_ in stored_rows])
+            found = [(pk, tuple(stored), want[pk]) for pk, *stored in stored_rows if not same(tuple(stored), want[pk])]
+            if found and not dry_run:
+                fix(found)
+        drifted.extend(found)
+        if len(stored_rows) < batch_size:
+            break
+        last_pk = stored_rows[-1][0]
+    return drifted
+
+
+class RebuildCommand(BaseCommand):
+    """A management command that runs rebuild(dry_run) and lists what drifted; --verify only reports"""
+    noun = 'rows'
+
+    def rebuild(self, dry_run):
+        raise NotImplementedError
+
+    def describe(self, key):
+        return str(key)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help=f'Only report {self.noun} that are wrong')
+
+    def handle(self, *args, **options):
+        drifted = self.rebuild(dry_run=options['verify'])
+        for key, stored, expected in drifted[:20]:
+            self.stdout.write(f"{self.describe(key)}: stored {stored}, expected {expected}")
+        if len(drifted) > 20:
+            self.stdout.write(f"... and {len(drifted) - 20} more")
+        verb = 'need fixing' if options['verify'] else 'fixed'
+        self.stdout.write(f"{len(drifted)} {self.noun} {verb}")
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 import os
 from decouple import config, Csv
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
     'bookings',
     'payments',
     'reviews',
+    'analytics',
 ]
 
 MIDDLEWARE = [
@@ -145,11 +147,13 @@ CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS',
 # Additional CORS settings for development
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Only allow all origins in debug mode
+# Clients send Idempotency-Key on payment POSTs so retries are safe
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -160,9 +164,10 @@ REST_FRAMEWORK = {
 }
 
 # Custom Authentication Backend
+# EmailOrUsernameModelBackend also accepts plain usernames; a second backend
+# would only repeat the lookup and the password hash after a failed login
 AUTHENTICATION_BACKENDS = [
     'users.backends.EmailOrUsernameModelBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
 # Media files (profile pictures, uploads)
@@ -177,9 +182,83 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='1526320732a37c')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='12f0ce01e370d1')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@mentorconnect.com')
 
+# Email outbox (drained by `python manage.py deliver_outbox`)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=100, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+EMAIL_OUTBOX_RETRY_BASE_DELAY = config('EMAIL_OUTBOX_RETRY_BASE_DELAY', default=30, cast=int)  # seconds
+EMAIL_OUTBOX_MAX_RETRY_DELAY = config('EMAIL_OUTBOX_MAX_RETRY_DELAY', default=3600, cast=int)  # seconds
+# Users with notification_frequency='digest' get one combined email per window
+EMAIL_DIGEST_WINDOW_MINUTES = config('EMAIL_DIGEST_WINDOW_MINUTES', default=60, cast=int)
+
 # Test Payment Configuration
 PAYMENT_TEST_MODE = True
 
 # Stripe API Key
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", default="sk_test_your_test_key_here")
 print("Loaded STRIPE_SECRET_KEY:", STRIPE_SECRET_KEY)
+
+# Signing secret of the Stripe webhook endpoint (whsec_...). There is no
+# usable default: the webhook refuses every event while it is unset.
+STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET", default=None)
+
+# How long a booking draft holds the mentor's slot while the mentee pays
+BOOKING_RESERVATION_TTL_MINUTES = config('BOOKING_RESERVATION_TTL_MINUTES', default=30, cast=int)
+
+# Stripe HTTP client (see payments/gateway.py). STRIPE_API_BASE points the
+# client elsewhere, e.g. at `manage.py run_fake_stripe` for offline load tests.
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='')
+STRIPE_CONNECT_TIMEOUT = config('STRIPE_CONNECT_TIMEOUT', default=3.0, cast=float)
+STRIPE_READ_TIMEOUT = config('STRIPE_READ_TIMEOUT', default=10.0, cast=float)
+STRIPE_MAX_NETWORK_RETRIES = config('STRIPE_MAX_NETWORK_RETRIES', default=2, cast=int)
+STRIPE_CIRCUIT_FAILURE_THRESHOLD = config('STRIPE_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+STRIPE_CIRCUIT_RESET_SECONDS = config('STRIPE_CIRCUIT_RESET_SECONDS', default=30, cast=int)
+
+# How long a response stored under an Idempotency-Key header can be replayed
+IDEMPOTENCY_KEY_TTL_HOURS = config('IDEMPOTENCY_KEY_TTL_HOURS', default=24, cast=int)
+# How long a key stays claimed by a request that has not answered yet
+IDEMPOTENCY_IN_PROGRESS_LEASE_SECONDS = config('IDEMPOTENCY_IN_PROGRESS_LEASE_SECONDS', default=120, cast=int)
+
+# How often each process checks for changed mentor search documents
+SEARCH_INDEX_REFRESH_SECONDS = config('SEARCH_INDEX_REFRESH_SECONDS', default=2, cast=float)
+
+# How often each process checks for changed mentors in its recommendation features
+RECOMMENDATION_REFRESH_SECONDS = config('RECOMMENDATION_REFRESH_SECONDS', default=5, cast=float)
+
+# Cache. The default is per process; point it at a shared backend (Redis,
+# Memcached) in production so every worker sees the same mentor page and
+# authenticated user invalidations instead of waiting out their TTLs.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Anonymous mentor list/detail responses are fresh for MENTOR_CACHE_TTL seconds,
+# then served stale for up to MENTOR_CACHE_STALE_SECONDS while one request rebuilds them
+MENTOR_CACHE_TTL = config('MENTOR_CACHE_TTL', default=60, cast=int)
+MENTOR_CACHE_STALE_SECONDS = config('MENTOR_CACHE_STALE_SECONDS', default=300, cast=int)
+
+# Mentor rating_score is a Bayesian average: reviews are blended with
+# RATING_PRIOR_WEIGHT imaginary reviews of RATING_PRIOR_MEAN stars
+RATING_PRIOR_MEAN = config('RATING_PRIOR_MEAN', default=4.0, cast=float)
+RATING_PRIOR_WEIGHT = config('RATING_PRIOR_WEIGHT', default=5, cast=int)
+
+# Serve mentee dashboard stats from per-user UserStats rows that booking
+# signals keep current, instead of aggregating bookings on every poll.
+# Run rebuild_user_stats after turning it on.
+USER_STATS_MATERIALIZED = config('USER_STATS_MATERIALIZED', default=False, cast=bool)
+
+# Longest date range one analytics time-series request may cover
+ANALYTICS_MAX_RANGE_DAYS = config('ANALYTICS_MAX_RANGE_DAYS', default=731, cast=int)
+
+# Access tokens carry user_type and mentor_profile_id claims, re-read on refresh
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'users.tokens.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.tokens.RoleTokenRefreshSerializer',
+    'TOKEN_USER_CLASS': 'users.authentication.RoleTokenUser',
+}
+
+# The id, flags and role of authenticated users (never the password hash) are kept
+# in the cache above for AUTH_USER_CACHE_TTL seconds; saves and deletes invalidate them on commit
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
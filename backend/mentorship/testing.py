@@ -0,0 +1,21 @@
+"""Helpers shared by the apps' test suites."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """For TestCase: check that an endpoint's query count does not grow with the number of rows"""
+
+    def assertConstantQueries(self, seed, request, sizes=(3, 15)):
+        """seed(n) brings the data to n rows, request() returns a response; each size must cost the same queries"""
+        counts = []
+        # Warm up first, so per-process work such as loading the requesting user's profile is not counted
+        request()
+        for size in sizes:
+            seed(size)
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            self.assertEqual(response.status_code, 200, response.content)
+            counts.append(len(queries))
+        self.assertEqual(len(set(counts)), 1, f"Query counts {counts} for {list(sizes)} rows")
+        return counts[0]
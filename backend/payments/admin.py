@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment
+from .models import Payment, StripeEvent, IdempotencyRecord
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
@@ -7,4 +7,19 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ['status', 'currency', 'created_at']
     search_fields = ['payment_intent_id', 'user__username', 'user__email']
     readonly_fields = ['created_at', 'updated_at']
-    ordering = ['-created_at'] 
\ No newline at end of file
+    ordering = ['-created_at'] 
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'type', 'status', 'created_at', 'processed_at']
+    list_filter = ['status', 'type']
+    search_fields = ['event_id']
+    readonly_fields = ['event_id', 'type', 'payload', 'created_at', 'processed_at']
+    ordering = ['-created_at']
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    list_display = ['user', 'key', 'status', 'response_status', 'created_at', 'expires_at']
+    search_fields = ['key', 'user__username']
+    ordering = ['-created_at']
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+MESSAGE = 'STRIPE_WEBHOOK_SECRET is not set, so the Stripe webhook rejects every event.'
+HINT = 'Set it to the signing secret (whsec_...) of the webhook endpoint.'
+
+
+@register()
+def check_stripe_webhook_secret(app_configs, **kwargs):
+    if settings.STRIPE_WEBHOOK_SECRET:
+        return []
+    return [Warning(MESSAGE, hint=HINT, id='payments.W001')]
+
+
+@register(Tags.security, deploy=True)
+def check_stripe_webhook_secret_deployed(app_configs, **kwargs):
+    """`manage.py check --deploy` fails outright: production cannot take payments without it"""
+    if settings.STRIPE_WEBHOOK_SECRET:
+        return []
+    return [Error(MESSAGE, hint=HINT, id='payments.E001')]
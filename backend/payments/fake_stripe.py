@@ -0,0 +1,254 @@
+"""
+A small in-process stand-in for the parts of the Stripe API this project uses.
+
+Point STRIPE_API_BASE at it to run the whole payment flow offline, e.g. for load
+tests: PaymentIntents can be created, fetched, listed, confirmed, cancelled and
+refunded, POSTs honour Idempotency-Key, and confirming an intent can deliver a signed
+payment_intent.succeeded webhook. Latency and failures can be injected to
+exercise timeouts and the circuit breaker.
+"""
+import hashlib
+import hmac
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from urllib.request import Request, urlopen
+
+INTENT_PATH = re.compile(r'^/v1/payment_intents/(?P<id>[^/]+)(?:/(?P<verb>confirm|cancel))?$')
+
+
+def _decode_form(body):
+    """Stripe's form encoding, one level deep: metadata[key]=value -> {'metadata': {'key': value}}"""
+    params = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        match = re.match(r'^(\w+)\[(\w+)\]$', key)
+        if match:
+            params.setdefault(match.group(1), {})[match.group(2)] = value
+        else:
+            params[key] = value
+    return params
+
+
+def sign_webhook(payload, secret, timestamp=None):
+    """Stripe-Signature header value for `payload` (str)"""
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode('utf-8'), f"{timestamp}.{payload}".encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class FakeStripeServer:
+    """Threaded HTTP server holding PaymentIntents in memory"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, webhook_url=None, webhook_secret=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.intents = {}
+        self.order = []
+        self.refunds = {}
+        self.idempotent_responses = {}
+        # Every request that reached the server, retries included
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve from a background thread; returns self"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # -- API operations, each returning (status, body) --
+
+    def create_intent(self, params):
+        try:
+            amount = int(params['amount'])
+        except (KeyError, ValueError):
+            return 400, _error('invalid_request_error', 'Missing required param: amount.', 'amount')
+        intent_id = f"pi_fake_{uuid.uuid4().hex[:24]}"
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': amount,
+            'amount_received': 0,
+            'currency': params.get('currency', 'usd'),
+            'metadata': params.get('metadata', {}),
+            'status': 'requires_payment_method',
+            'client_secret': f"{intent_id}_secret_{uuid.uuid4().hex[:24]}",
+            'created': int(time.time()),
+            'livemode': False,
+        }
+        with self.lock:
+            self.intents[intent_id] = intent
+            self.order.append(intent_id)
+        return 200, intent
+
+    def get_intent(self, intent_id):
+        intent = self.intents.get(intent_id)
+        if intent is None:
+            return 404, _error('invalid_request_error', f"No such payment_intent: '{intent_id}'", 'id', 'resource_missing')
+        return 200, intent
+
+    def set_status(self, intent_id, new_status):
+        with self.lock:
+            intent = self.intents.get(intent_id)
+            if intent is None:
+                return self.get_intent(intent_id)
+            intent['status'] = new_status
+            if new_status == 'succeeded':
+                intent['amount_received'] = intent['amount']
+        if new_status == 'succeeded' and self.webhook_url:
+            threading.Thread(target=self.send_webhook, args=('payment_intent.succeeded', dict(intent)), daemon=True).start()
+        return 200, intent
+
+    def create_refund(self, params):
+        intent_id = params.get('payment_intent')
+        with self.lock:
+            intent = self.intents.get(intent_id)
+            if intent is None:
+                return self.get_intent(intent_id)
+            if intent['status'] != 'succeeded':
+                return 400, _error('invalid_request_error', f"PaymentIntent {intent_id} has not been paid.", 'payment_intent')
+            refund = {
+                'id': f"re_fake_{uuid.uuid4().hex[:24]}",
+                'object': 'refund',
+                'amount': intent['amount_received'],
+                'currency': intent['currency'],
+                'payment_intent': intent_id,
+                'status': 'succeeded',
+                'created': int(time.time()),
+            }
+            self.refunds[refund['id']] = refund
+        return 200, refund
+
+    def list_intents(self, params):
+        limit = max(1, min(int(params.get('limit', 10)), 100))
+        created = params.get('created', {})
+        with self.lock:
+            ids = list(reversed(self.order))
+        if params.get('starting_after') in self.intents:
+            ids = ids[ids.index(params['starting_after']) + 1:]
+        matching = []
+        for intent_id in ids:
+            intent = self.intents[intent_id]
+            if 'gte' in created and intent['created'] < int(created['gte']):
+                continue
+            if 'lt' in created and intent['created'] >= int(created['lt']):
+                continue
+            matching.append(intent)
+            if len(matching) > limit:
+                break
+        return 200, {
+            'object': 'list',
+            'url': '/v1/payment_intents',
+            'has_more': len(matching) > limit,
+            'data': matching[:limit],
+        }
+
+    def send_webhook(self, event_type, data_object):
+        payload = json.dumps({
+            'id': f"evt_fake_{uuid.uuid4().hex[:24]}",
+            'object': 'event',
+            'type': event_type,
+            'created': int(time.time()),
+            'data': {'object': data_object},
+        })
+        request = Request(self.webhook_url, data=payload.encode('utf-8'), method='POST', headers={
+            'Content-Type': 'application/json',
+            'Stripe-Signature': sign_webhook(payload, self.webhook_secret),
+        })
+        try:
+            urlopen(request, timeout=10).close()
+        except OSError as e:
+            print(f"Fake Stripe webhook delivery failed: {str(e)}")
+
+
+def _error(error_type, message, param=None, code=None):
+    return {'error': {'type': error_type, 'message': message, 'param': param, 'code': code}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive like they would with Stripe
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        fake = self.server.fake
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        params = _decode_form(body if method == 'POST' else url.query)
+        with fake.lock:
+            fake.request_count += 1
+
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fake.failure_rate and random.random() < fake.failure_rate:
+            return self._respond(500, _error('api_error', 'Injected failure'))
+
+        idempotency_key = self.headers.get('Idempotency-Key') if method == 'POST' else None
+        if idempotency_key:
+            with fake.lock:
+                replay = fake.idempotent_responses.get(idempotency_key)
+            if replay:
+                return self._respond(*replay)
+
+        match = INTENT_PATH.match(url.path)
+        if url.path == '/v1/payment_intents':
+            response = fake.create_intent(params) if method == 'POST' else fake.list_intents(params)
+        elif match and method == 'GET' and not match.group('verb'):
+            response = fake.get_intent(match.group('id'))
+        elif url.path == '/v1/refunds' and method == 'POST':
+            response = fake.create_refund(params)
+        elif match and method == 'POST' and match.group('verb'):
+            new_status = 'succeeded' if match.group('verb') == 'confirm' else 'canceled'
+            response = fake.set_status(match.group('id'), new_status)
+        else:
+            response = (404, _error('invalid_request_error', f"Unrecognized request URL ({method}: {url.path})"))
+
+        if idempotency_key:
+            with fake.lock:
+                fake.idempotent_responses[idempotency_key] = response
+        self._respond(*response)
+
+    def _respond(self, status_code, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Request-Id', f"req_fake_{uuid.uuid4().hex[:14]}")
+        try:
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out and hung up, like it would on a slow Stripe
+            self.close_connection = True
@@ -0,0 +1,154 @@
+"""
+Every call the backend makes to Stripe goes through this module.
+
+One StripeClient per process keeps a keep-alive session per thread and uses
+explicit connect/read timeouts. Stripe's retry loop (backoff with jitter) only
+retries GETs and POSTs carrying an idempotency key, which the library adds to
+every POST. A circuit breaker fails fast once Stripe looks down.
+"""
+import threading
+import time
+
+import stripe
+from django.conf import settings
+
+
+class PaymentGatewayUnavailable(Exception):
+    """Stripe is unreachable or the circuit breaker is open; try again later"""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures. While open,
+    calls fail immediately. After `reset_timeout` seconds one trial call is let
+    through (half-open); success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                raise PaymentGatewayUnavailable('Payment provider is unavailable, please try again shortly')
+            # Let this one call through and keep everyone else out for another period
+            self._opened_at = now
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+# Errors that say Stripe itself is unhealthy. Card declines, bad requests and
+# the like are the caller's problem and must not trip the breaker.
+OUTAGE_ERRORS = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+_client = None
+_client_lock = threading.Lock()
+breaker = CircuitBreaker(
+    failure_threshold=settings.STRIPE_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.STRIPE_CIRCUIT_RESET_SECONDS,
+)
+
+
+def get_client():
+    """The shared StripeClient, built on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                base_addresses = {'api': settings.STRIPE_API_BASE} if settings.STRIPE_API_BASE else {}
+                _client = stripe.StripeClient(
+                    settings.STRIPE_SECRET_KEY,
+                    base_addresses=base_addresses,
+                    max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+                    # requests takes a (connect, read) tuple; sessions are kept per thread
+                    http_client=stripe.RequestsClient(
+                        timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT)
+                    ),
+                )
+    return _client
+
+
+def reset_client():
+    """Drop the shared client, e.g. after changing settings in a script"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def _call(method, *args, **kwargs):
+    breaker.before_call()
+    try:
+        result = method(*args, **kwargs)
+    except OUTAGE_ERRORS as e:
+        breaker.record_failure()
+        raise PaymentGatewayUnavailable(str(e)) from e
+    except stripe.StripeError:
+        # Stripe answered, it just refused this request
+        breaker.record_success()
+        raise
+    breaker.record_success()
+    return result
+
+
+def create_payment_intent(amount, currency, metadata, idempotency_key=None):
+    """Create a PaymentIntent for `amount` in the smallest currency unit"""
+    options = {'idempotency_key': idempotency_key} if idempotency_key else {}
+    return _call(
+        get_client().payment_intents.create,
+        params={'amount': amount, 'currency': currency, 'metadata': metadata},
+        options=options,
+    )
+
+
+def retrieve_payment_intent(payment_intent_id):
+    return _call(get_client().payment_intents.retrieve, payment_intent_id)
+
+
+def refund_payment_intent(payment_intent_id):
+    """Refund a PaymentIntent in full; repeating it for the same intent does not refund twice"""
+    return _call(
+        get_client().refunds.create,
+        params={'payment_intent': payment_intent_id},
+        options={'idempotency_key': f'refund-{payment_intent_id}'},
+    )
+
+
+def list_payment_intents(**params):
+    """One page of PaymentIntents; use iter_payment_intents to walk them all"""
+    return _call(get_client().payment_intents.list, params=params)
+
+
+def iter_payment_intents(page_size=100, **params):
+    """Yield every PaymentIntent matching `params`, newest first, one page in memory at a time"""
+    params['limit'] = page_size
+    while True:
+        page = list_payment_intents(**params)
+        yield from page.data
+        if not page.has_more or not page.data:
+            return
+        params['starting_after'] = page.data[-1].id
@@ -0,0 +1,104 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=JSONEncoder, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode('utf-8')).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """Insert an in-progress record; return (record, claimed) with the stored one if the key is taken"""
+    now = timezone.now()
+    # The claim only holds for a short lease, so a process that died mid-request does not block the key for a day
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_IN_PROGRESS_LEASE_SECONDS)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(
+                    user=user, key=key, request_hash=fingerprint, expires_at=expires_at
+                )
+            return record, True
+        except IntegrityError:
+            record = IdempotencyRecord.objects.filter(user=user, key=key).first()
+            if record is None:
+                continue
+            if record.expires_at > now:
+                return record, False
+            # Expired but not purged yet, or an abandoned claim: treat the key as new
+            IdempotencyRecord.objects.filter(pk=record.pk, expires_at__lte=now).delete()
+    return IdempotencyRecord.objects.filter(user=user, key=key).first(), False
+
+
+def idempotent(view):
+    """
+    Honour an Idempotency-Key header on a POST function view.
+
+    The first request with a key runs normally and its response is stored; a
+    retry with the same key and body gets that response back without running
+    the view again. 5xx responses are not kept, so those can be retried, and
+    a claim left behind by a crashed request lapses after a short lease.
+    Place it below @api_view/@permission_classes so the user is authenticated.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = _claim(request.user, key, fingerprint)
+        if not claimed:
+            if record.request_hash != fingerprint:
+                return Response(
+                    {'error': f'{HEADER} was already used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.status != 'completed':
+                return Response(
+                    {'error': f'A request with this {HEADER} is still being processed'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            response = Response(record.response_body, status=record.response_status)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        # By pk, so a request that outlived its lease cannot overwrite whoever reclaimed the key
+        claimed = IdempotencyRecord.objects.filter(pk=record.pk, status='in_progress')
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            claimed.delete()
+            raise
+        if response.status_code >= 500:
+            claimed.delete()
+        else:
+            # Round-trip through DRF's encoder so a replay renders byte-for-byte the same data
+            body = json.loads(json.dumps(response.data, cls=JSONEncoder))
+            claimed.update(
+                status='completed', response_status=response.status_code, response_body=body,
+                expires_at=timezone.now() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+            )
+        return response
+
+    return wrapper
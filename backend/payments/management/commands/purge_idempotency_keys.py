@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payments.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses that can no longer be replayed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        total = 0
+        while True:
+            # Small batches keep each DELETE short so API inserts are not blocked
+            ids = list(
+                IdempotencyRecord.objects.filter(expires_at__lte=now)
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            deleted, _ = IdempotencyRecord.objects.filter(id__in=ids).delete()
+            total += deleted
+        self.stdout.write(f"Deleted {total} expired idempotency records")
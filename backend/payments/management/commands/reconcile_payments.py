@@ -0,0 +1,73 @@
+import csv
+import sys
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from payments import gateway
+from payments.models import Payment
+from payments.reconciliation import REPORT_FIELDS, reconcile, to_cents
+
+
+def _parse_when(value):
+    when = parse_datetime(value) or parse_datetime(f"{value}T00:00:00")
+    if when is None:
+        raise CommandError(f"Invalid date: {value}")
+    return timezone.make_aware(when) if timezone.is_naive(when) else when
+
+
+class Command(BaseCommand):
+    help = 'Compare Payment rows with Stripe PaymentIntents and write a CSV of discrepancies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Start of the window (ISO date or datetime); default --days ago')
+        parser.add_argument('--until', help='End of the window; default one hour ago so in-flight payments are skipped')
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument(
+            '--lag-hours', type=int, default=24,
+            help='Longest time between creating a PaymentIntent and writing its Payment row',
+        )
+        parser.add_argument('--output', help='Report path; defaults to stdout')
+        parser.add_argument('--page-size', type=int, default=100, help='PaymentIntents per Stripe request (max 100)')
+        parser.add_argument('--chunk-size', type=int, default=100000, help='Rows held in memory per sorted run')
+
+    def handle(self, *args, **options):
+        until = _parse_when(options['until']) if options['until'] else timezone.now() - timedelta(hours=1)
+        since = _parse_when(options['since']) if options['since'] else until - timedelta(days=options['days'])
+        lag = timedelta(hours=options['lag_hours'])
+
+        # The window is on the intent's creation time. Its Payment row comes later,
+        # so local rows are read up to `lag` past the window and intents from `lag`
+        # before it; reconcile only checks the pairs that fall inside.
+        local_rows = (
+            (intent_id, to_cents(amount), currency, status, since <= created_at < until)
+            for intent_id, amount, currency, status, created_at in Payment.objects.filter(
+                created_at__gte=since, created_at__lt=until + lag
+            )
+            # Created by the test payment endpoints, never sent to Stripe
+            .exclude(payment_intent_id__startswith='pi_test_')
+            .values_list('payment_intent_id', 'amount', 'currency', 'status', 'created_at')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        stripe_rows = (
+            (intent.id, intent.amount, intent.currency, intent.status, intent.created >= since.timestamp())
+            for intent in gateway.iter_payment_intents(
+                page_size=options['page_size'],
+                created={'gte': int((since - lag).timestamp()), 'lt': int(until.timestamp())},
+            )
+        )
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(REPORT_FIELDS)
+            counts = reconcile(local_rows, stripe_rows, writer, chunk_size=options['chunk_size'])
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        checked = counts.pop('checked')
+        summary = ', '.join(f"{issue}: {count}" for issue, count in sorted(counts.items())) or 'no discrepancies'
+        self.stderr.write(f"Reconciled {checked} payment intents from {since} to {until} ({summary})")
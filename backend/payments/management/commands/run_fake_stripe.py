@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = 'Serve a fake Stripe API for offline load tests (set STRIPE_API_BASE to its URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+        parser.add_argument(
+            '--webhook-url',
+            help='Deliver signed payment_intent.succeeded events here, e.g. http://127.0.0.1:8000/api/payments/webhook/',
+        )
+
+    def handle(self, *args, **options):
+        if options['webhook_url'] and not settings.STRIPE_WEBHOOK_SECRET:
+            raise CommandError('Set STRIPE_WEBHOOK_SECRET to sign the webhooks; the endpoint refuses events without it')
+        server = FakeStripeServer(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+            webhook_url=options['webhook_url'],
+            webhook_secret=settings.STRIPE_WEBHOOK_SECRET,
+        )
+        self.stdout.write(f"Fake Stripe listening on {server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
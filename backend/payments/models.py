@@ -8,9 +8,11 @@ class Payment(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
         ('cancelled', 'Cancelled'),
+        ('refunded', 'Refunded'),
     )
     
-    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='payments')
+    # Empty for a payment that arrived after its reservation was gone and was refunded
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='payments', null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     payment_intent_id = models.CharField(max_length=255, unique=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -25,4 +27,64 @@ class Payment(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Payment"
-        verbose_name_plural = "Payments" 
\ No newline at end of file
+        verbose_name_plural = "Payments"
+        indexes = [
+            # Keyset pagination over (-created_at, -id)
+            models.Index(fields=['user', 'created_at', 'id'], name='payment_user_page_idx'),
+        ] 
+
+class StripeEvent(models.Model):
+    """Every webhook event we have accepted, keyed by Stripe's event id so redeliveries are ignored"""
+    STATUS_CHOICES = (
+        ('received', 'Received'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    )
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='received')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} - {self.status}"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Stripe event"
+        verbose_name_plural = "Stripe events"
+
+
+class IdempotencyRecord(models.Model):
+    """First response to a POST sent with an Idempotency-Key, replayed for retries"""
+    STATUS_CHOICES = (
+        ('in_progress', 'In Progress'),
+        ('completed', 'Completed'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_records')
+    key = models.CharField(max_length=255)
+    # sha256 of method, path and body, so a key reused for a different request is caught
+    request_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} - {self.status}"
+
+    class Meta:
+        verbose_name = "Idempotency record"
+        verbose_name_plural = "Idempotency records"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
@@ -0,0 +1,133 @@
+"""
+Compare local Payment rows with Stripe's PaymentIntents in bounded memory.
+
+Stripe lists intents newest first and the database's collation may not order
+ids the way Python does, so both streams are put through the same external
+sort: sorted runs of at most `chunk_size` rows are spilled to temporary files
+and read back through heapq.merge. The two sorted streams are then merge-joined
+on payment_intent_id. At no point is more than one run held in memory.
+
+A window is defined by Stripe's clock: a pair belongs to it when the intent was
+created inside it. The Payment row is written later than its intent, so the
+caller reads Stripe from a little before the window and Payment rows until a
+little after it, flags which rows fall inside, and reconcile skips pairs that
+belong to a neighbouring window. A Payment without an intent is judged by its
+own created_at.
+"""
+import csv
+import heapq
+import tempfile
+from decimal import Decimal
+
+# Local statuses that mean the money was taken; a refund leaves Stripe's intent succeeded
+COMPLETED = ('completed', 'refunded')
+SUCCEEDED = 'succeeded'
+
+REPORT_FIELDS = [
+    'payment_intent_id', 'issue',
+    'local_status', 'stripe_status',
+    'local_amount', 'stripe_amount',
+    'local_currency', 'stripe_currency',
+]
+
+
+def _spill(rows):
+    run = tempfile.TemporaryFile(mode='w+', newline='')
+    csv.writer(run).writerows(rows)
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    for intent_id, amount, currency, status, in_window in csv.reader(run):
+        yield intent_id, int(amount), currency, status, in_window == 'True'
+
+
+def external_sort(rows, chunk_size):
+    """Yield (id, amount, currency, status, in_window) tuples sorted by id, spilling runs to disk"""
+    runs = []
+    chunk = []
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                chunk.sort()
+                runs.append(_spill(chunk))
+                chunk = []
+        chunk.sort()
+        if not runs:
+            # Everything fitted in one chunk, no need to touch the disk
+            yield from chunk
+            return
+        if chunk:
+            runs.append(_spill(chunk))
+        yield from heapq.merge(*(_read_run(run) for run in runs))
+    finally:
+        for run in runs:
+            run.close()
+
+
+def merge_join(local_rows, stripe_rows):
+    """Full outer join of two id-sorted streams; yields (local, stripe) with None for a missing side"""
+    local = next(local_rows, None)
+    remote = next(stripe_rows, None)
+    while local is not None or remote is not None:
+        if remote is None or (local is not None and local[0] < remote[0]):
+            yield local, None
+            local = next(local_rows, None)
+        elif local is None or remote[0] < local[0]:
+            yield None, remote
+            remote = next(stripe_rows, None)
+        else:
+            yield local, remote
+            local = next(local_rows, None)
+            remote = next(stripe_rows, None)
+
+
+def compare(local, remote):
+    """The issue for one joined pair, or None when they agree"""
+    if remote is None:
+        return 'missing_in_stripe'
+    if local is None:
+        # Intents nobody paid are abandoned checkouts, not drift
+        return 'missing_locally' if remote[3] == SUCCEEDED else None
+    if (local[3] in COMPLETED) != (remote[3] == SUCCEEDED):
+        return 'status_mismatch'
+    if local[1] != remote[1]:
+        return 'amount_mismatch'
+    if local[2].lower() != remote[2].lower():
+        return 'currency_mismatch'
+    return None
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def reconcile(local_rows, stripe_rows, writer, chunk_size=100000):
+    """
+    Write one report row per discrepancy to a csv.writer and return counts per issue.
+
+    Both inputs are iterables of (payment_intent_id, amount_in_cents, currency,
+    status, in_window) in any order. A pair is checked when its Stripe row is
+    in the window, or, without one, its local row.
+    """
+    counts = {'checked': 0}
+    joined = merge_join(external_sort(local_rows, chunk_size), external_sort(stripe_rows, chunk_size))
+    for local, remote in joined:
+        if not (remote or local)[4]:
+            continue
+        counts['checked'] += 1
+        issue = compare(local, remote)
+        if issue is None:
+            continue
+        counts[issue] = counts.get(issue, 0) + 1
+        local = local or ('', '', '', '', '')
+        remote = remote or ('', '', '', '', '')
+        writer.writerow([
+            local[0] or remote[0], issue,
+            local[3], remote[3],
+            local[1], remote[1],
+            local[2], remote[2],
+        ])
+    return counts
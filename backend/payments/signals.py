@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after an UPDATE marked `payment` completed at `completed_at`, where
+# post_save does not fire. `mentor_id` is the booking's mentor.
+payment_completed = Signal()
@@ -0,0 +1,486 @@
+import csv
+import json
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import stripe
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from bookings.models import Booking, BookingReservation
+from mentors.models import MentorProfile
+
+from . import gateway
+from .fake_stripe import FakeStripeServer, sign_webhook
+from .gateway import CircuitBreaker, PaymentGatewayUnavailable
+from .idempotency import idempotent
+from .models import IdempotencyRecord, Payment, StripeEvent
+
+WEBHOOK_SECRET = 'whsec_test_secret'
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTests(TestCase):
+    """Recorded webhook payloads replayed against the endpoint; nothing talks to Stripe"""
+
+    def setUp(self):
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        mentor_user = User.objects.create_user('mentor', 'mentor@example.com', 'pw')
+        mentor_user.profile.user_type = 'mentor'
+        mentor_user.profile.save()
+        self.mentor = MentorProfile.objects.get(user=mentor_user)
+        start = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=7), time(10)))
+        self.reservation = BookingReservation.objects.create(
+            mentee=self.mentee,
+            mentor=self.mentor,
+            payment_intent_id='pi_test_1',
+            session_date=start.date(),
+            session_time=start.time(),
+            duration_minutes=60,
+            topic='Career advice',
+            total_amount=Decimal('50.00'),
+            session_start_at=start,
+            session_end_at=start + timedelta(hours=1),
+            expires_at=timezone.now() + timedelta(minutes=30),
+        )
+
+    def event(self, event_id='evt_1', event_type='payment_intent.succeeded', **intent):
+        payment_intent = {'id': 'pi_test_1', 'object': 'payment_intent', 'status': 'succeeded', 'amount': 5000, 'currency': 'usd'}
+        payment_intent.update(intent)
+        return json.dumps({'id': event_id, 'object': 'event', 'type': event_type, 'data': {'object': payment_intent}})
+
+    def deliver(self, payload, secret=WEBHOOK_SECRET):
+        return self.client.post(
+            reverse('stripe_webhook'), data=payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=sign_webhook(payload, secret),
+        )
+
+    def test_succeeded_event_creates_booking_and_payment(self):
+        response = self.deliver(self.event())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'processed'})
+        booking = Booking.objects.get()
+        self.assertEqual((booking.mentee, booking.mentor, booking.topic), (self.mentee, self.mentor, 'Career advice'))
+        payment = Payment.objects.get()
+        self.assertEqual((payment.booking, payment.status, payment.amount), (booking, 'completed', Decimal('50.00')))
+        self.assertFalse(BookingReservation.objects.exists())
+
+    def test_bad_signature_is_rejected(self):
+        response = self.deliver(self.event(), secret='whsec_someone_else')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+        self.assertFalse(Booking.objects.exists())
+
+    def test_missing_signature_is_rejected(self):
+        response = self.client.post(reverse('stripe_webhook'), data=self.event(), content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+
+    @override_settings(STRIPE_WEBHOOK_SECRET=None)
+    def test_events_are_refused_without_a_signing_secret(self):
+        # Signed with the empty secret an unconfigured endpoint would otherwise verify against
+        response = self.deliver(self.event(), secret='')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(StripeEvent.objects.exists())
+        self.assertFalse(Booking.objects.exists())
+
+    def test_replayed_event_is_processed_once(self):
+        payload = self.event()
+        self.deliver(payload)
+        response = self.deliver(payload)
+
+        self.assertEqual(response.json(), {'status': 'duplicate'})
+        self.assertEqual(StripeEvent.objects.get().status, 'processed')
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_second_event_for_the_same_intent_does_not_book_twice(self):
+        self.deliver(self.event('evt_1'))
+        response = self.deliver(self.event('evt_2'))
+
+        self.assertEqual(response.json(), {'status': 'processed'})
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_amount_mismatch_is_not_fulfilled(self):
+        response = self.deliver(self.event(amount=100))
+
+        self.assertEqual(response.json(), {'status': 'failed'})
+        event = StripeEvent.objects.get()
+        self.assertEqual(event.status, 'failed')
+        self.assertIn('amount', event.error)
+        self.assertFalse(Booking.objects.exists())
+        # The slot stays held for the real payment
+        self.assertTrue(BookingReservation.objects.exists())
+
+    def test_currency_mismatch_is_not_fulfilled(self):
+        response = self.deliver(self.event(currency='eur'))
+
+        self.assertEqual(response.json(), {'status': 'failed'})
+        self.assertFalse(Booking.objects.exists())
+
+    def test_intent_without_reservation_is_not_fulfilled(self):
+        response = self.deliver(self.event(id='pi_unknown'))
+
+        self.assertEqual(response.json(), {'status': 'failed'})
+        self.assertIn('reservation', StripeEvent.objects.get().error)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_failed_payment_marks_pending_payment_failed(self):
+        booking = self.reservation.to_booking()
+        booking.save()
+        Payment.objects.create(booking=booking, user=self.mentee, payment_intent_id='pi_test_1', amount=Decimal('50.00'))
+
+        response = self.deliver(self.event(event_type='payment_intent.payment_failed', status='requires_payment_method'))
+
+        self.assertEqual(response.json(), {'status': 'processed'})
+        self.assertEqual(Payment.objects.get().status, 'failed')
+
+    def test_other_event_types_are_recorded_as_ignored(self):
+        response = self.deliver(self.event(event_type='charge.refunded'))
+
+        self.assertEqual(response.json(), {'status': 'ignored'})
+        self.assertEqual(StripeEvent.objects.get().status, 'ignored')
+
+
+class ReconcilePaymentsTests(TestCase):
+    """reconcile_payments against the in-process Stripe stand-in"""
+
+    def setUp(self):
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+        settings = override_settings(STRIPE_API_BASE=self.server.base_url, STRIPE_SECRET_KEY='sk_test_fake', STRIPE_MAX_NETWORK_RETRIES=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        gateway.reset_client()
+        self.addCleanup(gateway.reset_client)
+
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        mentor_user = User.objects.create_user('mentor', 'mentor@example.com', 'pw')
+        mentor_user.profile.user_type = 'mentor'
+        mentor_user.profile.save()
+        start = timezone.make_aware(datetime.combine(timezone.localdate(), time(10)))
+        self.booking = BookingReservation(
+            mentee=self.mentee, mentor=MentorProfile.objects.get(user=mentor_user), session_date=start.date(),
+            session_time=start.time(), duration_minutes=60, topic='Career advice', total_amount=Decimal('50.00'),
+        ).to_booking()
+        self.booking.save()
+        self.now = timezone.now()
+
+    def intent(self, amount=5000, status='succeeded', created=None):
+        intent = gateway.create_payment_intent(amount, 'usd', {})
+        self.server.set_status(intent.id, status)
+        self.server.intents[intent.id]['created'] = int((created or self.now - timedelta(hours=3)).timestamp())
+        return intent.id
+
+    def payment(self, intent_id, amount='50.00', status='completed', created=None):
+        payment = Payment.objects.create(
+            booking=self.booking, user=self.mentee, payment_intent_id=intent_id, amount=Decimal(amount), status=status,
+        )
+        Payment.objects.filter(pk=payment.pk).update(created_at=created or self.now - timedelta(hours=3))
+
+    def reconcile(self, **options):
+        report = StringIO()
+        output = tempfile.NamedTemporaryFile('r', suffix='.csv')
+        self.addCleanup(output.close)
+        options = {'since': (self.now - timedelta(days=1)).isoformat(), 'until': (self.now - timedelta(hours=1)).isoformat(), **options}
+        call_command('reconcile_payments', output=output.name, page_size=2, chunk_size=2, stderr=report, **options)
+        rows = list(csv.DictReader(output))
+        return {row['payment_intent_id']: row['issue'] for row in rows}, report.getvalue()
+
+    def test_matching_payments_report_nothing(self):
+        for _ in range(5):
+            self.payment(self.intent())
+
+        issues, summary = self.reconcile()
+
+        self.assertEqual(issues, {})
+        self.assertIn('Reconciled 5 payment intents', summary)
+        self.assertIn('no discrepancies', summary)
+
+    def test_refunded_payments_match_their_succeeded_intent(self):
+        self.payment(self.intent(), status='refunded')
+
+        issues, _ = self.reconcile()
+
+        self.assertEqual(issues, {})
+
+    def test_discrepancies_are_reported(self):
+        self.payment(self.intent())
+        wrong_amount = self.intent(amount=4000)
+        self.payment(wrong_amount)
+        not_taken = self.intent(status='requires_payment_method')
+        self.payment(not_taken)
+        unrecorded = self.intent()
+        self.payment('pi_fake_unknown_to_stripe')
+        # Abandoned checkouts are not drift
+        self.intent(status='canceled')
+
+        issues, _ = self.reconcile()
+
+        self.assertEqual(issues, {
+            wrong_amount: 'amount_mismatch',
+            not_taken: 'status_mismatch',
+            unrecorded: 'missing_locally',
+            'pi_fake_unknown_to_stripe': 'missing_in_stripe',
+        })
+
+    def test_window_follows_the_intent_creation_time(self):
+        since = self.now - timedelta(days=1)
+        # Created just before the window, paid and recorded inside it: the previous window's pair
+        early = self.intent(created=since - timedelta(minutes=5))
+        self.payment(early, created=since + timedelta(minutes=5))
+        # Created just before the window ends, recorded after it: this window's pair
+        late = self.intent(created=self.now - timedelta(hours=1, minutes=5))
+        self.payment(late, amount='10.00', created=self.now - timedelta(minutes=30))
+
+        issues, summary = self.reconcile()
+
+        self.assertEqual(issues, {late: 'amount_mismatch'})
+        self.assertIn('Reconciled 1 payment intents', summary)
+
+
+class IdempotentViewTests(TestCase):
+    """@idempotent around a view that counts its calls and answers with whatever status it is told"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.calls = 0
+        self.during_call = lambda: None
+
+        @api_view(['POST'])
+        @idempotent
+        def view(request):
+            self.calls += 1
+            self.during_call()
+            return Response({'call': self.calls}, status=request.data.get('status', status.HTTP_201_CREATED))
+
+        self.view = view
+
+    def post(self, key='key-1', **data):
+        request = APIRequestFactory().post('/checkout/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.post(topic='Career advice')
+        retry = self.post(topic='Career advice')
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((retry.status_code, retry.data), (first.status_code, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+    def test_key_reused_for_a_different_body_is_refused(self):
+        self.post(topic='Career advice')
+
+        response = self.post(topic='Interview practice')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_retry_while_the_first_request_runs_conflicts(self):
+        retries = []
+        self.during_call = lambda: retries.append(self.post(topic='Career advice')) if not retries else None
+
+        first = self.post(topic='Career advice')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retries[0].status_code, 409)
+        self.assertEqual(self.calls, 1)
+
+    @override_settings(IDEMPOTENCY_IN_PROGRESS_LEASE_SECONDS=60, IDEMPOTENCY_KEY_TTL_HOURS=24)
+    def test_claim_lease_is_short_and_the_stored_response_kept(self):
+        leases = []
+        self.during_call = lambda: leases.append(IdempotencyRecord.objects.get().expires_at - timezone.now())
+
+        self.post()
+
+        self.assertLessEqual(leases[0], timedelta(seconds=60))
+        self.assertGreater(IdempotencyRecord.objects.get().expires_at, timezone.now() + timedelta(hours=23))
+
+    def test_abandoned_claim_lapses_after_its_lease(self):
+        self.post(topic='Career advice')
+        IdempotencyRecord.objects.update(status='in_progress', expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.post(topic='Career advice')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.calls, 2)
+
+    def test_server_errors_are_not_stored(self):
+        failed = self.post(status=503)
+        retry = self.post(status=503)
+
+        self.assertEqual((failed.status_code, retry.status_code), (503, 503))
+        self.assertEqual(self.calls, 2)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_exceptions_release_the_key(self):
+        def fail():
+            raise RuntimeError('boom')
+        self.during_call = fail
+
+        with self.assertRaises(RuntimeError):
+            self.post()
+
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch('payments.gateway.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def test_opens_after_the_threshold_of_consecutive_failures(self):
+        self.fail(2)
+        self.assertEqual(self.breaker.state, 'closed')
+
+        self.fail(1)
+
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(PaymentGatewayUnavailable):
+            self.breaker.before_call()
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        self.breaker.record_success()
+
+        self.fail(2)
+
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_half_open_lets_one_probe_through(self):
+        self.fail(3)
+        self.now += 30
+        self.assertEqual(self.breaker.state, 'half_open')
+
+        self.breaker.before_call()
+
+        with self.assertRaises(PaymentGatewayUnavailable):
+            self.breaker.before_call()
+
+    def test_successful_probe_closes_the_circuit(self):
+        self.fail(3)
+        self.now += 30
+
+        self.breaker.before_call()
+        self.breaker.record_success()
+
+        self.assertEqual(self.breaker.state, 'closed')
+        self.breaker.before_call()
+
+    def test_failed_probe_opens_it_for_another_period(self):
+        self.fail(3)
+        self.now += 30
+
+        self.fail(1)
+
+        self.assertEqual(self.breaker.state, 'open')
+        self.now += 29
+        self.assertEqual(self.breaker.state, 'open')
+        self.now += 1
+        self.assertEqual(self.breaker.state, 'half_open')
+
+
+class StripeGatewayTests(TestCase):
+    """The real StripeClient against FakeStripeServer, with a breaker of its own"""
+
+    def setUp(self):
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+        self.configure(STRIPE_MAX_NETWORK_RETRIES=0)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        patched = mock.patch.object(gateway, 'breaker', self.breaker)
+        patched.start()
+        self.addCleanup(patched.stop)
+
+    def configure(self, **overrides):
+        settings = override_settings(**{
+            'STRIPE_API_BASE': self.server.base_url, 'STRIPE_SECRET_KEY': 'sk_test_fake', **overrides,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        gateway.reset_client()
+        self.addCleanup(gateway.reset_client)
+
+    def create(self):
+        return gateway.create_payment_intent(5000, 'usd', {'reservation_id': '1'})
+
+    def test_round_trip(self):
+        intent = self.create()
+
+        self.assertEqual(gateway.retrieve_payment_intent(intent.id).amount, 5000)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_slow_responses_time_out(self):
+        intent = self.create()
+        self.configure(STRIPE_READ_TIMEOUT=0.1, STRIPE_MAX_NETWORK_RETRIES=0)
+        self.server.latency = 0.5
+
+        with self.assertRaises(PaymentGatewayUnavailable):
+            gateway.retrieve_payment_intent(intent.id)
+
+    def test_retries_are_bounded(self):
+        self.configure(STRIPE_MAX_NETWORK_RETRIES=1)
+        self.server.failure_rate = 1.0
+
+        with self.assertRaises(PaymentGatewayUnavailable):
+            self.create()
+
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_refusals_do_not_trip_the_breaker(self):
+        for _ in range(3):
+            with self.assertRaises(stripe.InvalidRequestError):
+                gateway.retrieve_payment_intent('pi_missing')
+
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_open_breaker_fails_without_calling_stripe(self):
+        self.server.failure_rate = 1.0
+        for _ in range(2):
+            with self.assertRaises(PaymentGatewayUnavailable):
+                self.create()
+
+        with self.assertRaises(PaymentGatewayUnavailable):
+            self.create()
+
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_probe_after_the_reset_timeout_closes_the_breaker(self):
+        self.server.failure_rate = 1.0
+        for _ in range(2):
+            with self.assertRaises(PaymentGatewayUnavailable):
+                self.create()
+        self.server.failure_rate = 0.0
+
+        later = gateway.time.monotonic() + 30
+        with mock.patch('payments.gateway.time.monotonic', return_value=later):
+            self.assertEqual(self.breaker.state, 'half_open')
+            self.create()
+
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.server.request_count, 3)
@@ -2,7 +2,9 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    path('', views.payment_list, name='payment_list'),
     path('create-payment-intent/', views.create_payment_intent, name='create_payment_intent'),
     path('confirm-payment/', views.confirm_payment, name='confirm_payment'),
     path('payment-status/<str:payment_intent_id>/', views.payment_status, name='payment_status'),
+    path('webhook/', views.stripe_webhook, name='stripe_webhook'),
 ] 
\ No newline at end of file
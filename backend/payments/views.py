@@ -1,17 +1,28 @@
 from django.shortcuts import render
 from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Payment
+from .models import Payment, StripeEvent
+from .idempotency import idempotent
+from .signals import payment_completed
 from .serializers import CreatePaymentIntentSerializer, ConfirmPaymentSerializer, PaymentSerializer
 from bookings.models import Booking
+from mentorship.pagination import paginated_response
+import json
+import stripe
 import uuid
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_payment_intent(request):
     """Create a test Payment Intent for a booking"""
     serializer = CreatePaymentIntentSerializer(data=request.data)
@@ -54,6 +65,7 @@ def create_payment_intent(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def confirm_payment(request):
     """Confirm a test payment"""
     serializer = ConfirmPaymentSerializer(data=request.data)
@@ -62,24 +74,36 @@ def confirm_payment(request):
         
         try:
             # Get the payment record
-            payment = get_object_or_404(Payment, payment_intent_id=payment_intent_id, user=request.user)
+            payment = get_object_or_404(
+                Payment.objects.select_related('booking'), payment_intent_id=payment_intent_id, user=request.user
+            )
             
             # Simulate a successful test payment
             print(f"Confirming test payment for intent: {payment_intent_id}")
             
-            # Update payment status
-            payment.status = 'completed'
-            payment.save()
-            
-            # Update booking status
-            booking = payment.booking
-            booking.status = 'confirmed'
-            booking.save()
-            
-            # Send confirmation email
             from bookings.email_utils import send_booking_confirmation_to_mentee, send_booking_status_update
-            send_booking_confirmation_to_mentee(booking)
-            send_booking_status_update(booking, 'accepted')
+            from bookings.transitions import transition_booking, TransitionError
+            with transaction.atomic():
+                # Update booking status through the booking state machine
+                try:
+                    transition_booking(payment.booking_id, 'confirm_payment', request.user)
+                except TransitionError as e:
+                    return Response({'error': e.message}, status=e.status_code)
+                
+                # Update payment status
+                completed_at = timezone.now()
+                completed = Payment.objects.filter(pk=payment.pk).exclude(status='completed').update(
+                    status='completed', updated_at=completed_at
+                )
+                if completed:
+                    payment_completed.send(
+                        sender=Payment, payment=payment, mentor_id=payment.booking.mentor_id, completed_at=completed_at
+                    )
+                
+                # Queue confirmation email
+                booking = Booking.objects.select_related('mentee', 'mentor__user__profile').get(pk=payment.booking_id)
+                send_booking_confirmation_to_mentee(booking)
+                send_booking_status_update(booking, 'accepted')
             
             return Response({
                 'message': 'Test payment confirmed successfully',
@@ -110,3 +134,83 @@ def payment_status(request, payment_intent_id):
             {'error': 'Payment not found'},
             status=status.HTTP_404_NOT_FOUND
         )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def payment_list(request):
+    """List the current user's payments, newest first"""
+    payments = Payment.objects.filter(user=request.user)
+    return paginated_response(request, payments, PaymentSerializer, ordering=('-created_at', '-id'))
+
+
+def _handle_payment_intent_succeeded(payment_intent):
+    from bookings.fulfilment import fulfil_payment_intent
+    fulfil_payment_intent(payment_intent)
+
+
+def _handle_payment_intent_failed(payment_intent):
+    Payment.objects.filter(
+        payment_intent_id=payment_intent['id'], status='pending'
+    ).update(status='failed', updated_at=timezone.now())
+
+
+# Event types we act on; everything else is recorded as ignored
+WEBHOOK_HANDLERS = {
+    'payment_intent.succeeded': _handle_payment_intent_succeeded,
+    'payment_intent.payment_failed': _handle_payment_intent_failed,
+}
+
+
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """Receive Stripe events; each event id is processed at most once"""
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        # Any payload "signed" with an empty secret would verify, so accept nothing
+        print("Rejected Stripe webhook: STRIPE_WEBHOOK_SECRET is not set")
+        return HttpResponse(status=503)
+    payload = request.body
+    try:
+        stripe.Webhook.construct_event(
+            payload, request.META.get('HTTP_STRIPE_SIGNATURE', ''), settings.STRIPE_WEBHOOK_SECRET
+        )
+        event = json.loads(payload)
+    except (ValueError, stripe.SignatureVerificationError) as e:
+        print(f"Rejected Stripe webhook: {str(e)}")
+        return HttpResponse(status=400)
+
+    record, _ = StripeEvent.objects.get_or_create(
+        event_id=event['id'], defaults={'type': event['type'], 'payload': event}
+    )
+    if record.status in ('processed', 'ignored'):
+        return JsonResponse({'status': 'duplicate'})
+
+    from bookings.fulfilment import FulfilmentError
+    handler = WEBHOOK_HANDLERS.get(event['type'])
+    try:
+        with transaction.atomic():
+            # Redeliveries of the same event queue up here and then see it processed
+            record = StripeEvent.objects.select_for_update().get(pk=record.pk)
+            if record.status in ('processed', 'ignored'):
+                return JsonResponse({'status': 'duplicate'})
+            if handler is not None:
+                handler(event['data']['object'])
+            record.status = 'processed' if handler is not None else 'ignored'
+            record.error = ''
+            record.processed_at = timezone.now()
+            record.save(update_fields=['status', 'error', 'processed_at'])
+    except FulfilmentError as e:
+        # Retrying cannot fix this one, so acknowledge it and leave it for an admin
+        error = e.detail if isinstance(e.detail, str) else json.dumps(e.detail)
+        if e.refunded:
+            error = f"{error} (refunded)"
+        print(f"Stripe event {event['id']} could not be fulfilled: {error}")
+        StripeEvent.objects.filter(pk=record.pk).update(status='failed', error=error, processed_at=timezone.now())
+        return JsonResponse({'status': 'failed'})
+    except Exception as e:
+        # Anything else may be transient; a non-2xx makes Stripe deliver it again
+        print(f"Stripe event {event['id']} failed: {str(e)}")
+        StripeEvent.objects.filter(pk=record.pk).update(status='failed', error=str(e))
+        return HttpResponse(status=500)
+
+    return JsonResponse({'status': record.status})
@@ -0,0 +1,13 @@
+from mentorship.rebuild import RebuildCommand
+from reviews.ratings import rebuild_ratings
+
+
+class Command(RebuildCommand):
+    help = "Recompute every mentor's rating histogram and averages from the reviews table and fix any that drifted"
+    noun = 'mentors'
+
+    def rebuild(self, dry_run):
+        return rebuild_ratings(dry_run=dry_run)
+
+    def describe(self, mentor_id):
+        return f"Mentor {mentor_id}"
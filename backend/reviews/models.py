@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from mentors.models import MentorProfile
@@ -26,3 +28,34 @@ class Review(models.Model):
         verbose_name = "Review"
         verbose_name_plural = "Reviews"
         unique_together = ['mentee', 'booking']
+        indexes = [
+            # Keyset pagination over (-created_at, -id)
+            models.Index(fields=['mentee', 'created_at', 'id'], name='review_mentee_page_idx'),
+            models.Index(fields=['created_at', 'id'], name='review_page_idx'),
+            # Public feed of one mentor's reviews, newest first
+            models.Index(fields=['mentor', 'is_public', 'created_at', 'id'], name='review_mentor_feed_idx'),
+        ]
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, raw, **kwargs):
+    # The stored rating, so post_save can move the mentor's histogram by the difference
+    instance._previous_rating = None
+    if not raw and instance.pk is not None:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list('mentor_id', 'rating').first()
+
+@receiver(post_save, sender=Review)
+def count_saved_review(sender, instance, created, raw, **kwargs):
+    from .ratings import record_ratings
+    if raw:
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    current = (instance.mentor_id, int(instance.rating))
+    if previous == current:
+        return
+    record_ratings(added=[current], removed=[previous] if previous else [])
+
+@receiver(post_delete, sender=Review)
+def count_deleted_review(sender, instance, **kwargs):
+    from .ratings import record_ratings
+    record_ratings(removed=[(instance.mentor_id, int(instance.rating))])
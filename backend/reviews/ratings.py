@@ -0,0 +1,109 @@
+"""
+Per-mentor rating histogram and averages stored on MentorProfile.
+
+Each review change is turned into +1/-1 on the mentor's ratings_<stars>
+column and review_count with F() increments. A second UPDATE then derives
+rating (the plain average) and rating_score (a Bayesian average) from the new
+counts in SQL, under the row lock the first one took. Reading a mentor card
+therefore never aggregates the reviews table. rebuild_ratings recomputes
+them from it, a locked batch of mentors at a time (mentorship/rebuild.py).
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from mentors.cache import invalidate_mentors
+from mentors.models import MentorProfile
+from mentorship.rebuild import rebuild_rows
+
+from .models import Review
+
+HISTOGRAM_FIELDS = MentorProfile.HISTOGRAM_FIELDS
+CENT = Decimal('0.01')
+
+
+def bayesian_average(histogram):
+    """rating_score for a (count of 1 star, ..., count of 5 stars) tuple; 0 when there are no reviews"""
+    count = sum(histogram)
+    if not count:
+        return Decimal('0')
+    total = sum(stars * n for stars, n in enumerate(histogram, start=1))
+    prior_weight = settings.RATING_PRIOR_WEIGHT
+    return Decimal((prior_weight * settings.RATING_PRIOR_MEAN + total) / (prior_weight + count)).quantize(CENT)
+
+
+def _derived_ratings():
+    """rating and rating_score as SQL expressions over the histogram columns"""
+    total = Cast(sum(F(field) * stars for stars, field in enumerate(HISTOGRAM_FIELDS, start=1)), FloatField())
+    count = Cast(F('review_count'), FloatField())
+    prior_weight = float(settings.RATING_PRIOR_WEIGHT)
+    return {
+        'rating': Case(When(review_count=0, then=Value(0.0)), default=total / count),
+        'rating_score': Case(
+            When(review_count=0, then=Value(0.0)),
+            default=(Value(prior_weight * settings.RATING_PRIOR_MEAN) + total) / (Value(prior_weight) + count),
+        ),
+    }
+
+
+def record_ratings(added=(), removed=()):
+    """Apply (mentor_id, stars) pairs to the mentors' histograms and averages"""
+    deltas = {}
+    for sign, rows in ((1, added), (-1, removed)):
+        for mentor_id, stars in rows:
+            histogram = deltas.setdefault(mentor_id, [0] * len(HISTOGRAM_FIELDS))
+            histogram[stars - 1] += sign
+
+    changed = []
+    # Review writes take no mentor lock beforehand, so this UPDATE is where it is
+    # taken: in ascending ids, the order rebuild_ratings locks its batches in
+    for mentor_id in sorted(deltas):
+        increments = {field: F(field) + delta for field, delta in zip(HISTOGRAM_FIELDS, deltas[mentor_id]) if delta}
+        if not increments:
+            continue
+        mentor = MentorProfile.objects.filter(pk=mentor_id)
+        mentor.update(review_count=F('review_count') + sum(deltas[mentor_id]), updated_at=timezone.now(), **increments)
+        mentor.update(**_derived_ratings())
+        changed.append(mentor_id)
+    invalidate_mentors(changed, lists=False)
+
+
+def expected_ratings(mentor_ids):
+    """{mentor_id: (*histogram, review_count, rating_score)} for the given mentors, with one GROUP BY"""
+    histograms = {mentor_id: [0] * len(HISTOGRAM_FIELDS) for mentor_id in mentor_ids}
+    reviews = Review.objects.filter(mentor_id__in=mentor_ids).order_by().values_list('mentor_id', 'rating').annotate(n=Count('id'))
+    for mentor_id, stars, count in reviews:
+        histograms[mentor_id][stars - 1] = count
+    return {
+        mentor_id: (*histogram, sum(histogram), bayesian_average(histogram))
+        for mentor_id, histogram in histograms.items()
+    }
+
+
+def _same_ratings(stored, expected):
+    # The database may round the last cent of rating_score the other way
+    return stored[:-1] == expected[:-1] and abs(stored[-1] - expected[-1]) <= CENT
+
+
+def _fix_ratings(drifted):
+    mentor_ids = [mentor_id for mentor_id, _, _ in drifted]
+    MentorProfile.objects.bulk_update(
+        [
+            MentorProfile(pk=mentor_id, updated_at=timezone.now(), review_count=expected[-2], **dict(zip(HISTOGRAM_FIELDS, expected)))
+            for mentor_id, _, expected in drifted
+        ],
+        ['review_count', *HISTOGRAM_FIELDS, 'updated_at'],
+    )
+    MentorProfile.objects.filter(pk__in=mentor_ids).update(**_derived_ratings())
+    invalidate_mentors(mentor_ids)
+
+
+def rebuild_ratings(dry_run=False):
+    """Recompute every mentor's histogram and averages from the reviews table; returns [(mentor_id, stored, expected)]"""
+    return rebuild_rows(
+        MentorProfile.objects.all(), (*HISTOGRAM_FIELDS, 'review_count', 'rating_score'),
+        expected_ratings, _fix_ratings, dry_run=dry_run, same=_same_ratings,
+    )
@@ -25,4 +25,21 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         mentee = self.context['request'].user
         validated_data['mentee'] = mentee
-        return super().create(validated_data) 
\ No newline at end of file
+        return super().create(validated_data)
+
+def reviewer_display_name(user):
+    """"Jane D." for a named user, otherwise the username's initial; never anything that identifies the account"""
+    if user.first_name:
+        return f"{user.first_name} {user.last_name[:1]}." if user.last_name else user.first_name
+    return f"{user.username[:1].upper()}."
+
+class PublicReviewSerializer(serializers.ModelSerializer):
+    """A review as anyone may see it; the mentee appears by display name only"""
+    mentee_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Review
+        fields = ['id', 'mentor', 'mentee_name', 'rating', 'title', 'comment', 'created_at']
+
+    def get_mentee_name(self, obj):
+        return reviewer_display_name(obj.mentee)
@@ -1,3 +1,98 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.models import Booking
+from bookings.tests import create_booking
+from mentors.models import Expertise, MentorProfile
+from mentors.tests import create_mentor
+from mentorship.testing import QueryCountMixin
+
+from .models import Review
+
+
+class PublicReviewFeedTests(TestCase):
+    def setUp(self):
+        self.mentee = User.objects.create_user('jane', 'jane.doe@example.com', 'pw', first_name='Jane', last_name='Doe')
+        mentor_user = User.objects.create_user('mentor', 'mentor@example.com', 'pw')
+        mentor_user.profile.user_type = 'mentor'
+        mentor_user.profile.save()
+        self.mentor = MentorProfile.objects.get(user=mentor_user)
+        booking = Booking.objects.create(
+            mentee=self.mentee, mentor=self.mentor, session_date=date(2024, 1, 10), session_time=time(10),
+            duration_minutes=60, topic='Career advice', total_amount=Decimal('50.00'), status='completed',
+        )
+        Review.objects.create(mentee=self.mentee, mentor=self.mentor, booking=booking, rating=5, title='Great', comment='Helpful', is_public=True)
+        self.client = APIClient()
+
+    def test_anonymous_feed_shows_display_name_only(self):
+        response = self.client.get('/api/reviews/')
+
+        self.assertEqual(response.status_code, 200)
+        [review] = response.json()['results']
+        self.assertEqual(review['mentee_name'], 'Jane D.')
+        self.assertEqual(review['mentor'], self.mentor.pk)
+        self.assertNotIn('mentee', review)
+        self.assertNotIn('jane.doe@example.com', response.content.decode())
+        self.assertNotIn('mentor@example.com', response.content.decode())
+
+    def test_anonymous_feed_hides_private_reviews(self):
+        Review.objects.update(is_public=False)
+
+        response = self.client.get('/api/reviews/')
+
+        self.assertEqual(response.json()['results'], [])
+
+    def test_reviewer_sees_own_reviews_in_full(self):
+        self.client.force_authenticate(self.mentee)
+
+        response = self.client.get('/api/reviews/')
+
+        [review] = response.json()['results']
+        self.assertEqual(review['mentee']['email'], 'jane.doe@example.com')
+
+
+class ReviewQueryCountTests(QueryCountMixin, TestCase):
+    def setUp(self):
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.expertise = [Expertise.objects.create(name=name) for name in ('Python', 'Career')]
+        self.client = APIClient()
+
+    def seed_reviews(self, n):
+        # Every review by a different mentee about a different mentor
+        while Review.objects.count() < n:
+            i = Review.objects.count()
+            mentee = self.mentee if i == 0 else User.objects.create_user(f'mentee{i}', f'mentee{i}@example.com', 'pw')
+            mentor = create_mentor(f'mentor{i}')
+            mentor.expertise.set(self.expertise)
+            booking = create_booking(mentee, mentor, timezone.make_aware(datetime(2024, 1, 10, 10)), status='completed')
+            Review.objects.create(mentee=mentee, mentor=mentor, booking=booking, rating=4, comment='Helpful')
+
+    def seed_own_reviews(self, n):
+        while Review.objects.filter(mentee=self.mentee).count() < n:
+            mentor = create_mentor(f'mentor{Review.objects.count()}')
+            mentor.expertise.set(self.expertise)
+            booking = create_booking(self.mentee, mentor, timezone.make_aware(datetime(2024, 1, 10, 10)), status='completed')
+            Review.objects.create(mentee=self.mentee, mentor=mentor, booking=booking, rating=4, comment='Helpful')
+
+    def test_public_list(self):
+        self.assertConstantQueries(self.seed_reviews, lambda: self.client.get('/api/reviews/'))
+
+    def test_own_list(self):
+        self.client.force_authenticate(self.mentee)
+        self.assertConstantQueries(self.seed_own_reviews, lambda: self.client.get('/api/reviews/'))
+
+    def test_mentor_feed(self):
+        mentor = create_mentor('reviewed')
+
+        def seed(n):
+            while mentor.reviews.count() < n:
+                mentee = User.objects.create_user(f'reviewer{mentor.reviews.count()}', 'r@example.com', 'pw')
+                booking = create_booking(mentee, mentor, timezone.make_aware(datetime(2024, 1, 10, 10)), status='completed')
+                Review.objects.create(mentee=mentee, mentor=mentor, booking=booking, rating=5, comment='Great')
 
-# Create your tests here.
+        self.assertConstantQueries(seed, lambda: self.client.get(f'/api/mentors/{mentor.pk}/reviews/'))
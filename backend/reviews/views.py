@@ -1,7 +1,8 @@
 from django.shortcuts import render
 from rest_framework import viewsets, permissions
 from .models import Review
-from .serializers import ReviewSerializer, ReviewCreateSerializer
+from .serializers import ReviewSerializer, ReviewCreateSerializer, PublicReviewSerializer
+from mentorship.pagination import KeysetPagination
 
 # Create your views here.
 
@@ -9,16 +10,27 @@ class ReviewViewSet(viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
+        # Load everything ReviewSerializer nests in a constant number of queries
+        queryset = Review.objects.select_related(
+            'mentee', 'mentor__user__profile'
+        ).prefetch_related('mentor__expertise')
         if user.is_superuser:
-            return Review.objects.all()
-        return Review.objects.filter(mentee=user)
+            return queryset
+        if not user.is_authenticated:
+            return Review.objects.select_related('mentee').filter(is_public=True)
+        return queryset.filter(mentee=user)
 
     def get_serializer_class(self):
         if self.action == 'create':
             return ReviewCreateSerializer
+        if not self.request.user.is_authenticated:
+            # The public feed: reviewers by display name, no accounts or emails
+            return PublicReviewSerializer
         return ReviewSerializer
 
     def perform_create(self, serializer):
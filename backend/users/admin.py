@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, UserStats
 
 # Register User model with custom admin
 admin.site.unregister(User)  # Unregister default User admin
@@ -12,3 +12,13 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'user_type', 'phone_number', 'location', 'created_at')
     search_fields = ('user__username', 'user__email', 'phone_number', 'location')
     list_filter = ('user_type', 'created_at')
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_sessions', 'completed_sessions', 'upcoming_sessions', 'updated_at')
+    search_fields = ('user__username', 'user__email')
+    # Maintained by booking signals; fix drift with rebuild_user_stats
+    readonly_fields = (
+        'total_sessions', 'completed_sessions', 'total_minutes', 'total_amount', 'upcoming_sessions',
+        'unique_mentors', 'updated_at',
+    )
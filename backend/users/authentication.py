@@ -0,0 +1,155 @@
+"""
+JWT authentication that rarely touches the database.
+
+Access tokens carry the user's user_type and mentor_profile_id as claims
+(users/tokens.py), so role checks and queryset filters read them off the
+token through request_role. The columns authentication needs from the User,
+its profile and its mentor profile are kept in Django's cache for
+AUTH_USER_CACHE_TTL seconds under a per-user version; the password hash and
+personal details are never cached, and load from the database if read.
+Saving or deleting any of the three bumps the version once the change has
+committed, so with a shared cache backend every worker stops using the old
+entry straight away, and an entry a concurrent request rebuilt from the old
+row is stored under a version nobody reads.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+PREFIX = 'auth-user:'
+
+# Everything authentication and permission checks read; other fields stay deferred
+USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _version_key(user_id):
+    return f'{PREFIX}version:{user_id}'
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses an old version
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def _partial(model, values):
+    """A saved `model` instance with only `values` (attname -> value) loaded and the other fields deferred"""
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+class UserCache:
+    """Users by id, with their profile and mentor profile, in Django's cache"""
+
+    def get(self, user_id):
+        """The user, or None if there is none; every call returns a separate object"""
+        key = f'{PREFIX}{user_id}:{_version(_version_key(user_id))}'
+        row = cache.get(key)
+        if row is None:
+            row = User.objects.filter(pk=user_id).values(
+                *USER_FIELDS, 'profile__id', 'profile__user_type', 'mentor_profile__id',
+            ).first()
+            if row is None:
+                return None
+            cache.set(key, row, settings.AUTH_USER_CACHE_TTL)
+        return self._build(row)
+
+    def forget(self, user_id):
+        _bump(_version_key(user_id))
+
+    @staticmethod
+    def _build(row):
+        """A User with the cached columns loaded, the rest deferred, and both profiles attached"""
+        from mentors.models import MentorProfile
+        from .models import UserProfile
+
+        user = _partial(User, {name: row[name] for name in USER_FIELDS})
+        profile = mentor_profile = None
+        if row['profile__id'] is not None:
+            profile = _partial(UserProfile, {'id': row['profile__id'], 'user_id': user.pk, 'user_type': row['profile__user_type']})
+            UserProfile._meta.get_field('user').set_cached_value(profile, user)
+        if row['mentor_profile__id'] is not None:
+            mentor_profile = _partial(MentorProfile, {'id': row['mentor_profile__id'], 'user_id': user.pk})
+            MentorProfile._meta.get_field('user').set_cached_value(mentor_profile, user)
+        # Cache the missing ones too, so reading them raises DoesNotExist without a query
+        User._meta.get_field('profile').set_cached_value(user, profile)
+        User._meta.get_field('mentor_profile').set_cached_value(user, mentor_profile)
+        return user
+
+
+user_cache = UserCache()
+
+
+def forget_user(user_id):
+    """Drop a user from the cache now and again on commit, so a concurrent request cannot re-cache the old row"""
+    user_cache.forget(user_id)
+    transaction.on_commit(lambda: user_cache.forget(user_id))
+
+
+def user_role(user):
+    """(user_type, mentor_profile_id) read from the user's related rows"""
+    profile = getattr(user, 'profile', None)
+    mentor_profile = getattr(user, 'mentor_profile', None)
+    return (profile.user_type if profile else 'mentee'), (mentor_profile.pk if mentor_profile else None)
+
+
+def request_role(request):
+    """(user_type, mentor_profile_id) of the requesting user, from the token claims when it has them"""
+    token = request.auth
+    if token is not None and 'user_type' in token:
+        return token['user_type'], token.get('mentor_profile_id')
+    return user_role(request.user)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication serving the user, profile included, from user_cache"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user = user_cache.get(user_id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The hash is not cached, so this reads it from the database
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+
+        return user
+
+
+class RoleTokenUser(TokenUser):
+    """The stateless request.user of JWTStatelessUserAuthentication, with the role claims"""
+
+    @property
+    def user_type(self):
+        return self.token.get('user_type')
+
+    @property
+    def mentor_profile_id(self):
+        return self.token.get('mentor_profile_id')
@@ -1,6 +1,7 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+
+from .identifiers import normalize_identifier
 
 User = get_user_model()
 
@@ -11,19 +12,20 @@ class EmailOrUsernameModelBackend(ModelBackend):
     """
     
     def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
         if username is None or password is None:
             return None
         
-        try:
-            # Try to find the user by username or email
-            user = User.objects.get(
-                Q(username__iexact=username) | Q(email__iexact=username)
-            )
-        except User.DoesNotExist:
+        # One probe of the unique LoginIdentifier index, whichever name was typed
+        user = User.objects.filter(login_identifiers__identifier=normalize_identifier(username)).first()
+        if user is None:
+            # Hash anyway, so a missing user takes as long as a wrong password
+            User().set_password(password)
             return None
         
         # Check if the password is valid
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
         
-        return None 
\ No newline at end of file
+        return None 
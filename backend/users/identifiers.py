@@ -0,0 +1,56 @@
+"""
+Case-insensitive login names.
+
+Every user's username and email are stored lowercased in LoginIdentifier,
+whose unique index resolves a login with one probe. Neither auth_user column
+can serve that: iexact lookups are not indexable and emails are not unique.
+An identifier belongs to one user and is never moved to another: the user
+serializers reject a username or email that is already someone else's
+identifier (identifier_taken). A collision that gets past them, from a
+concurrent signup or a save outside the API, leaves the identifier with its
+first owner; the unique index still guarantees one user per login.
+"""
+from django.db import IntegrityError, transaction
+
+from .models import LoginIdentifier
+
+
+def normalize_identifier(value):
+    return value.lower()
+
+
+def identifier_taken(value, user=None):
+    """Whether `value` already logs in as a user other than `user`"""
+    taken = LoginIdentifier.objects.filter(identifier=normalize_identifier(value))
+    if user is not None and user.pk is not None:
+        taken = taken.exclude(user=user)
+    return taken.exists()
+
+
+def wanted_identifiers(user):
+    """{identifier: kind} the user should be able to log in with"""
+    wanted = {}
+    if user.email:
+        wanted[normalize_identifier(user.email)] = 'email'
+    # Set last, so a username that equals the user's own email is recorded as a username
+    wanted[normalize_identifier(user.username)] = 'username'
+    return wanted
+
+
+def sync_login_identifiers(user):
+    """Make the user's LoginIdentifier rows match their username and email"""
+    wanted = wanted_identifiers(user)
+    LoginIdentifier.objects.filter(user=user).exclude(identifier__in=wanted).delete()
+    for identifier, kind in wanted.items():
+        row = LoginIdentifier.objects.filter(identifier=identifier).values('user_id', 'kind').first()
+        if row == {'user_id': user.pk, 'kind': kind}:
+            continue
+        if row is None:
+            try:
+                with transaction.atomic():
+                    LoginIdentifier.objects.create(identifier=identifier, user=user, kind=kind)
+            except IntegrityError:
+                # Claimed concurrently by someone else, who keeps it
+                pass
+        elif row['user_id'] == user.pk:
+            LoginIdentifier.objects.filter(identifier=identifier).update(kind=kind)
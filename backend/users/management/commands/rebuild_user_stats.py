@@ -0,0 +1,13 @@
+from mentorship.rebuild import RebuildCommand
+from users.stats import rebuild_user_stats
+
+
+class Command(RebuildCommand):
+    help = "Recompute every mentee's dashboard stats row from the bookings table and fix any that drifted or are missing"
+    noun = 'stats rows'
+
+    def rebuild(self, dry_run):
+        return rebuild_user_stats(dry_run=dry_run)
+
+    def describe(self, key):
+        return f"User {key}"
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='notification_frequency',
+            field=models.CharField(choices=[('immediate', 'Immediately'), ('digest', 'Digest')], default='immediate', help_text='Receive booking updates immediately or combined into a periodic digest', max_length=10),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_login_identifiers(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    LoginIdentifier = apps.get_model('users', 'LoginIdentifier')
+    # Accounts created before the serializers checked identifiers may collide.
+    # Usernames go first, so they win over another user's email; after that
+    # the oldest account keeps an identifier several users share
+    for kind in ('username', 'email'):
+        batch = []
+        for user_id, value in User.objects.order_by('id').values_list('id', kind).iterator(chunk_size=BATCH_SIZE):
+            if not value:
+                continue
+            batch.append(LoginIdentifier(identifier=value.lower(), user_id=user_id, kind=kind))
+            if len(batch) >= BATCH_SIZE:
+                LoginIdentifier.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            LoginIdentifier.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_login_identifiers'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_login_identifiers, migrations.RunPython.noop),
+    ]
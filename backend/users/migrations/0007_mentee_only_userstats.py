@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def delete_mentor_stats(apps, schema_editor):
+    # Mentor dashboards read the counters on MentorProfile
+    apps.get_model('users', 'UserStats').objects.filter(role='mentor').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0006_backfill_login_identifiers'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_mentor_stats, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='userstats',
+            name='userstats_user_role_uniq',
+        ),
+        migrations.RemoveField(
+            model_name='userstats',
+            name='role',
+        ),
+        migrations.RemoveField(
+            model_name='userstats',
+            name='review_count',
+        ),
+        migrations.RemoveField(
+            model_name='userstats',
+            name='rating_total',
+        ),
+        migrations.AlterField(
+            model_name='userstats',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from bookings.signals import booking_status_changed, bookings_created
 
 # Create your models here.
 
@@ -11,6 +12,11 @@ class UserProfile(models.Model):
         ('mentee', 'Mentee'),
         ('admin', 'Admin'),
     )
+
+    NOTIFICATION_FREQUENCIES = (
+        ('immediate', 'Immediately'),
+        ('digest', 'Digest'),
+    )
     
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     user_type = models.CharField(max_length=10, choices=USER_TYPES, default='mentee')
@@ -22,6 +28,10 @@ class UserProfile(models.Model):
     website = models.URLField(blank=True, null=True)
     linkedin = models.URLField(blank=True, null=True)
     github = models.URLField(blank=True, null=True)
+    notification_frequency = models.CharField(
+        max_length=10, choices=NOTIFICATION_FREQUENCIES, default='immediate',
+        help_text="Receive booking updates immediately or combined into a periodic digest"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -31,6 +41,45 @@ class UserProfile(models.Model):
     class Meta:
         verbose_name = "User Profile"
         verbose_name_plural = "User Profiles"
+        indexes = [
+            # Keyset pagination over (-created_at, -id)
+            models.Index(fields=['created_at', 'id'], name='userprofile_page_idx'),
+        ]
+
+class UserStats(models.Model):
+    """
+    Dashboard numbers for one mentee, kept current by booking signals (users/stats.py).
+    A mentor's totals are the counters on their MentorProfile.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+    total_sessions = models.IntegerField(default=0)
+    completed_sessions = models.IntegerField(default=0)
+    total_minutes = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    upcoming_sessions = models.IntegerField(default=0)
+    unique_mentors = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} stats"
+
+    class Meta:
+        verbose_name = "User Stats"
+        verbose_name_plural = "User Stats"
+
+class LoginIdentifier(models.Model):
+    """A lowercased username or email that logs in as `user` (users/identifiers.py)"""
+    KINDS = (
+        ('username', 'Username'),
+        ('email', 'Email'),
+    )
+
+    identifier = models.CharField(max_length=254, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_identifiers')
+    kind = models.CharField(max_length=10, choices=KINDS)
+
+    def __str__(self):
+        return f"{self.identifier} - {self.user_id}"
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -63,3 +112,53 @@ def create_mentor_profile(sender, instance, created, **kwargs):
             mentor_profile.delete()
         except MentorProfile.DoesNotExist:
             pass
+
+@receiver(post_save, sender=User)
+def sync_user_login_identifiers(sender, instance, raw, update_fields=None, **kwargs):
+    from .identifiers import sync_login_identifiers
+    # Logins save last_login only
+    if raw or (update_fields is not None and not {'username', 'email'}.intersection(update_fields)):
+        return
+    sync_login_identifiers(instance)
+
+# Drop cached request users (users/authentication.py) when they or their profiles change
+
+@receiver([post_save, post_delete], sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    from .authentication import forget_user
+    forget_user(instance.pk)
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender='mentors.MentorProfile')
+def forget_cached_profile_user(sender, instance, **kwargs):
+    from .authentication import forget_user
+    forget_user(instance.user_id)
+
+# Materialized dashboard stats; every receiver is a no-op unless USER_STATS_MATERIALIZED is on
+
+@receiver(post_save, sender=User)
+def create_mentee_stats(sender, instance, created, raw, **kwargs):
+    from .stats import create_stats_row
+    if created and not raw:
+        create_stats_row(instance.pk)
+
+@receiver(post_save, sender='bookings.Booking')
+def stats_for_saved_booking(sender, instance, created, raw, **kwargs):
+    from .stats import booking_saved
+    if not raw:
+        booking_saved(instance, created, getattr(instance, '_previous_row', None))
+
+@receiver(post_delete, sender='bookings.Booking')
+def stats_for_deleted_booking(sender, instance, **kwargs):
+    from .stats import booking_deleted
+    booking_deleted(instance)
+
+@receiver(booking_status_changed)
+def stats_for_status_change(sender, bookings, to_status, **kwargs):
+    from .stats import bookings_moved
+    bookings_moved(bookings, to_status)
+
+@receiver(bookings_created)
+def stats_for_created_bookings(sender, bookings, **kwargs):
+    from .stats import bookings_added
+    bookings_added(bookings)
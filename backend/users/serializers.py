@@ -1,13 +1,30 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from .identifiers import identifier_taken
 from .models import UserProfile
 
+# Usernames and emails share one login namespace, case-insensitively (users/identifiers.py)
+IDENTIFIER_TAKEN_MESSAGES = {
+    'username': "This username is already in use",
+    'email': "This email is already in use",
+}
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined']
         read_only_fields = ['id', 'date_joined']
 
+    def validate_username(self, value):
+        if identifier_taken(value, self.instance):
+            raise serializers.ValidationError(IDENTIFIER_TAKEN_MESSAGES['username'])
+        return value
+
+    def validate_email(self, value):
+        if value and identifier_taken(value, self.instance):
+            raise serializers.ValidationError(IDENTIFIER_TAKEN_MESSAGES['email'])
+        return value
+
 class UserProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
@@ -16,6 +33,19 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['user', 'created_at', 'updated_at']
 
+    def validate(self, data):
+        # update() reads username and email straight from the request, so check them here
+        request_data = self.context['request'].data
+        user = self.instance.user if self.instance is not None else None
+        errors = {
+            field: [message]
+            for field, message in IDENTIFIER_TAKEN_MESSAGES.items()
+            if request_data.get(field) and identifier_taken(request_data[field], user)
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
     def update(self, instance, validated_data):
         # Update related User fields if present in request data
         user_data = self.context['request'].data.get('user', {})
@@ -40,6 +70,16 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'email', 'password', 'first_name', 'last_name', 'user_type']
+
+    def validate_username(self, value):
+        if identifier_taken(value):
+            raise serializers.ValidationError(IDENTIFIER_TAKEN_MESSAGES['username'])
+        return value
+
+    def validate_email(self, value):
+        if value and identifier_taken(value):
+            raise serializers.ValidationError(IDENTIFIER_TAKEN_MESSAGES['email'])
+        return value
     
     def create(self, validated_data):
         user_type = validated_data.pop('user_type', 'mentee')
@@ -0,0 +1,239 @@
+"""
+Dashboard statistics for a user, as a mentor or as a mentee.
+
+A mentor's totals, rating and review count are the counters bookings/counters.py
+and reviews/ratings.py keep on MentorProfile; the dashboard reads that row and
+counts the upcoming sessions alongside it, in one query. A mentee's stats come
+from one aggregate query over their bookings, using conditional Count/Sum. With
+USER_STATS_MATERIALIZED on, booking signals also keep one UserStats row per
+mentee current through F() increments, and the dashboard reads that row
+instead: one lookup however many sessions the mentee has. Mentees without a
+row fall back to the live query; run rebuild_user_stats when turning the
+setting on.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from bookings.counters import contribution
+from bookings.models import Booking
+from mentors.models import MentorProfile
+from mentorship.rebuild import REBUILD_BATCH_SIZE, rebuild_rows
+
+from .models import UserStats
+
+STAT_FIELDS = ('total_sessions', 'completed_sessions', 'total_minutes', 'total_amount', 'upcoming_sessions')
+STORED_FIELDS = (*STAT_FIELDS, 'unique_mentors')
+
+
+def booking_stats(status, total_amount, duration_minutes):
+    """What one booking adds to its mentee's stats, in STAT_FIELDS order"""
+    return (*contribution(status, total_amount, duration_minutes), int(status == 'confirmed'))
+
+
+def _booking_aggregates():
+    completed = Q(status='completed')
+    return {
+        'total_sessions': Count('id', filter=~Q(status='cancelled')),
+        'completed_sessions': Count('id', filter=completed),
+        'total_minutes': Sum('duration_minutes', filter=completed),
+        'total_amount': Sum('total_amount', filter=completed),
+        'upcoming_sessions': Count('id', filter=Q(status='confirmed')),
+    }
+
+
+def mentor_stats(user):
+    """The mentor's stats from the counters on their MentorProfile, upcoming sessions counted in the same query"""
+    upcoming = (
+        Booking.objects.filter(mentor=OuterRef('pk'), status='confirmed').order_by()
+        .values('mentor').annotate(count=Count('id')).values('count')
+    )
+    values = MentorProfile.objects.filter(user=user).values(
+        'total_sessions', 'completed_sessions', 'total_minutes', 'rating', 'review_count',
+        total_amount=F('total_earnings'),
+        upcoming_sessions=Coalesce(Subquery(upcoming), 0),
+    ).first()
+    return format_stats('mentor', values or {})
+
+
+def live_stats(user):
+    """The mentee's stats straight from the bookings table, in one query"""
+    values = Booking.objects.filter(mentee=user).aggregate(
+        **_booking_aggregates(),
+        unique_mentors=Count('mentor', distinct=True),
+    )
+    return format_stats('mentee', values)
+
+
+def materialized_stats(user):
+    """The mentee's UserStats row, formatted, or None when there is none"""
+    values = UserStats.objects.filter(user=user).values().first()
+    return format_stats('mentee', values) if values is not None else None
+
+
+def dashboard_stats(user, role):
+    if role == 'mentor':
+        return mentor_stats(user)
+    stats = materialized_stats(user) if settings.USER_STATS_MATERIALIZED else None
+    return stats or live_stats(user)
+
+
+def format_stats(role, values):
+    stats = {
+        'total_sessions': values.get('total_sessions') or 0,
+        'completed_sessions': values.get('completed_sessions') or 0,
+        'upcoming_sessions': values.get('upcoming_sessions') or 0,
+        'total_hours': round((values.get('total_minutes') or 0) / 60, 1),
+    }
+    if role == 'mentor':
+        stats['total_earnings'] = round(float(values.get('total_amount') or 0), 2)
+        stats['average_rating'] = round(float(values.get('rating') or 0), 1)
+        stats['total_reviews'] = values.get('review_count') or 0
+    else:
+        stats['unique_mentors'] = values.get('unique_mentors') or 0
+    return stats
+
+
+# -- Incremental maintenance of UserStats --
+
+def create_stats_row(user_id):
+    if settings.USER_STATS_MATERIALIZED:
+        UserStats.objects.get_or_create(user_id=user_id)
+
+
+def _apply(deltas):
+    """Apply {mentee_id: {field: delta}} to the mentees' UserStats rows"""
+    deltas = {key: {field: value for field, value in delta.items() if value} for key, delta in deltas.items()}
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    pks = dict(UserStats.objects.filter(user_id__in=deltas).values_list('user_id', 'pk'))
+    # Primary key order, the order rebuild_user_stats locks the rows in
+    for pk, mentee_id in sorted((pk, mentee_id) for mentee_id, pk in pks.items()):
+        UserStats.objects.filter(pk=pk).update(**{field: F(field) + value for field, value in deltas[mentee_id].items()})
+
+
+def record_booking_stats(added=(), removed=()):
+    """Apply (mentee_id, booking_stats) pairs to the mentees' rows"""
+    deltas = {}
+    for sign, rows in ((1, added), (-1, removed)):
+        for mentee_id, values in rows:
+            delta = deltas.setdefault(mentee_id, dict.fromkeys(STAT_FIELDS, 0))
+            for field, value in zip(STAT_FIELDS, values):
+                delta[field] += sign * value
+    _apply(deltas)
+
+
+def refresh_unique_mentors(mentee_ids):
+    """
+    Recount unique_mentors for mentees whose bookings gained or lost a mentor.
+    A distinct count cannot be kept with deltas, so this recounts the mentee's
+    own bookings in the UPDATE itself.
+    """
+    for mentee_id in sorted(set(mentee_ids)):
+        distinct = (
+            Booking.objects.filter(mentee_id=mentee_id).order_by().values('mentee_id')
+            .annotate(mentors=Count('mentor', distinct=True)).values('mentors')
+        )
+        UserStats.objects.filter(user_id=mentee_id).update(unique_mentors=Coalesce(Subquery(distinct), 0))
+
+
+def booking_saved(booking, created, previous):
+    if not settings.USER_STATS_MATERIALIZED or (not created and previous is None):
+        return
+    removed = []
+    if previous:
+        removed.append((
+            previous['mentee_id'],
+            booking_stats(previous['status'], previous['total_amount'], previous['duration_minutes']),
+        ))
+    record_booking_stats(
+        added=[(booking.mentee_id, booking_stats(booking.status, booking.total_amount, booking.duration_minutes))],
+        removed=removed,
+    )
+    if created or (previous['mentee_id'], previous['mentor_id']) != (booking.mentee_id, booking.mentor_id):
+        refresh_unique_mentors([booking.mentee_id, *([previous['mentee_id']] if previous else [])])
+
+
+def booking_deleted(booking):
+    if not settings.USER_STATS_MATERIALIZED:
+        return
+    record_booking_stats(removed=[
+        (booking.mentee_id, booking_stats(booking.status, booking.total_amount, booking.duration_minutes))
+    ])
+    refresh_unique_mentors([booking.mentee_id])
+
+
+def bookings_moved(rows, to_status):
+    if not settings.USER_STATS_MATERIALIZED:
+        return
+    record_booking_stats(
+        added=[
+            (row['mentee_id'], booking_stats(to_status, row['total_amount'], row['duration_minutes']))
+            for row in rows
+        ],
+        removed=[
+            (row['mentee_id'], booking_stats(row['status'], row['total_amount'], row['duration_minutes']))
+            for row in rows
+        ],
+    )
+
+
+def bookings_added(bookings):
+    if not settings.USER_STATS_MATERIALIZED:
+        return
+    record_booking_stats(added=[
+        (booking.mentee_id, booking_stats(booking.status, booking.total_amount, booking.duration_minutes))
+        for booking in bookings
+    ])
+    refresh_unique_mentors(booking.mentee_id for booking in bookings)
+
+
+def expected_stats(user_ids):
+    """{user_id: values} for the given mentees straight from the bookings table, in one GROUP BY"""
+    rows = {user_id: dict.fromkeys(STORED_FIELDS, 0) for user_id in user_ids}
+    grouped = Booking.objects.filter(mentee_id__in=user_ids).order_by().values('mentee_id').annotate(
+        **_booking_aggregates(), unique_mentors=Count('mentor', distinct=True),
+    )
+    for values in grouped:
+        rows[values.pop('mentee_id')].update({field: value or 0 for field, value in values.items()})
+    return rows
+
+
+def _create_missing_stats(dry_run):
+    """Create, already filled in, the rows no signal has created; returns [(user_id, None, expected)]"""
+    existing = set(UserStats.objects.values_list('user_id', flat=True).iterator(chunk_size=5000))
+    user_ids = [
+        user_id for user_id in User.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=5000)
+        if user_id not in existing
+    ]
+    created = []
+    for start in range(0, len(user_ids), REBUILD_BATCH_SIZE):
+        missing = [(user_id, None, values) for user_id, values in sorted(expected_stats(user_ids[start:start + REBUILD_BATCH_SIZE]).items())]
+        if not dry_run:
+            # A row created concurrently wins; the locked pass below corrects it if needed
+            UserStats.objects.bulk_create(
+                [UserStats(user_id=user_id, **values) for user_id, _, values in missing], ignore_conflicts=True,
+            )
+        created.extend(missing)
+    return created
+
+
+def rebuild_user_stats(dry_run=False):
+    """Compare UserStats with the bookings table and fix rows that drifted or are missing; returns [(user_id, stored, expected)]"""
+    missing = _create_missing_stats(dry_run)
+    users = {}
+
+    def expected(pks):
+        users.update(UserStats.objects.filter(pk__in=pks).values_list('pk', 'user_id'))
+        values = expected_stats(sorted(users[pk] for pk in pks))
+        return {pk: tuple(values[users[pk]][field] for field in STORED_FIELDS) for pk in pks}
+
+    def fix(drifted):
+        UserStats.objects.bulk_update([UserStats(pk=pk, **dict(zip(STORED_FIELDS, want))) for pk, _, want in drifted], list(STORED_FIELDS))
+
+    drifted = rebuild_rows(UserStats.objects.all(), STORED_FIELDS, expected, fix, dry_run=dry_run)
+    return missing + [
+        (users[pk], dict(zip(STORED_FIELDS, stored)), dict(zip(STORED_FIELDS, want))) for pk, stored, want in drifted
+    ]
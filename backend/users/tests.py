@@ -1,3 +1,181 @@
-from django.test import TestCase
+from datetime import datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bookings.tests import create_booking
+from mentors.models import MentorProfile
+from mentors.tests import create_mentor
+
+from .authentication import PREFIX, USER_FIELDS, forget_user, user_cache
+from .models import LoginIdentifier, UserProfile, UserStats
+from .stats import dashboard_stats, live_stats, materialized_stats, rebuild_user_stats
+
+
+@override_settings(USER_STATS_MATERIALIZED=True)
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.mentee = User.objects.create_user('mentee', 'mentee@example.com', 'pw')
+        self.mentor = create_mentor('mentor')
+        start = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=1), time(10)))
+        create_booking(self.mentee, self.mentor, start, status='completed')
+        create_booking(self.mentee, self.mentor, start + timedelta(hours=2), status='confirmed')
+
+    def test_signals_keep_rows_current(self):
+        self.assertEqual(materialized_stats(self.mentee), live_stats(self.mentee))
+
+    def test_rebuild_fixes_drifted_and_missing_rows(self):
+        UserStats.objects.filter(user=self.mentee).update(total_sessions=40, unique_mentors=3)
+        UserStats.objects.filter(user=self.mentor.user).delete()
+
+        drifted = rebuild_user_stats()
+
+        self.assertEqual(sorted(key for key, _, _ in drifted), sorted([self.mentee.pk, self.mentor.user_id]))
+        self.assertEqual(materialized_stats(self.mentee), live_stats(self.mentee))
+        self.assertEqual(rebuild_user_stats(dry_run=True), [])
+
+    def test_mentor_stats_read_the_profile_counters(self):
+        MentorProfile.objects.filter(pk=self.mentor.pk).update(rating=4.5, review_count=2)
+        user = self.mentor.user
+
+        with self.assertNumQueries(1):
+            stats = dashboard_stats(user, 'mentor')
+
+        self.assertEqual(stats, {
+            'total_sessions': 2, 'completed_sessions': 1, 'upcoming_sessions': 1, 'total_hours': 1.0,
+            'total_earnings': 50.0, 'average_rating': 4.5, 'total_reviews': 2,
+        })
+        self.assertFalse(UserStats.objects.filter(user=self.mentor.user, total_sessions__gt=0).exists())
+
+
+class LoginIdentifierTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'pw-alice')
+        self.client = APIClient()
+
+    def register(self, username, email):
+        return self.client.post('/api/users/register/', {'username': username, 'email': email, 'password': 'pw'}, format='json')
+
+    def test_registration_rejects_taken_identifiers(self):
+        self.assertIn('email', self.register('bob', 'ALICE@example.com').json())
+        self.assertIn('username', self.register('Alice@Example.com', 'bob@example.com').json())
+        self.assertIn('username', self.register('ALICE', 'bob@example.com').json())
+        self.assertFalse(User.objects.exclude(pk=self.alice.pk).exists())
+
+    def test_own_email_may_be_the_username(self):
+        self.assertEqual(self.register('bob@example.com', 'bob@example.com').status_code, 201)
+        self.assertEqual(authenticate(username='BOB@example.com', password='pw').username, 'bob@example.com')
+
+    def test_profile_update_rejects_another_users_email(self):
+        bob = User.objects.create_user('bob', 'bob@example.com', 'pw-bob')
+        self.client.force_authenticate(bob)
+
+        response = self.client.patch(f'/api/users/profiles/{bob.profile.pk}/', {'username': 'alice@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(User.objects.get(pk=bob.pk).username, 'bob')
+        self.assertEqual(authenticate(username='alice@example.com', password='pw-alice'), self.alice)
+
+    def test_profile_update_may_keep_its_own_identifiers(self):
+        self.client.force_authenticate(self.alice)
+
+        response = self.client.patch(f'/api/users/profiles/{self.alice.profile.pk}/', {'username': 'Alice', 'email': 'alice@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(authenticate(username='alice', password='pw-alice'), self.alice)
+
+    def test_identifier_is_never_taken_from_its_owner(self):
+        # Saved outside the API, so no serializer stopped the collision
+        User.objects.create_user('alice@example.com', 'mallory@example.com', 'pw-mallory')
+
+        self.assertEqual(LoginIdentifier.objects.get(identifier='alice@example.com').user, self.alice)
+        self.assertEqual(authenticate(username='alice@example.com', password='pw-alice'), self.alice)
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        self.client = APIClient()
+        tokens = self.client.post('/api/token/', {'username': 'alice', 'password': 'pw'}, format='json').json()
+        self.refresh = tokens['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+    def test_deactivation_applies_to_the_next_request(self):
+        self.assertEqual(self.client.get('/api/users/profiles/me/').status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/api/users/profiles/me/').status_code, 401)
+
+    def test_entries_are_only_reread_once_forgotten(self):
+        user_cache.get(self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertFalse(user_cache.get(self.user.pk).is_staff)
+
+        forget_user(self.user.pk)
+
+        self.assertTrue(user_cache.get(self.user.pk).is_staff)
+
+    def test_only_the_auth_columns_are_cached(self):
+        user_cache.forget(self.user.pk)
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            user_cache.get(self.user.pk)
+
+        [(_, row, _)] = [call.args for call in cache_set.call_args_list if call.args[0].startswith(PREFIX)]
+        self.assertEqual(set(row), {*USER_FIELDS, 'profile__id', 'profile__user_type', 'mentor_profile__id'})
+        self.assertNotIn(self.user.password, row.values())
+
+    def test_cached_user_reads_its_role_without_queries(self):
+        mentor = create_mentor('mentor')
+        user_cache.get(mentor.user.pk)
+
+        with self.assertNumQueries(0):
+            user = user_cache.get(mentor.user.pk)
+            self.assertEqual((user.profile.user_type, user.mentor_profile.pk), ('mentor', mentor.pk))
+        with self.assertNumQueries(0), self.assertRaises(MentorProfile.DoesNotExist):
+            user_cache.get(self.user.pk).mentor_profile
+
+    def test_uncached_fields_load_from_the_database(self):
+        user = user_cache.get(self.user.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'alice@example.com')
+        self.assertTrue(user.check_password('pw'))
+
+    @mock.patch('rest_framework_simplejwt.tokens.api_settings.CHECK_REVOKE_TOKEN', True)
+    @mock.patch('users.authentication.api_settings.CHECK_REVOKE_TOKEN', True)
+    def test_password_change_revokes_tokens_when_enabled(self):
+        access = self.client.post('/api/token/', {'username': 'alice', 'password': 'pw'}, format='json').json()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/users/profiles/me/').status_code, 200)
+
+        # A raw update leaves the cache entry in place; the hash is never in it
+        User.objects.filter(pk=self.user.pk).update(password='changed')
+
+        self.assertEqual(self.client.get('/api/users/profiles/me/').status_code, 401)
+
+    def test_requests_do_not_share_the_cached_profile(self):
+        first = user_cache.get(self.user.pk)
+        first.profile.user_type = 'mentor'
+
+        second = user_cache.get(self.user.pk)
+
+        self.assertIsNot(second.profile, first.profile)
+        self.assertEqual(second.profile.user_type, 'mentee')
+
+    def test_refreshed_access_token_carries_the_new_role(self):
+        profile = UserProfile.objects.get(user=self.user)
+        profile.user_type = 'mentor'
+        profile.save()
+
+        access = self.client.post('/api/token/refresh/', {'refresh': self.refresh}, format='json').json()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        self.assertEqual(self.client.get('/api/users/profiles/me/').json()['user_type'], 'mentor')
@@ -0,0 +1,36 @@
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import user_cache, user_role
+
+
+def add_role_claims(token, user):
+    token['user_type'], token['mentor_profile_id'] = user_role(user)
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry user_type and mentor_profile_id"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        add_role_claims(token, user)
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        # Re-read on every refresh, so a changed role reaches new access tokens
+        user = user_cache.get(self[api_settings.USER_ID_CLAIM])
+        if user is not None:
+            add_role_claims(access, user)
+        return access
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RoleRefreshToken
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
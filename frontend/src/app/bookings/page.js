@@ -228,11 +228,15 @@ const BookingCard = ({ booking, isMentor, onAction, isProcessing }) => {
   )
 }
 
+const isUpcoming = (booking) => ["pending", "in_progress"].includes(booking.status)
+
 export default function BookingsPage() {
   const { user } = useAuth()
   const router = useRouter()
   const [upcomingBookings, setUpcomingBookings] = useState([])
   const [pastBookings, setPastBookings] = useState([])
+  const [nextUrls, setNextUrls] = useState({ upcoming: null, past: null })
+  const [loadingMore, setLoadingMore] = useState(false)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [activeTab, setActiveTab] = useState("upcoming")
@@ -247,11 +251,10 @@ export default function BookingsPage() {
         const [upcomingData, pastData] = await Promise.all([bookingsAPI.getUpcoming(), bookingsAPI.getPast()])
 
         setUpcomingBookings(
-          (Array.isArray(upcomingData) ? upcomingData : upcomingData.results || []).filter((b) =>
-            ["pending", "in_progress"].includes(b.status),
-          ),
+          (Array.isArray(upcomingData) ? upcomingData : upcomingData.results || []).filter(isUpcoming),
         )
         setPastBookings(Array.isArray(pastData) ? pastData : pastData.results || [])
+        setNextUrls({ upcoming: upcomingData.next || null, past: pastData.next || null })
       } catch (err) {
         setError("Failed to load your sessions. Please try again later.")
       } finally {
@@ -261,6 +264,26 @@ export default function BookingsPage() {
     if (user) fetchBookings()
   }, [user])
 
+  const loadMoreBookings = async () => {
+    const tab = activeTab
+    if (!nextUrls[tab] || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const data = await bookingsAPI.getPage(nextUrls[tab])
+      const page = data.results || []
+      if (tab === "upcoming") {
+        setUpcomingBookings((prev) => [...prev, ...page.filter(isUpcoming)])
+      } else {
+        setPastBookings((prev) => [...prev, ...page])
+      }
+      setNextUrls((prev) => ({ ...prev, [tab]: data.next || null }))
+    } catch (err) {
+      alert(`Could not load more sessions. ${err.message}`)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleBookingAction = async (bookingId, action) => {
     setProcessingAction(bookingId)
     try {
@@ -369,7 +392,7 @@ export default function BookingsPage() {
                     : "text-slate-400 hover:bg-slate-800/50 hover:text-white"
                 }`}
               >
-                Upcoming ({upcomingBookings.length})
+                Upcoming ({upcomingBookings.length}{nextUrls.upcoming ? "+" : ""})
               </button>
               <button
                 onClick={() => setActiveTab("past")}
@@ -379,7 +402,7 @@ export default function BookingsPage() {
                     : "text-slate-400 hover:bg-slate-800/50 hover:text-white"
                 }`}
               >
-                Past ({pastBookings.length})
+                Past ({pastBookings.length}{nextUrls.past ? "+" : ""})
               </button>
             </div>
           </FadeIn>
@@ -402,6 +425,17 @@ export default function BookingsPage() {
                     />
                   ))
                 : renderEmptyState()}
+              {nextUrls[activeTab] && (
+                <div className="flex justify-center pt-2">
+                  <button
+                    onClick={loadMoreBookings}
+                    disabled={loadingMore}
+                    className="px-6 md:px-8 py-3 border border-slate-600/50 text-slate-300 rounded-xl font-semibold text-sm md:text-base hover:border-purple-400/50 hover:bg-purple-500/10 transition-all duration-300 disabled:opacity-50"
+                  >
+                    {loadingMore ? "Loading..." : "Load more sessions"}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -155,19 +155,32 @@ export default function MentorsClient({ mentors: initialMentors = [], expertiseL
   const [selectedExpertise, setSelectedExpertise] = useState("");
   const [sortBy, setSortBy] = useState("rating");
 
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // The list is paginated, so sort on the server and page through it with `next`
+  const serverOrdering = { rating: "-rating", "price-low": "hourly_rate", "price-high": "-hourly_rate" }[sortBy];
+
   useEffect(() => {
     async function fetchMentors() {
       try {
         const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000/api';
-        const res = await fetch(`${API_BASE_URL}/mentors/`);
+        const query = serverOrdering ? `?ordering=${serverOrdering}` : '';
+        const res = await fetch(`${API_BASE_URL}/mentors/${query}`);
         if (res.ok) {
           const data = await res.json();
-          setMentors(Array.isArray(data) ? data : []);
+          setMentors(Array.isArray(data) ? data : data.results || []);
+          setNextUrl(Array.isArray(data) ? null : data.next || null);
         }
       } catch (e) {
         setMentors([]);
+        setNextUrl(null);
       }
     }
+    fetchMentors();
+  }, [serverOrdering]);
+
+  useEffect(() => {
     async function fetchExpertise() {
       try {
         const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000/api';
@@ -180,10 +193,26 @@ export default function MentorsClient({ mentors: initialMentors = [], expertiseL
         setExpertiseList([]);
       }
     }
-    fetchMentors();
     fetchExpertise();
   }, []);
 
+  async function loadMoreMentors() {
+    if (!nextUrl || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await fetch(nextUrl);
+      if (res.ok) {
+        const data = await res.json();
+        setMentors((current) => [...current, ...(data.results || [])]);
+        setNextUrl(data.next || null);
+      }
+    } catch (e) {
+      // Keep the mentors already shown; the button stays for another try
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   // Filter and sort mentors
   const filteredMentors = (Array.isArray(mentors) ? mentors : []).filter((mentor) => {
     const mentorName = mentor.user ? `${mentor.user.first_name} ${mentor.user.last_name}` : ""
@@ -357,6 +386,18 @@ export default function MentorsClient({ mentors: initialMentors = [], expertiseL
             ))}
           </div>
         )}
+
+        {nextUrl && (
+          <div className="flex justify-center mt-10">
+            <button
+              onClick={loadMoreMentors}
+              disabled={loadingMore}
+              className="px-8 py-3 border-2 border-purple-500/40 text-slate-200 rounded-xl font-bold text-sm md:text-base hover:border-purple-400/60 hover:bg-purple-500/10 transition-all duration-500 disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load more mentors"}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
@@ -21,6 +21,12 @@ const removeToken = () => {
   }
 };
 
+// Paginated lists link to their `next` page with an absolute URL; turn it back into an endpoint
+const endpointFromUrl = (url) => {
+  const { pathname, search } = new URL(url);
+  return `${pathname.replace(/^.*?\/api(?=\/)/, '')}${search}`;
+};
+
 // API request helper
 const apiRequest = async (endpoint, options = {}, retry = true) => {
   const token = getToken();
@@ -244,6 +250,11 @@ export const bookingsAPI = {
     }
   },
 
+  // Get the page a `next` link points to
+  getPage: async (url) => {
+    return await apiRequest(endpointFromUrl(url));
+  },
+
   // Create new booking
   create: async (bookingData) => {
     return await apiRequest('/bookings/', {